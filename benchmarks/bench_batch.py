@@ -0,0 +1,47 @@
+# Пропускная способность пакетной аппроксимации (кривых/с) в зависимости от числа процессов.
+# Запуск: python benchmarks/bench_batch.py --files 200 --points 5000 --workers 1 2 4 8
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nmr import batch, save_curve
+from nmr.synthetic import synthetic_cpmg
+
+
+def make_dataset(folder, n_files, n_points):
+    for i in range(n_files):
+        t, y = synthetic_cpmg(n_points=n_points, seed=i)
+        save_curve(os.path.join(folder, f"curve_{i:05d}.txt"), t, y)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--files', type=int, default=100)
+    parser.add_argument('--points', type=int, default=2000)
+    parser.add_argument('--max-components', type=int, default=4)
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        make_dataset(folder, args.files, args.points)
+        files = batch.collect_files([folder])
+        out = os.path.join(folder, 'results.csv')
+        print(f"{args.files} кривых x {args.points} точек, ядер: {os.cpu_count()}")
+        print(f"{'workers':>8} {'время, с':>10} {'кривых/с':>10} {'ускорение':>10}")
+        base = None
+        for w in args.workers:
+            start = time.perf_counter()
+            batch.run_batch(files, out, args.max_components, workers=w)
+            elapsed = time.perf_counter() - start
+            rate = len(files) / elapsed
+            base = base or rate
+            print(f"{w:>8} {elapsed:>10.2f} {rate:>10.1f} {rate / base:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
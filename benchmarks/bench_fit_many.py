@@ -0,0 +1,56 @@
+# Задержка на кривую: цикл NMRCore.fit против пакетного NMRCore.fit_many (общая ось времени).
+# Запуск: python benchmarks/bench_fit_many.py --curves 100 --points 2000 20000
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from scipy.optimize import nnls
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nmr import NMRCore
+from nmr.kernels import build_kernel
+from nmr.synthetic import synthetic_cpmg
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--curves', type=int, default=50)
+    parser.add_argument('--points', type=int, nargs='+', default=[2000, 20000])
+    parser.add_argument('--max-components', type=int, default=4)
+    args = parser.parse_args()
+
+    print(f"{'точек':>8} {'NNLS цикл':>12} {'NNLS пакет':>12} {'fit цикл':>12} {'fit_many':>12}   (мс/кривую)")
+    for n_points in args.points:
+        t, _ = synthetic_cpmg(n_points=n_points, seed=0)
+        Y = np.array([synthetic_cpmg(n_points=n_points, seed=i)[1] for i in range(args.curves)])
+        Y_norm = Y / Y.max(axis=1, keepdims=True)
+        core = NMRCore()
+        grid = core.t2_grid(t)
+
+        def nnls_loop():
+            for y in Y_norm:
+                nnls(build_kernel(t, grid), y)
+
+        def nnls_batch():
+            Q, R = np.linalg.qr(build_kernel(t, grid))
+            for b in Y_norm @ Q:
+                nnls(R, b)
+
+        per_curve = [timed(f) / args.curves * 1e3 for f in (
+            nnls_loop, nnls_batch,
+            lambda: [core.fit(t, y, args.max_components) for y in Y],
+            lambda: core.fit_many(t, Y, args.max_components))]
+        print(f"{n_points:>8} " + " ".join(f"{v:>12.2f}" for v in per_curve))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+# Время импорта расчётного ядра и время до первого окна GUI (каждый замер - новый процесс).
+# Для ядра также проверяется, что импорт nmr не тянет Qt, matplotlib и scipy.
+# Запуск: python benchmarks/bench_import.py [--repeats 5] [--no-gui]
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ('PyQt6', 'matplotlib', 'scipy')
+
+CORE = """
+import sys, time
+spawn = float(sys.argv[1])
+sys.path.insert(0, sys.argv[2])
+t0 = time.perf_counter()
+from nmr import NMRCore
+t1 = time.perf_counter()
+from nmr.synthetic import synthetic_cpmg
+t, y = synthetic_cpmg(n_points=1000, seed=0)
+heavy = [m for m in %r if m in sys.modules]
+t2 = time.perf_counter()
+NMRCore().fit(t, y)
+print(t1 - t0, time.time() - spawn - (time.perf_counter() - t1), time.perf_counter() - t2, ','.join(heavy) or '-')
+""" % (HEAVY,)
+
+GUI = """
+import sys, time
+spawn = float(sys.argv[1])
+sys.path.insert(0, sys.argv[2])
+t0 = time.perf_counter()
+import main
+from PyQt6.QtWidgets import QApplication
+t1 = time.perf_counter()
+app = QApplication(sys.argv[:1])
+window = main.NMRApp()
+window.show()
+app.processEvents()
+print(t1 - t0, time.time() - spawn)
+"""
+
+
+def run(code):
+    spawn = time.time()
+    env = dict(os.environ)
+    env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    out = subprocess.run([sys.executable, '-c', code, repr(spawn), ROOT], capture_output=True, text=True, env=env)
+    if out.returncode != 0:
+        raise RuntimeError(out.stderr.strip().splitlines()[-1] if out.stderr.strip() else "ошибка процесса")
+    return out.stdout.split()
+
+
+def median(values):
+    return sorted(values)[len(values) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--no-gui', action='store_true')
+    args = parser.parse_args()
+
+    bare = median([float(run("import sys, time; print(time.time() - float(sys.argv[1]))")[0])
+                   for _ in range(args.repeats)])
+    print(f"запуск интерпретатора: {bare * 1e3:.0f} мс")
+
+    rows = [run(CORE) for _ in range(args.repeats)]
+    print(f"import nmr:            {median([float(r[0]) for r in rows]) * 1e3:.0f} мс "
+          f"(от запуска процесса {median([float(r[1]) for r in rows]) * 1e3:.0f} мс), "
+          f"загружены: {rows[0][3]}")
+    print(f"первый fit (1k эхо):   {median([float(r[2]) for r in rows]) * 1e3:.0f} мс "
+          f"(включая отложенный импорт scipy)")
+
+    if not args.no_gui:
+        try:
+            rows = [run(GUI) for _ in range(args.repeats)]
+        except RuntimeError as e:
+            print(f"GUI: не удалось запустить ({e})")
+            return
+        print(f"import main (GUI):     {median([float(r[0]) for r in rows]) * 1e3:.0f} мс")
+        print(f"до первого окна:       {median([float(r[1]) for r in rows]) * 1e3:.0f} мс")
+
+
+if __name__ == '__main__':
+    main()
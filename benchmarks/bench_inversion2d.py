@@ -0,0 +1,53 @@
+# 2D-инверсия T1-T2: время и пиковая память (tracemalloc) при росте числа эхо; для сравнения -
+# размер полного произведения Кронекера, которое не строится. Запуск:
+# python benchmarks/bench_inversion2d.py --n1 64 --n2 2000 8000 32000
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nmr.inversion2d import invert_2d
+from nmr.synthetic import synthetic_2d
+
+PEAKS = ((0.05, 0.02, 0.4), (0.5, 0.2, 0.6))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--n1', type=int, default=64)
+    parser.add_argument('--n2', type=int, nargs='+', default=[2000, 8000, 32000])
+    parser.add_argument('--size', type=int, nargs=2, default=[50, 100], help="сетка T1 и T2")
+    args = parser.parse_args()
+
+    m = args.size[0] * args.size[1]
+    print(f"{'n1 x n2':>12} {'данные, МБ':>11} {'пик, МБ':>9} {'K1xK2, ГБ':>10} {'время, с':>9} {'ранг':>8}   пики (T1, T2)")
+    for n2 in args.n2:
+        axis1, axis2, M = synthetic_2d(args.n1, n2, peaks=PEAKS, seed=0)
+        tracemalloc.start()
+        start = time.perf_counter()
+        r = invert_2d(axis1, axis2, M, size=tuple(args.size))
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        # Найденные пики: максимум карты в окрестности каждого истинного
+        found = []
+        for t1, t2, _ in PEAKS:
+            i = np.abs(np.log(r['grid1'] / t1)) < 0.7
+            j = np.abs(np.log(r['grid2'] / t2)) < 0.7
+            sub = r['F'][np.ix_(i, j)]
+            a, b = np.unravel_index(np.argmax(sub), sub.shape)
+            found.append(f"({r['grid1'][i][a]:.3g}, {r['grid2'][j][b]:.3g})")
+        print(f"{args.n1:>5} x {n2:<5} {M.nbytes / 2**20:>11.1f} {peak / 2**20:>9.1f} "
+              f"{args.n1 * n2 * m * 8 / 2**30:>10.1f} {elapsed:>9.2f} {r['rank'][0]:>3}x{r['rank'][1]:<4}  "
+              + " ".join(found))
+    print("истинные пики: " + " ".join(f"({t1:g}, {t2:g})" for t1, t2, _ in PEAKS))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+# Время загрузки: np.loadtxt против нового загрузчика (без кэша, с записью кэша, из кэша).
+# Запуск: python benchmarks/bench_load.py --points 100000 1000000
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nmr.io import load_curves, read_text
+from nmr.synthetic import synthetic_cpmg
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--points', type=int, nargs='+', default=[100000, 1000000])
+    parser.add_argument('--curves', type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{'точек':>9} {'формат':>8} {'loadtxt':>9} {'разбор':>9} {'+кэш':>9} {'из кэша':>9}   (с)")
+    with tempfile.TemporaryDirectory() as folder:
+        for n_points in args.points:
+            t, _ = synthetic_cpmg(n_points=n_points, seed=0)
+            Y = [synthetic_cpmg(n_points=n_points, seed=i)[1] for i in range(args.curves)]
+            text = "\n".join("\t".join(f"{v:.9g}" for v in row) for row in np.column_stack([t] + Y)) + "\n"
+            for name, body in (('точка', text), ('запятая', text.replace('.', ','))):
+                path = os.path.join(folder, f"{n_points}_{name}.txt")
+                with open(path, 'w') as fh:
+                    fh.write(body)
+                base = timed(lambda: np.loadtxt(path)) if name == 'точка' else float('nan')
+                parse = timed(lambda: read_text(path))
+                cold = timed(lambda: load_curves(path))
+                warm = timed(lambda: load_curves(path))
+                print(f"{n_points:>9} {name:>8} {base:>9.3f} {parse:>9.3f} {cold:>9.3f} {warm:>9.4f}")
+
+
+if __name__ == '__main__':
+    main()
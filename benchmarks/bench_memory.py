@@ -0,0 +1,71 @@
+# Пиковая память (RSS) NMRCore.fit в зависимости от числа эхо: плотное ядро против блочного сжатия.
+# Каждый замер - в отдельном процессе (пиковый RSS процесса не уменьшается).
+# Запуск: python benchmarks/bench_memory.py --points 10000 100000 1000000
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DENSE = 2**62
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def child(n_points, chunk_rows):
+    from nmr import NMRCore
+    from nmr.synthetic import synthetic_cpmg
+
+    t, y = synthetic_cpmg(n_points=n_points, seed=0)
+    base = peak_rss_mb()
+    start = time.perf_counter()
+    results = NMRCore(chunk_rows=chunk_rows).fit(t, y, 4)[0]
+    elapsed = time.perf_counter() - start
+    t2 = ",".join(f"{r['T2']:.4g}" for r in results)
+    print(f"{base:.1f} {peak_rss_mb():.1f} {elapsed:.3f} {t2}")
+
+
+def measure(n_points, chunk_rows):
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', str(n_points), str(chunk_rows)],
+                         capture_output=True, text=True)
+    if out.returncode != 0:
+        return None
+    base, peak, elapsed, t2 = out.stdout.split()
+    return float(base), float(peak), float(elapsed), t2
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--points', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--chunk-rows', type=int, default=16384)
+    parser.add_argument('--child', nargs=2, type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(*args.child)
+        return
+
+    print(f"{'точек':>9} {'ядро, МБ':>9} {'плотное: +RSS':>14} {'время':>7} {'блоки: +RSS':>12} {'время':>7}   "
+          f"(+RSS - рост пикового RSS во время fit, МБ; блоки по {args.chunk_rows} строк)")
+    for n_points in args.points:
+        row = [f"{n_points:>9}", f"{n_points * 150 * 8 / 2**20:>9.0f}"]
+        t2s = []
+        for chunk_rows in (DENSE, args.chunk_rows):
+            res = measure(n_points, chunk_rows)
+            if res is None:
+                row += [f"{'ошибка':>14}" if chunk_rows == DENSE else f"{'ошибка':>12}", f"{'':>7}"]
+                continue
+            base, peak, elapsed, t2 = res
+            width = 14 if chunk_rows == DENSE else 12
+            row += [f"{peak - base:>{width}.0f}", f"{elapsed:>6.1f}с"]
+            t2s.append(t2)
+        same = "" if len(set(t2s)) <= 1 else "  T2 различаются: " + " / ".join(t2s)
+        print(" ".join(row) + same)
+
+
+if __name__ == '__main__':
+    main()
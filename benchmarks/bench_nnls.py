@@ -0,0 +1,73 @@
+# NNLS на сетке T2: scipy.optimize.nnls по ядру K (n_points x 150) против активных множеств по K^T K
+# (nmr.nnls) - холодный старт, тёплый старт с соседней кривой серии и повторное решение той же кривой
+# (другое число компонент). Проверка: целевая функция ||K x - y||^2 против scipy, доля запасных решений.
+# Запуск: python benchmarks/bench_nnls.py [--points 1000 10000 100000] [--curves 20]
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nmr.core import NMRCore
+from nmr.kernels import build_kernel
+from nmr.nnls import nnls_gram
+from nmr.synthetic import synthetic_cpmg
+
+
+def timed(fn):
+    start = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - start
+
+
+def main():
+    from scipy.optimize import nnls
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--points', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--curves', type=int, default=20)
+    parser.add_argument('--noise', type=float, default=0.005)
+    args = parser.parse_args()
+
+    print(f"{args.curves} кривых серии (T2 средней компоненты плавно растёт), медианы, мс")
+    print(f"{'точек':>7} {'K^T K':>8} {'scipy':>8} {'холодн.':>8} {'тёплый':>8} {'повтор':>8} "
+          f"{'итер. х/т':>10} {'макс. отн. откл. ||r||^2':>25} {'запасн.':>8}")
+    for n in args.points:
+        curves = [synthetic_cpmg(n_points=n, t2=(0.01, 0.1 * (1 + k / args.curves), 0.5), shares=(0.2, 0.5, 0.3),
+                                 noise=args.noise, seed=k) for k in range(args.curves)]
+        t = curves[0][0]
+        t2_grid = NMRCore().t2_grid(t)
+        (K, G), t_gram = timed(lambda: (lambda K: (K, K.T @ K))(build_kernel(t, t2_grid)))
+        times = {k: [] for k in ('scipy', 'cold', 'warm', 'again')}
+        iters = {'cold': [], 'warm': []}
+        worst, fallback, passive = 0.0, 0, None
+        for _, y in curves:
+            y = y / np.max(y)
+            b, yy = K.T @ y, y @ y
+            (xs, rs), dt = timed(lambda: nnls(K, y))
+            times['scipy'].append(dt)
+            (x, r, P, info), dt = timed(lambda: nnls_gram(G, b, yy))
+            times['cold'].append(dt)
+            iters['cold'].append(info['nnls_iter'])
+            fallback += info['nnls_solver'] != 'fnnls'
+            if passive is not None:
+                (x, r, _, info), dt = timed(lambda: nnls_gram(G, b, yy, passive))
+                times['warm'].append(dt)
+                iters['warm'].append(info['nnls_iter'])
+                fallback += info['nnls_solver'] != 'fnnls'
+            _, dt = timed(lambda: nnls_gram(G, b, yy, P))
+            times['again'].append(dt)
+            passive = P
+            # Решение NNLS при вырожденном K не единственно: сравнивается значение целевой функции
+            worst = max(worst, abs(np.sum((K @ x - y)**2) / rs**2 - 1))
+        ms = {k: np.median(v) * 1e3 for k, v in times.items()}
+        print(f"{n:>7} {t_gram * 1e3:>8.1f} {ms['scipy']:>8.2f} {ms['cold']:>8.2f} {ms['warm']:>8.2f} "
+              f"{ms['again']:>8.2f} {np.median(iters['cold']):>5.0f}/{np.median(iters['warm']):<4.0f} "
+              f"{worst:>25.1e} {fallback:>8}", flush=True)
+
+
+if __name__ == '__main__':
+    main()
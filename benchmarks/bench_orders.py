@@ -0,0 +1,56 @@
+# Выбор числа компонент: fit_orders (один NNLS, кандидаты 1..N уточняются параллельно) против
+# N последовательных fit(t, y, k) с общим NMRCore (как повторные расчёты в GUI), и доля верно
+# выбранных порядков по AIC/BIC/F-тесту на синтетических кривых с известным числом компонент.
+# Запуск: python benchmarks/bench_orders.py [--points 2000 20000 200000] [--max-components 6] [--seeds 5]
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nmr.core import NMRCore
+from nmr.selection import CRITERIA, best_order
+from nmr.synthetic import synthetic_cpmg
+
+CASES = [((0.05,), (1.0,)), ((0.02, 0.3), (0.4, 0.6)), ((0.01, 0.1, 0.5), (0.2, 0.5, 0.3)),
+         ((0.005, 0.03, 0.15, 0.8), (0.15, 0.3, 0.35, 0.2))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--points', type=int, nargs='+', default=[2000, 20000, 200000])
+    parser.add_argument('--max-components', type=int, default=6)
+    parser.add_argument('--seeds', type=int, default=5)
+    parser.add_argument('--noise', type=float, default=0.005)
+    args = parser.parse_args()
+
+    # Импорт scipy и первый расчёт - до замеров
+    NMRCore().fit_orders(*synthetic_cpmg(n_points=200), 2)
+    print(f"до {args.max_components} компонент, шум {args.noise:g}, {args.seeds} кривых на случай; медианы, мс")
+    print(f"{'точек':>7} {'компонент':>10} {'fit_orders':>11} {'N x fit':>9} {'ускор.':>7} "
+          + " ".join(f"{c.upper() + ' верно':>10}" for c in CRITERIA))
+    for n in args.points:
+        for t2, shares in CASES:
+            t_orders, t_seq, right = [], [], {c: 0 for c in CRITERIA}
+            for seed in range(args.seeds):
+                t, y = synthetic_cpmg(n_points=n, t2=t2, shares=shares, noise=args.noise, seed=seed)
+                start = time.perf_counter()
+                orders = NMRCore().fit_orders(t, y, args.max_components)
+                t_orders.append(time.perf_counter() - start)
+                core = NMRCore()
+                start = time.perf_counter()
+                for k in range(1, args.max_components + 1):
+                    core.fit(t, y, k)
+                t_seq.append(time.perf_counter() - start)
+                for c in CRITERIA:
+                    right[c] += best_order(orders['candidates'], c) == len(t2)
+            a, b = np.median(t_orders) * 1e3, np.median(t_seq) * 1e3
+            print(f"{n:>7} {len(t2):>10} {a:>11.0f} {b:>9.0f} {b / a:>7.1f} "
+                  + " ".join(f"{right[c]:>7}/{args.seeds:<2}" for c in CRITERIA), flush=True)
+
+
+if __name__ == '__main__':
+    main()
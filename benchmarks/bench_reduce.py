@@ -0,0 +1,77 @@
+# Сжатие цепочки эхо (NMRCore(reduce_ratio=...)): время расчёта и число оставшихся точек в
+# зависимости от отношения ширины окон, отклонение T2 и долей от расчёта по всем точкам и от
+# истинных значений синтетической кривой, RMS остатков по всем эхо.
+# Запуск: python benchmarks/bench_reduce.py [--points 10000 100000 1000000] [--ratios 1.005 1.01 1.02 1.05 1.1]
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nmr.core import NMRCore
+from nmr.reduce import log_windows
+from nmr.synthetic import synthetic_cpmg
+
+T2 = (0.005, 0.03, 0.15, 0.8)
+SHARES = (0.15, 0.3, 0.35, 0.2)
+
+
+def deviation(results, ref_t2, ref_shares):
+    # Наибольшие относительное отклонение T2 и абсолютное отклонение доли по компонентам
+    # (сопоставление по порядку T2; при другом числе компонент - None)
+    if len(results) != len(ref_t2):
+        return None, None
+    rows = sorted(results, key=lambda r: r['T2'])
+    d_t2 = max(abs(r['T2'] / t2 - 1) for r, t2 in zip(rows, ref_t2))
+    d_share = max(abs(r['Share'] - s) for r, s in zip(rows, ref_shares))
+    return d_t2, d_share
+
+
+def fmt(value, scale, digits):
+    return f"{value * scale:.{digits}f}" if value is not None else "-"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--points', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--ratios', type=float, nargs='+', default=[1.005, 1.01, 1.02, 1.05, 1.1])
+    parser.add_argument('--max-components', type=int, default=4)
+    parser.add_argument('--noise', type=float, default=0.005)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    # Импорт scipy и первый расчёт - до замеров
+    NMRCore().fit(*synthetic_cpmg(n_points=200), 2)
+    print(f"{len(T2)} компоненты, до {args.max_components} в модели, шум {args.noise:g}; "
+          f"время - медиана {args.repeat} расчётов, мс; dT2 - отн., %; dShare - абс., п.п.")
+    print(f"{'точек':>8} {'отношение':>9} {'окон':>6} {'время':>8} {'ускор.':>7} {'RMS':>9} "
+          f"{'dT2 полн.':>9} {'dShare':>7} {'dT2 ист.':>9} {'dShare':>7}")
+    for n in args.points:
+        t, y = synthetic_cpmg(n_points=n, t2=T2, shares=SHARES, noise=args.noise, seed=0)
+        base = None
+        for ratio in [None] + args.ratios:
+            times = []
+            for _ in range(args.repeat):
+                # Новый NMRCore: без кэша ядер и хранилища результатов
+                core = NMRCore(reduce_ratio=ratio)
+                start = time.perf_counter()
+                results, _, residuals, _, _ = core.fit(t, y, args.max_components)
+                times.append(time.perf_counter() - start)
+            elapsed = np.median(times)
+            if base is None:
+                base = results, elapsed
+            ref = [r['T2'] for r in base[0]], [r['Share'] for r in base[0]]
+            d_full = deviation(results, *ref)
+            d_true = deviation(results, T2, SHARES)
+            n_windows = len(log_windows(t, ratio)) if ratio else n
+            rms = np.sqrt(np.mean(residuals**2))
+            print(f"{n:>8} {ratio or '-':>9} {n_windows:>6} {elapsed * 1e3:>8.0f} {base[1] / elapsed:>7.1f} "
+                  f"{rms:>9.6f} {fmt(d_full[0], 100, 3):>9} {fmt(d_full[1], 100, 3):>7} "
+                  f"{fmt(d_true[0], 100, 2):>9} {fmt(d_true[1], 100, 2):>7}", flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+# Уточнение параметров: прежний путь (сумма по компонентам + конечные разности)
+# против аналитического якобиана ('full') и разделения переменных ('varpro').
+# Запуск: python benchmarks/bench_refine.py --points 5000 --repeat 3
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from scipy.optimize import least_squares, nnls
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nmr import NMRCore
+from nmr.model import MultiExpModel
+from nmr.synthetic import synthetic_cpmg
+
+T2_SETS = [0.003, 0.02, 0.08, 0.3, 1.0, 3.0]
+
+
+def legacy_fit(t, y, x0, lower, upper):
+    calls = [0]
+
+    def model_func(p, t_ax):
+        calls[0] += 1
+        n_c = (len(p)-1)//2
+        a, t2, off = p[:n_c], p[n_c:2*n_c], p[-1]
+        return sum(a[i]*np.exp(-t_ax/t2[i]) for i in range(n_c)) + off
+    res = least_squares(lambda p: model_func(p, t) - y, x0, bounds=(lower, upper))
+    # Конечные разности не попадают в nfev - считаем все вызовы модели
+    res.model_calls = calls[0]
+    return res
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--points', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--noise', type=float, default=0.002)
+    args = parser.parse_args()
+
+    core = NMRCore()
+    print(f"{'комп.':>5} {'метод':>8} {'nfev':>6} {'njev':>6} {'вызовов':>8} {'время, мс':>10} {'макс. dT2, %':>13}")
+    for n in range(1, 7):
+        t2 = T2_SETS[:n]
+        t, y = synthetic_cpmg(n_points=args.points, t_end=10.0, t2=t2, shares=[1.0] * n,
+                              amplitude=1.0, noise=args.noise, seed=n)
+        y_norm = y / y.max()
+        grid = core.t2_grid(t)
+        amps, _ = nnls(core.kernels.get(t, grid).K, y_norm)
+        peaks = core.find_peaks(amps, grid, n)
+        k = len(peaks)
+        dt = t[1] - t[0]
+        x0 = [p[0] for p in peaks] + [p[1] for p in peaks] + [0.0]
+        lower = [0]*k + [dt/5]*k + [-0.1]
+        upper = [2]*k + [t[-1]*2]*k + [0.1]
+
+        runs = {'legacy': lambda: legacy_fit(t, y_norm, x0, lower, upper),
+                'full': lambda: MultiExpModel(t, y_norm).fit(x0, lower, upper, 'full'),
+                'varpro': lambda: MultiExpModel(t, y_norm).fit(x0, lower, upper, 'varpro')}
+        for name, run in runs.items():
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                res = run()
+            elapsed = (time.perf_counter() - start) / args.repeat
+            found = np.sort(res.x[k:2*k])
+            err = np.max(np.abs(found - t2[:k]) / t2[:k]) * 100 if k == n else float('nan')
+            njev = res.njev if res.njev is not None else 0
+            calls = getattr(res, 'model_calls', res.nfev + njev)
+            print(f"{n:>5} {name:>8} {res.nfev:>6} {njev:>6} {calls:>8} {elapsed * 1e3:>10.1f} {err:>13.2f}")
+
+
+if __name__ == '__main__':
+    main()
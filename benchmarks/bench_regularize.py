@@ -0,0 +1,60 @@
+# Перебор alpha для распределения T2: замкнутые формулы в базисе SVD против NNLS на каждое alpha.
+# Запуск: python benchmarks/bench_regularize.py --points 2000 20000 --alphas 60
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from scipy.optimize import nnls
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nmr import NMRCore
+from nmr.kernels import build_kernel, gram_svd
+from nmr.regularize import solve_nonneg
+from nmr.synthetic import synthetic_cpmg
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--points', type=int, nargs='+', default=[2000, 20000])
+    parser.add_argument('--alphas', type=int, default=60)
+    parser.add_argument('--full-alphas', type=int, default=3,
+                        help="сколько alpha решать на полном ядре (дорого), время экстраполируется")
+    args = parser.parse_args()
+
+    print(f"{'точек':>8} {'1 решение':>10} {'перебор':>10} {'NNLS сжат.':>11} {'NNLS полн.':>11}   (мс; перебор "
+          f"и NNLS - на {args.alphas} alpha)")
+    for n_points in args.points:
+        t, y = synthetic_cpmg(n_points=n_points, seed=0)
+        y_norm = y / y.max()
+        core = NMRCore()
+        grid = core.t2_grid(t)
+        core.kernels.get(t, grid)  # ядро и K^T K в кэше - как при повторных расчётах в GUI
+        alphas = np.logspace(-3, 1, args.alphas)
+
+        t_one, _ = timed(lambda: core.distribution(t, y, alpha=1.0))
+        t_sweep, dist = timed(lambda: core.distribution(t, y, 'gcv', alphas=alphas))
+
+        entry = core.kernels.get(t, grid)
+        s, V = gram_svd(entry.gram)
+        d = (V.T @ (entry.K.T @ y_norm)) / s
+        t_comp, _ = timed(lambda: [solve_nonneg(s, V, d, a) for a in alphas])
+
+        K = build_kernel(t, grid)
+        t_full, _ = timed(lambda: [nnls(np.vstack([K, a * np.eye(len(grid))]), np.r_[y_norm, np.zeros(len(grid))])
+                                   for a in alphas[:args.full_alphas]])
+        t_full *= args.alphas / args.full_alphas
+        print(f"{n_points:>8} {t_one*1e3:>10.1f} {t_sweep*1e3:>10.1f} {t_comp*1e3:>11.1f} {t_full*1e3:>11.0f}"
+              f"   alpha(GCV) = {dist['alpha']:.3g}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+# Производительность отчётов: страниц в секунду для PNG (300 dpi) и многостраничного PDF
+# в зависимости от числа процессов; плюс одна страница с bbox_inches='tight' и без.
+# Запуск: python benchmarks/bench_report.py --files 16 --points 20000 --workers 1 2 4
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nmr import NMRCore, save_curve
+from nmr.report import REPORT_DPI, draw_report, report_data, run_reports, save_report
+from nmr.synthetic import synthetic_cpmg
+
+
+def single_page(n_points):
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    t, y = synthetic_cpmg(n_points=n_points, seed=0)
+    data = report_data(t, y, NMRCore().fit(t, y), title='bench')
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'page.png')
+        save_report(path, data)
+        start = time.perf_counter()
+        save_report(path, data)
+        fixed = time.perf_counter() - start
+        start = time.perf_counter()
+        fig = draw_report(data)
+        FigureCanvasAgg(fig)
+        fig.savefig(path, dpi=REPORT_DPI, bbox_inches='tight')
+        tight = time.perf_counter() - start
+    print(f"одна страница PNG {REPORT_DPI} dpi: {fixed:.2f} с (bbox_inches='tight': {tight:.2f} с)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--files', type=int, default=16)
+    parser.add_argument('--points', type=int, default=20000)
+    parser.add_argument('--workers', type=int, nargs='+', default=sorted({1, os.cpu_count() or 1}))
+    args = parser.parse_args()
+    logging.getLogger('matplotlib.font_manager').setLevel(logging.ERROR)
+
+    single_page(args.points)
+    with tempfile.TemporaryDirectory() as tmp:
+        files = []
+        for i in range(args.files):
+            t, y = synthetic_cpmg(n_points=args.points, seed=i)
+            files.append(os.path.join(tmp, f'curve{i:03d}.txt'))
+            save_curve(files[-1], t, y)
+        print(f"{args.files} файлов по {args.points} точек, ядер: {os.cpu_count()}")
+        print(f"{'процессов':>10} {'PNG, стр/с':>11} {'PDF, стр/с':>11}")
+        for workers in args.workers:
+            rates = []
+            for output in (os.path.join(tmp, f'png{workers}'), os.path.join(tmp, f'out{workers}.pdf')):
+                start = time.perf_counter()
+                n_pages, errors = run_reports(files, output, workers=workers)
+                rates.append(n_pages / (time.perf_counter() - start))
+            print(f"{workers:>10} {rates[0]:>11.2f} {rates[1]:>11.2f}")
+
+
+if __name__ == '__main__':
+    main()
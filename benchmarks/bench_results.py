@@ -0,0 +1,58 @@
+# Хранилище результатов: первый расчёт против повторного (из SQLite) для fit и fit_many,
+# размер записи и заполнение хранилища. Хранилище - временный файл, общий кэш не трогается.
+# Запуск: python benchmarks/bench_results.py [--points 10000 100000] [--curves 20]
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nmr import NMRCore
+from nmr.results import ResultStore
+from nmr.synthetic import synthetic_cpmg
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    out = fn(*args)
+    return out, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--points', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--curves', type=int, default=20, help="кривых для fit_many")
+    parser.add_argument('--max-components', type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ResultStore(os.path.join(tmp, 'results.sqlite'))
+        core = NMRCore(result_store=store)
+        print(f"{'точек':>8} {'вызов':>9} {'первый, мс':>11} {'повтор, мс':>11} {'ускорение':>10} {'dT2':>9}")
+        for n_points in args.points:
+            t, y = synthetic_cpmg(n_points=n_points, t2=(0.01, 0.1, 0.5), shares=(0.2, 0.5, 0.3), noise=0.005,
+                                  seed=0)
+            cold, t_cold = timed(core.fit, t, y, args.max_components)
+            warm, t_warm = timed(core.fit, t, y, args.max_components)
+            d_t2 = max(abs(a['T2'] / b['T2'] - 1) for a, b in zip(cold[0], warm[0]))
+            print(f"{n_points:>8} {'fit':>9} {t_cold * 1e3:>11.1f} {t_warm * 1e3:>11.2f} "
+                  f"{t_cold / t_warm:>9.0f}x {d_t2:>9.1e}")
+
+            Y = np.array([synthetic_cpmg(n_points=n_points, t2=(0.01, 0.1, 0.5), shares=(0.2, 0.5, 0.3),
+                                         noise=0.005, seed=s)[1] for s in range(1, args.curves + 1)])
+            _, t_cold = timed(core.fit_many, t, Y, args.max_components)
+            _, t_warm = timed(core.fit_many, t, Y, args.max_components)
+            print(f"{n_points:>8} {'fit_many':>9} {t_cold * 1e3:>11.1f} {t_warm * 1e3:>11.2f} "
+                  f"{t_cold / t_warm:>9.0f}x {'':>9}")
+        stats = store.stats()
+        print(f"записей: {stats['entries']}, {stats['nbytes'] / stats['entries']:.0f} байт на запись, "
+              f"попаданий {stats['hits']}, промахов {stats['misses']}")
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
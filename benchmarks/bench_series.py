@@ -0,0 +1,85 @@
+# Серия с медленным дрейфом спектра T2: независимые NMRCore.fit против fit_series (тёплый старт).
+# Запуск: python benchmarks/bench_series.py --curves 60 --points 5000
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nmr import NMRCore
+from nmr.series import fit_series, track_components
+from nmr.synthetic import synthetic_cpmg
+
+
+def drifting_series(n_curves, n_points, seed=0):
+    # Гидратация: быстрая компонента растёт и укорачивается, медленная убывает
+    Y, T2 = [], []
+    for i, s in enumerate(np.linspace(0, 1, n_curves)):
+        t2 = (0.02 * (1 - 0.5 * s), 0.1 * (1 - 0.2 * s), 0.6 * (1 - 0.3 * s))
+        shares = (0.1 + 0.3 * s, 0.5, 0.4 - 0.3 * s)
+        t, y = synthetic_cpmg(n_points=n_points, t2=t2, shares=shares, seed=seed + i)
+        Y.append(y)
+        T2.append(t2)
+    return t, np.array(Y), np.array(T2)
+
+
+def truth_error(results, t2_true):
+    # Для каждой истинной T2 - ближайшая найденная (относительная ошибка по ln T2)
+    found = np.log([r['T2'] for r in results])
+    return [np.min(np.abs(found - np.log(v))) for v in t2_true] if len(found) else [np.inf]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--curves', type=int, default=60)
+    parser.add_argument('--points', type=int, default=5000)
+    parser.add_argument('--max-components', type=int, default=4)
+    args = parser.parse_args()
+
+    t, Y, T2 = drifting_series(args.curves, args.points)
+    core = NMRCore()
+    core.fit(t, Y[0], args.max_components)  # ядро в кэш, чтобы сравнение было честным
+
+    start = time.perf_counter()
+    independent = [core.fit(t, y, args.max_components) for y in Y]
+    t_indep = time.perf_counter() - start
+
+    start = time.perf_counter()
+    series = fit_series(t, Y, args.max_components, core=core)
+    t_series = time.perf_counter() - start
+
+    n_warm = sum(item['warm'] for item in series)
+    print(f"{args.curves} кривых x {args.points} точек")
+    print(f"независимо: {t_indep / args.curves * 1e3:8.1f} мс/кривую")
+    print(f"серия:      {t_series / args.curves * 1e3:8.1f} мс/кривую  (тёплый старт {n_warm}/{args.curves}, "
+          f"ускорение x{t_indep / t_series:.1f})")
+
+    # Согласие с независимыми расчётами: невязка, число компонент, T2/доли при совпадающем числе
+    rms_indep = np.array([np.sqrt(np.mean(r[2]**2)) for r in independent])
+    rms_series = np.array([item['rms'] for item in series])
+    same_n = sum(len(a['results']) == len(b[0]) for a, b in zip(series, independent))
+    d_t2, d_share = [], []
+    for a, b in zip(series, independent):
+        if len(a['results']) == len(b[0]):
+            d_t2 += [abs(np.log(p['T2'] / q['T2'])) for p, q in zip(a['results'], b[0])]
+            d_share += [abs(p['Share'] - q['Share']) for p, q in zip(a['results'], b[0])]
+    n_tracks_series = max(max(item['tracks']) for item in series) + 1
+    n_tracks_indep = track_components([{'results': r[0]} for r in independent])
+    print(f"невязка серия/независимо: медиана {np.median(rms_series / rms_indep):.4f}, "
+          f"макс {np.max(rms_series / rms_indep):.4f}")
+    print(f"то же число компонент: {same_n}/{args.curves}; треков: серия {n_tracks_series}, "
+          f"независимо {n_tracks_indep}")
+    if d_t2:
+        print(f"при том же числе: T2 медиана {np.median(d_t2) * 100:.2f}%, макс {np.max(d_t2) * 100:.2f}%; "
+              f"доли медиана {np.median(d_share) * 100:.2f} п.п., макс {np.max(d_share) * 100:.2f} п.п.")
+    err_series = [truth_error(item['results'], t2) for item, t2 in zip(series, T2)]
+    err_indep = [truth_error(r[0], t2) for r, t2 in zip(independent, T2)]
+    print(f"ошибка T2 относительно истинных: серия {np.median(err_series) * 100:.2f}%, "
+          f"независимо {np.median(err_indep) * 100:.2f}% (медиана)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+# Нагрузка на локальный сервис расчёта (python -m nmr serve): открытый поток запросов
+# (пуассоновский, заданная частота), задержки p50/p99 на стороне клиента, отказы 503,
+# средний размер пакета по /metrics. Для сравнения - без пакетирования (--max-batch 32 1).
+# Запуск: python benchmarks/bench_service.py [--rates 2 5 10 20] [--duration 20] [--points 2000] [--workers 1]
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from nmr.synthetic import synthetic_cpmg
+
+
+def start_server(port, workers, max_batch, max_queue):
+    proc = subprocess.Popen([sys.executable, '-m', 'nmr', 'serve', '--port', str(port), '-w', str(workers),
+                             '--max-batch', str(max_batch), '--max-queue', str(max_queue), '--no-result-cache'],
+                            cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    for _ in range(300):
+        if proc.poll() is not None:
+            raise RuntimeError(f"Сервис завершился (код {proc.returncode}): порт {port} занят?")
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1).read()
+            return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("Сервис не запустился")
+
+
+def metrics(port):
+    return json.loads(urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=10).read())
+
+
+def post(port, body):
+    start = time.perf_counter()
+    request = urllib.request.Request(f"http://127.0.0.1:{port}/fit", data=body,
+                                     headers={'Content-Type': 'application/json'})
+    try:
+        urllib.request.urlopen(request, timeout=600).read()
+        status = 200
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except OSError:
+        status = 0
+    return status, time.perf_counter() - start
+
+
+def run_rate(port, bodies, rate, duration, seed=0):
+    # Открытая нагрузка: время отправки не зависит от ответов (как у независимых клиентов)
+    rng = np.random.default_rng(seed)
+    arrivals = np.cumsum(rng.exponential(1 / rate, int(rate * duration * 1.5) + 10))
+    arrivals = arrivals[arrivals < duration]
+    results, lock = [], threading.Lock()
+
+    def one(body):
+        out = post(port, body)
+        with lock:
+            results.append(out)
+
+    before = metrics(port)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=512) as pool:
+        for k, at in enumerate(arrivals):
+            delay = start + at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(one, bodies[k % len(bodies)])
+    elapsed = time.perf_counter() - start
+    after = metrics(port)
+    ok = np.array([lat for status, lat in results if status == 200]) * 1e3
+    batches = after['batches'] - before['batches']
+    return {'rate': rate, 'sent': len(arrivals), 'ok': len(ok), 'rejected': sum(s == 503 for s, _ in results),
+            'errors': sum(s not in (200, 503) for s, _ in results), 'throughput': len(ok) / elapsed,
+            'p50': float(np.percentile(ok, 50)) if len(ok) else float('nan'),
+            'p99': float(np.percentile(ok, 99)) if len(ok) else float('nan'),
+            'mean_batch': (after['completed'] - before['completed']) / batches if batches else 0.0}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rates', type=float, nargs='+', default=[2, 5, 10, 20], help="запросов в секунду")
+    parser.add_argument('--duration', type=float, default=20.0, help="секунд на каждую частоту")
+    parser.add_argument('--points', type=int, default=2000)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--max-batch', type=int, nargs='+', default=[32, 1])
+    parser.add_argument('--max-queue', type=int, default=256)
+    parser.add_argument('--port', type=int, default=8799)
+    args = parser.parse_args()
+
+    # Разные кривые с общей осью времени (серия образцов на одном приборе)
+    curves = [synthetic_cpmg(n_points=args.points, t2=(0.01, 0.1, 0.5), shares=(0.2, 0.5, 0.3), noise=0.005,
+                             seed=s) for s in range(64)]
+    bodies = [json.dumps({'t': t.tolist(), 'y': y.tolist(), 'max_components': 4}).encode() for t, y in curves]
+
+    print(f"{args.points} точек, процессов {args.workers}, {args.duration:g} с на частоту")
+    print(f"{'пакет':>6} {'запр/с':>7} {'отпр.':>6} {'ок':>6} {'503':>5} {'ошиб.':>6} {'выполн/с':>9} "
+          f"{'p50, мс':>9} {'p99, мс':>9} {'ср. пакет':>10}")
+    for max_batch in args.max_batch:
+        proc = start_server(args.port, args.workers, max_batch, args.max_queue)
+        try:
+            # Прогрев: первое ядро для этой оси времени в процессе-воркере
+            post(args.port, bodies[0])
+            for rate in args.rates:
+                r = run_rate(args.port, bodies, rate, args.duration)
+                print(f"{max_batch:>6} {rate:>7g} {r['sent']:>6} {r['ok']:>6} {r['rejected']:>5} {r['errors']:>6} "
+                      f"{r['throughput']:>9.1f} {r['p50']:>9.1f} {r['p99']:>9.1f} {r['mean_batch']:>10.2f}",
+                      flush=True)
+        finally:
+            proc.terminate()
+            proc.wait()
+
+
+if __name__ == '__main__':
+    main()
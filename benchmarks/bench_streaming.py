@@ -0,0 +1,51 @@
+# Время обновления при поступлении порции эхо: StreamingFit против полного пересчёта NMRCore.fit
+# по всем накопленным точкам. Запуск: python benchmarks/bench_streaming.py --points 200000 --chunk 2000
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nmr import NMRCore
+from nmr.streaming import StreamingFit
+from nmr.synthetic import synthetic_cpmg
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--points', type=int, default=200000)
+    parser.add_argument('--chunk', type=int, default=2000)
+    parser.add_argument('--t-end', type=float, default=4.0)
+    parser.add_argument('--reports', type=int, default=8, help="сколько строк таблицы вывести")
+    parser.add_argument('--max-components', type=int, default=4)
+    args = parser.parse_args()
+
+    t, y = synthetic_cpmg(n_points=args.points, t_end=args.t_end, seed=0)
+    sf = StreamingFit(args.max_components)
+    core = NMRCore()
+    report_every = max(1, args.points // args.chunk // args.reports)
+
+    print(f"{'точек':>8} {'поток, мс':>10} {'полный, мс':>11}   компоненты (поток)")
+    latencies = []
+    for k, i in enumerate(range(0, args.points, args.chunk)):
+        start = time.perf_counter()
+        sf.add(t[i:i + args.chunk], y[i:i + args.chunk])
+        results, _, _ = sf.solve()
+        latencies.append(time.perf_counter() - start)
+        if (k + 1) % report_every == 0:
+            n = sf.n_points
+            start = time.perf_counter()
+            core.fit(t[:n], y[:n], args.max_components)
+            full = time.perf_counter() - start
+            comps = " ".join(f"{r['T2']*1000:.1f}мс/{r['Share']*100:.0f}%" for r in results)
+            print(f"{n:>8} {latencies[-1]*1e3:>10.1f} {full*1e3:>11.1f}   {comps}")
+    lat = np.array(latencies) * 1e3
+    print(f"Обновление: медиана {np.median(lat):.1f} мс, 95% {np.percentile(lat, 95):.1f} мс, "
+          f"макс {lat.max():.1f} мс ({len(lat)} порций)")
+
+
+if __name__ == '__main__':
+    main()
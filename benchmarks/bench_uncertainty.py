@@ -0,0 +1,52 @@
+# Масштабирование бутстрепа по числу процессов: время, ускорение и эффективность.
+# Запуск: python benchmarks/bench_uncertainty.py --resamples 400 --points 5000 --workers 1 2 4 8
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nmr import NMRCore
+from nmr.synthetic import synthetic_cpmg
+from nmr.uncertainty import bootstrap
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--resamples', type=int, default=400)
+    parser.add_argument('--points', type=int, default=5000)
+    parser.add_argument('--workers', type=int, nargs='+', default=None,
+                        help="по умолчанию 1, 2, 4, ... до числа ядер")
+    parser.add_argument('--max-components', type=int, default=3)
+    args = parser.parse_args()
+
+    n_cpu = os.cpu_count() or 1
+    workers_list = args.workers or sorted({min(2**k, n_cpu) for k in range(n_cpu.bit_length() + 1)})
+    t, y = synthetic_cpmg(n_points=args.points, seed=0)
+    fit = NMRCore().fit(t, y, args.max_components)
+    print(f"{args.resamples} копий x {args.points} точек, {len(fit[0])} компоненты, ядер: {n_cpu}")
+    print(f"{'процессов':>10} {'время, с':>9} {'ускорение':>10} {'эффект.':>8}")
+
+    base, reference = None, None
+    for workers in workers_list:
+        start = time.perf_counter()
+        res = bootstrap(t, y, fit, args.resamples, workers=workers)
+        elapsed = time.perf_counter() - start
+        base = base or elapsed * workers_list[0]
+        print(f"{workers:>10} {elapsed:>9.2f} {base / elapsed:>10.2f} {base / elapsed / workers:>8.0%}")
+        # Копии генерируются по номеру, поэтому интервалы не зависят от числа процессов
+        if reference is None:
+            reference = res
+        elif not np.allclose(np.sort(res['T2'], axis=0), np.sort(reference['T2'], axis=0)):
+            print("  ВНИМАНИЕ: результаты отличаются от первого запуска")
+
+    for i, c in enumerate(reference['components']):
+        print(f"T2_{i + 1} = {fit[0][i]['T2']:.4f} [{c['T2'][0]:.4f}; {c['T2'][1]:.4f}], "
+              f"доля {fit[0][i]['Share'] * 100:.2f} [{c['Share'][0] * 100:.2f}; {c['Share'][1] * 100:.2f}] %")
+
+
+if __name__ == '__main__':
+    main()
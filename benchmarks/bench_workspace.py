@@ -0,0 +1,99 @@
+# Рабочая область на сотни наборов: добавление (только метаданные), первое открытие (разбор текста),
+# повторное переключение, открытие после вытеснения (отображение кэша в память) и пиковая память
+# против варианта "всё загружено сразу". Каждый вариант - в отдельном процессе.
+# Запуск: python benchmarks/bench_workspace.py [--files 200] [--points 50000] [--budget-mb 64]
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def ms(values):
+    return f"{np.median(values) * 1e3:.3f}"
+
+
+def child(folder, mode, budget_mb):
+    from nmr.io import load_curves
+    from nmr.workspace import Workspace
+
+    files = sorted(os.path.join(folder, f) for f in os.listdir(folder) if f.endswith('.txt'))
+    base = peak_rss_mb()
+    if mode == 'eager':
+        # Все массивы в памяти процесса, как при загрузке каждого файла целиком
+        start = time.perf_counter()
+        data = [tuple(np.array(a) for a in load_curves(path)) for path in files]
+        print(f"eager {time.perf_counter() - start:.3f} {peak_rss_mb() - base:.1f} {len(data)}")
+        return
+
+    ws = Workspace(max_bytes=budget_mb * 2**20)
+    start = time.perf_counter()
+    for path in files:
+        ws.add(path)
+    t_add = (time.perf_counter() - start) / len(files)
+    first, hit, reload = [], [], []
+    for ds in ws.datasets:
+        start = time.perf_counter()
+        ws.curve(ds)
+        first.append(time.perf_counter() - start)
+    for ds in ws.datasets[-5:]:
+        start = time.perf_counter()
+        ws.curve(ds)
+        hit.append(time.perf_counter() - start)
+    for ds in ws.datasets[:5]:
+        start = time.perf_counter()
+        ws.curve(ds)
+        reload.append(time.perf_counter() - start)
+    stats = ws.stats()
+    print(f"workspace {t_add * 1e3:.3f} {ms(first)} {ms(hit)} {ms(reload)} {peak_rss_mb() - base:.1f} "
+          f"{stats['nbytes'] / 2**20:.1f} {stats['shared_axes']} {stats['evictions']}")
+
+
+def run(folder, mode, budget_mb):
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', folder, mode, str(budget_mb)],
+                         capture_output=True, text=True, check=True)
+    return out.stdout.split()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--files', type=int, default=200)
+    parser.add_argument('--points', type=int, default=50000)
+    parser.add_argument('--budget-mb', type=int, default=64, help="предел памяти массивов рабочей области")
+    parser.add_argument('--child', nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child[0], args.child[1], int(args.child[2]))
+        return
+
+    from nmr.synthetic import synthetic_cpmg
+
+    with tempfile.TemporaryDirectory() as folder:
+        # Общая ось времени у всех файлов (одна серия измерений)
+        for k in range(args.files):
+            t, y = synthetic_cpmg(n_points=args.points, t2=(0.01, 0.1 * (1 + k / args.files), 0.5),
+                                  shares=(0.2, 0.5, 0.3), noise=0.005, seed=k)
+            np.savetxt(os.path.join(folder, f"sample{k:04d}.txt"), np.column_stack([t, y]), fmt='%.9g')
+        size = args.files * args.points * 16 / 2**20
+        print(f"{args.files} файлов по {args.points} точек ({size:.0f} МБ массивов), предел {args.budget_mb} МБ")
+
+        _, t_add, first, hit, reload, rss, nbytes, axes, evictions = run(folder, 'workspace', args.budget_mb)
+        print(f"рабочая область: добавление {t_add} мс/файл, первое открытие {first} мс, "
+              f"переключение {hit} мс, после вытеснения {reload} мс (медианы)")
+        print(f"  +пиковый RSS {rss} МБ, в памяти {nbytes} МБ, общих осей времени {axes}, вытеснено {evictions}")
+        _, elapsed, rss, _ = run(folder, 'eager', args.budget_mb)
+        print(f"всё сразу: загрузка {float(elapsed):.2f} с, +пиковый RSS {rss} МБ")
+
+
+if __name__ == '__main__':
+    main()
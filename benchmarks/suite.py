@@ -0,0 +1,194 @@
+# Набор тестов скорости и точности NMRCore.fit на синтетических CPMG (без PyQt).
+# Время по этапам (ядро, NNLS, пики, уточнение) и ошибки восстановленных T2/долей пишутся в JSON.
+# Запуск:   python benchmarks/suite.py --preset quick -o results.json
+# Сравнение: python benchmarks/suite.py --compare old.json new.json
+# Фиксированная сетка T2 против адаптивной:
+#   python benchmarks/suite.py -o fixed.json && python benchmarks/suite.py --grid adaptive -o adaptive.json
+#   python benchmarks/suite.py --compare fixed.json adaptive.json
+import argparse
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+import scipy
+from scipy.optimize import linear_sum_assignment
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nmr import NMRCore
+from nmr.synthetic import synthetic_cpmg
+
+SPECTRA = {
+    'three': {'t2': (0.01, 0.1, 0.5), 'shares': (0.2, 0.5, 0.3)},
+    'two': {'t2': (0.02, 0.3), 'shares': (0.6, 0.4)},
+    'close': {'t2': (0.05, 0.1), 'shares': (0.5, 0.5)},
+    'minor': {'t2': (0.005, 0.05, 0.8), 'shares': (0.05, 0.75, 0.2)},
+}
+PRESETS = {
+    'quick': {'points': [1000, 10000], 'noise': [0.001, 0.01], 'offset': [0.0], 'spectra': ['three', 'two'],
+              'repeats': 2},
+    'standard': {'points': [1000, 10000, 100000], 'noise': [0.001, 0.005, 0.02], 'offset': [0.0, 0.02],
+                 'spectra': list(SPECTRA), 'repeats': 3},
+    'full': {'points': [1000, 10000, 100000, 1000000], 'noise': [0.001, 0.005, 0.02], 'offset': [0.0, 0.02],
+             'spectra': list(SPECTRA), 'repeats': 3},
+}
+STAGES = ['kernel', 'nnls', 'peaks', 'refine']
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'describe', '--always', '--dirty'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ''
+    return {'commit': commit, 'python': platform.python_version(), 'numpy': np.__version__,
+            'scipy': scipy.__version__, 'platform': platform.platform(), 'cpu_count': os.cpu_count(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+
+def timed_fit(core, t, y, max_components):
+    # Границы этапов - по первому вызову progress с новым этапом
+    marks = []
+
+    def progress(stage, value):
+        if not marks or marks[-1][0] != stage:
+            marks.append((stage, time.perf_counter()))
+
+    diag = {}
+    start = time.perf_counter()
+    fit = core.fit(t, y, max_components, progress=progress, diagnostics=diag)
+    end = time.perf_counter()
+    times = dict.fromkeys(STAGES, 0.0)
+    for (stage, t0), (_, t1) in zip(marks, marks[1:] + [(None, end)]):
+        times[stage] = times.get(stage, 0.0) + t1 - t0
+    times['total'] = end - start
+    return fit, times, diag
+
+
+def accuracy(results, t2_true, shares_true):
+    # Сопоставление найденных компонент с истинными по |ln T2| (венгерский алгоритм)
+    shares_true = np.asarray(shares_true) / np.sum(shares_true)
+    if not results:
+        return {'n_found': 0, 'n_missing': len(t2_true), 'n_extra': 0, 't2_err': None, 'share_err': None}
+    found_t2 = np.array([r['T2'] for r in results])
+    found_share = np.array([r['Share'] for r in results])
+    cost = np.abs(np.log(found_t2[:, np.newaxis] / np.asarray(t2_true)))
+    rows, cols = linear_sum_assignment(cost)
+    return {'n_found': len(results), 'n_missing': len(t2_true) - len(rows), 'n_extra': len(results) - len(rows),
+            't2_err': float(np.max(np.abs(found_t2[rows] / np.asarray(t2_true)[cols] - 1))),
+            'share_err': float(np.max(np.abs(found_share[rows] - shares_true[cols])))}
+
+
+def run_case(n_points, noise, offset, spectrum, seed, max_components, refine_method, grid='fixed'):
+    spec = SPECTRA[spectrum]
+    t, y = synthetic_cpmg(n_points=n_points, t2=spec['t2'], shares=spec['shares'], offset=offset,
+                          noise=noise, seed=seed)
+    case = {'n_points': n_points, 'noise': noise, 'offset': offset, 'spectrum': spectrum, 'seed': seed}
+    try:
+        # Новый NMRCore на каждый случай: ядро строится заново и попадает в замер
+        fit, times, diag = timed_fit(NMRCore(refine_method=refine_method, grid=grid), t, y, max_components)
+    except MemoryError:
+        return dict(case, error='MemoryError')
+    results, _, diff_norm, offset_norm, _ = fit
+    return dict(case, times=times, grid_size=diag['grid_size'], nfev=diag.get('nfev', 0), rms=float(np.sqrt(np.mean(diff_norm**2))),
+                offset_err=float(offset_norm - offset / (1 + offset)),
+                **accuracy(results, spec['t2'], spec['shares']))
+
+
+def summarize(cases):
+    # Медианы по повторам и спектрам для каждого (точек, шум)
+    groups = {}
+    for c in cases:
+        if 'error' not in c:
+            groups.setdefault((c['n_points'], c['noise']), []).append(c)
+    rows = []
+    for (n_points, noise), group in sorted(groups.items()):
+        t2_err = [c['t2_err'] for c in group if c['t2_err'] is not None]
+        rows.append({'n_points': n_points, 'noise': noise, 'n': len(group),
+                     **{s: float(np.median([c['times'][s] for c in group])) for s in STAGES + ['total']},
+                     'nfev': float(np.median([c.get('nfev', 0) for c in group])),
+                     't2_err': float(np.median(t2_err)) if t2_err else None,
+                     'share_err': float(np.median([c['share_err'] for c in group if c['share_err'] is not None]
+                                                  or [np.nan])),
+                     'wrong_count': sum(c['n_missing'] + c['n_extra'] > 0 for c in group)})
+    return rows
+
+
+def print_summary(rows):
+    print(f"{'точек':>8} {'шум':>6} " + " ".join(f"{s:>8}" for s in STAGES + ['total'])
+          + f" {'nfev':>5} {'ошибка T2':>10} {'ошибка доли':>12} {'не то число':>12}   (время - мс, медиана)")
+    for r in rows:
+        t2 = f"{r['t2_err'] * 100:.2f}%" if r['t2_err'] is not None else '-'
+        print(f"{r['n_points']:>8} {r['noise']:>6g} " + " ".join(f"{r[s] * 1e3:>8.1f}" for s in STAGES + ['total'])
+              + f" {r['nfev']:>5.0f} {t2:>10} {r['share_err'] * 100:>10.2f}пп {r['wrong_count']:>7}/{r['n']}")
+
+
+def compare(old_path, new_path):
+    with open(old_path, encoding='utf-8') as fh:
+        old = json.load(fh)
+    with open(new_path, encoding='utf-8') as fh:
+        new = json.load(fh)
+    print(f"было:  {old['environment']['commit']} ({old['environment']['timestamp']})")
+    print(f"стало: {new['environment']['commit']} ({new['environment']['timestamp']})")
+    old_rows = {(r['n_points'], r['noise']): r for r in old['summary']}
+    print(f"{'точек':>8} {'шум':>6} " + " ".join(f"{s:>8}" for s in STAGES + ['total'])
+          + f" {'T2 было':>9} {'T2 стало':>9}   (время: стало/было)")
+    for r in new['summary']:
+        o = old_rows.get((r['n_points'], r['noise']))
+        if o is None:
+            continue
+        ratios = " ".join(f"{r[s] / o[s]:>8.2f}" if o[s] > 0 else f"{'-':>8}" for s in STAGES + ['total'])
+        err = lambda v: f"{v * 100:.2f}%" if v is not None else '-'
+        print(f"{r['n_points']:>8} {r['noise']:>6g} {ratios} {err(o['t2_err']):>9} {err(r['t2_err']):>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--preset', choices=list(PRESETS), default='quick')
+    parser.add_argument('--points', type=int, nargs='+', help="число эхо (заменяет набор из пресета)")
+    parser.add_argument('--noise', type=float, nargs='+')
+    parser.add_argument('--offset', type=float, nargs='+')
+    parser.add_argument('--spectra', nargs='+', choices=list(SPECTRA))
+    parser.add_argument('--repeats', type=int)
+    parser.add_argument('--max-components', type=int, default=4)
+    parser.add_argument('--refine', choices=['full', 'varpro'], default='full')
+    parser.add_argument('--grid', choices=['fixed', 'adaptive'], default='fixed', help="сетка T2 для NNLS")
+    parser.add_argument('-o', '--output', default=None, help="JSON с результатами (по умолчанию suite-<время>.json)")
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help="сравнить два файла результатов")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    cfg = dict(PRESETS[args.preset])
+    for key in ('points', 'noise', 'offset', 'spectra', 'repeats'):
+        if getattr(args, key) is not None:
+            cfg[key] = getattr(args, key)
+    grid = list(itertools.product(cfg['points'], cfg['noise'], cfg['offset'], cfg['spectra'], range(cfg['repeats'])))
+
+    cases = []
+    for k, (n_points, noise, offset, spectrum, seed) in enumerate(grid, start=1):
+        case = run_case(n_points, noise, offset, spectrum, seed, args.max_components, args.refine, args.grid)
+        cases.append(case)
+        status = case.get('error') or f"{case['times']['total'] * 1e3:.1f} мс"
+        print(f"[{k}/{len(grid)}] {n_points} точек, шум {noise}, смещение {offset}, {spectrum}: {status}",
+              file=sys.stderr)
+
+    summary = summarize(cases)
+    print_summary(summary)
+    output = args.output or f"suite-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    with open(output, 'w', encoding='utf-8') as fh:
+        json.dump({'environment': environment(), 'config': dict(cfg, preset=args.preset,
+                   max_components=args.max_components, refine=args.refine, grid=args.grid),
+                   'summary': summary, 'cases': cases}, fh, indent=1)
+    print(f"-> {output}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
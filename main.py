@@ -4,77 +4,441 @@ from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                              QHBoxLayout, QPushButton, QTableWidget, 
                              QTableWidgetItem, QLabel, QFileDialog, QLineEdit, 
                              QDialog, QFormLayout, QMessageBox, QFrame, QComboBox, QTabWidget,
-                             QDoubleSpinBox, QTextEdit, QScrollArea)
-from PyQt6.QtCore import Qt
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+                             QDoubleSpinBox, QTextEdit, QScrollArea, QProgressBar, QListWidget,
+                             QAbstractItemView, QCheckBox)
+from PyQt6.QtCore import Qt, QObject, QThread, QTimer, pyqtSignal
+import matplotlib
+from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
-import matplotlib.pyplot as plt
-from scipy.optimize import nnls, least_squares
+import copy
 import os
+import time
+
+from nmr import FitCancelled, NMRCore
+from nmr.diagnostics import format_diagnostics
+from nmr.inversion2d import AXIS_LABELS, invert_2d
+from nmr.io import load_matrix
+from nmr.decimate import lttb_indices, minmax_indices
+from nmr.model import multiexp
+from nmr.reduce import REDUCE_RATIO
+from nmr.report import PLOT_STYLE, component_text, report_data, run_reports, save_report
+from nmr.results import open_store
+from nmr.selection import best_order
+from nmr.streaming import StreamingFit, follow_file, run_stream
+from nmr.uncertainty import bootstrap
+from nmr.workspace import Workspace, compare
 
 # === Стиль графиков "как в Origin" ===
-plt.rcParams.update({
-    'font.family': 'Arial',
-    'font.size': 10,
-    'axes.grid': True,
-    'grid.alpha': 0.3,
-    'axes.linewidth': 1.2,
-    'xtick.direction': 'in',
-    'ytick.direction': 'in',
-    'xtick.major.size': 5,
-    'xtick.minor.visible': True,
-    'ytick.minor.visible': True,
-    'legend.frameon': False,
-    'lines.markersize': 4,
-    'lines.markeredgewidth': 0.8
-})
-
-class NMRCore:
-    def fit(self, t, y, max_components=4):
-        y_max = np.max(y)
-        y_norm = y / y_max
-        dt = t[1] - t[0]
-        
-        t2_grid = np.logspace(np.log10(max(1e-7, dt)), np.log10(t[-1]), 150)
-        K = np.exp(-t[:, np.newaxis] / t2_grid)
-        amps_grid, _ = nnls(K, y_norm)
-        
-        peaks = []
-        for i in range(1, len(amps_grid) - 1):
-            if amps_grid[i] > amps_grid[i-1] and amps_grid[i] > amps_grid[i+1]:
-                if amps_grid[i] > np.max(amps_grid) * 0.01:
-                    peaks.append([amps_grid[i], t2_grid[i]])
-        
-        peaks = sorted(peaks, key=lambda x: x[0], reverse=True)[:max_components]
-        n = len(peaks)
-        if n == 0: return [], y, np.zeros_like(y), 0.0, 1.0
-        
-        x0 = [p[0] for p in peaks] + [p[1] for p in peaks] + [0.0]
-        
-        def model_func(p, t_ax):
-            n_c = (len(p)-1)//2
-            a, t2, off = p[:n_c], p[n_c:2*n_c], p[-1]
-            return sum(a[i]*np.exp(-t_ax/t2[i]) for i in range(n_c)) + off
-
-        res = least_squares(lambda p: model_func(p, t) - y_norm, x0, 
-                           bounds=([0]*n + [dt/5]*n + [-0.1], [2]*n + [t[-1]*2]*n + [0.1]))
-        
-        y_f_n = model_func(res.x, t)
-        n_c = (len(res.x)-1)//2
-        sum_a = np.sum(res.x[:n_c])
-        results = [{'T2': res.x[n_c+i], 'Share': res.x[i]/sum_a if sum_a > 0 else 0} for i in range(n_c)]
-        
-        offset_norm = res.x[-1]
-        return sorted(results, key=lambda x: x['T2']), y_f_n * y_max, (y_norm - y_f_n), offset_norm, sum_a
+# Без pyplot: его импорт (глобальное состояние, выбор backend) не нужен ни окну, ни отчёту.
+# Расчётный пакет nmr не зависит от Qt и matplotlib, scipy подгружается при первом расчёте
+matplotlib.rcParams.update(PLOT_STYLE)
+
+# === Фоновые задачи (расчёт вне потока GUI) ===
+class TaskWorker(QObject):
+    progress = pyqtSignal(str, int)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+    def __init__(self, func, *args, **kwargs):
+        super().__init__()
+        self.func, self.args, self.kwargs = func, args, kwargs
+        self._cancel = False
+
+    def cancel(self):
+        self._cancel = True
+
+    def report(self, stage, value=0):
+        if self._cancel:
+            raise FitCancelled()
+        self.progress.emit(stage, value)
+
+    def run(self):
+        try:
+            result = self.func(*self.args, progress=self.report, **self.kwargs)
+        except FitCancelled:
+            self.cancelled.emit()
+        except Exception as e:
+            self.failed.emit(str(e))
+        else:
+            self.finished.emit(result)
+
+
+class StreamWorker(TaskWorker):
+    # Слежение за дописываемым файлом: снимки данных и решения не чаще раза в interval секунд
+    updated = pyqtSignal(object)
+
+    def __init__(self, path, max_components, interval=0.25):
+        super().__init__(None, path)
+        self.path, self.max_components, self.interval = path, max_components, interval
+        self._t = self._y = np.empty(0)
+        self._n = 0
+
+    def record(self, chunks):
+        # Полные данные для графика - в буфере с удвоением ёмкости
+        for t, y in chunks:
+            n = self._n + len(t)
+            if n > len(self._t):
+                cap = max(n, 2 * len(self._t), 4096)
+                self._t, self._y = (np.r_[a[:self._n], np.empty(cap - self._n)] for a in (self._t, self._y))
+            self._t[self._n:n] = t
+            self._y[self._n:n] = y
+            self._n = n
+            yield t, y
+
+    def emit_update(self, sf):
+        if self._n < 2: return
+        # Время в буфере как в файле; масштаб (мкс -> с) определён по первой порции
+        self.updated.emit({'t': self._t[:self._n] * sf.time_scale, 'y': self._y[:self._n], 'y_max': sf.y_max,
+                           'x': None if sf.x is None else sf.x.copy(), 'results': list(sf.results),
+                           'offset_norm': sf.offset_norm, 'amp_scale': sf.amp_scale})
+
+    def run(self):
+        try:
+            sf = StreamingFit(self.max_components)
+            chunks = follow_file(self.path, stop=lambda: self._cancel)
+            run_stream(self.record(chunks), sf, self.interval, self.emit_update)
+        except Exception as e:
+            self.failed.emit(str(e))
+        else:
+            self.finished.emit(None)
+
+
+FIT_STAGES = {
+    'kernel': ("Построение ядра...", 5),
+    'nnls': ("NNLS-спектр T2...", 15),
+    'peaks': ("Поиск пиков...", 45),
+    'refine': ("Уточнение (least_squares)", 50),
+    'distribution': ("Распределение T2...", 96),
+    'bootstrap': ("Доверительные интервалы", 0),
+    'orders': ("Уточнение моделей", 50),
+}
+N_RESAMPLES = 200
+
+DIST_METHODS = {"GCV": 'gcv', "L-кривая": 'lcurve', "Нет": None}
+# Пункт "Авто" в выборе числа компонент: сравнение моделей 1..MAX_COMPONENTS за один расчёт
+AUTO_COMPONENTS = "Авто"
+MAX_COMPONENTS = 6
+ORDER_CRITERIA = {"BIC": 'bic', "AIC": 'aic', "F-тест": 'f'}
+
+
+# === 2D-инверсия (T1-T2, D-T2) в отдельном окне ===
+KIND1_NAMES = {"T1 (инверсия-восстановление)": 'T1_ir', "T1 (насыщение-восстановление)": 'T1_sr',
+               "D (диффузия, ось - b)": 'D'}
+MAX_ITER_2D = 5000
+
+
+class Map2DDialog(QDialog):
+    def __init__(self, app):
+        super().__init__(app)
+        self.app = app
+        self.setWindowTitle("2D-инверсия")
+        self.resize(900, 700)
+        self.data = self.result = None
+        self.load_worker = self.calc_worker = None
+
+        layout = QVBoxLayout(self)
+        row = QHBoxLayout()
+        self.btn_load = QPushButton("📂 Загрузить матрицу")
+        self.btn_load.setToolTip("Первая строка - времена эхо, первый столбец - tau (или b), угол не используется")
+        self.btn_load.clicked.connect(self.load)
+        row.addWidget(self.btn_load)
+        row.addWidget(QLabel("Первая ось:"))
+        self.kind_box = QComboBox()
+        self.kind_box.addItems(list(KIND1_NAMES))
+        row.addWidget(self.kind_box)
+        self.btn_run = QPushButton("🚀 Расчёт")
+        self.btn_run.clicked.connect(self.run)
+        row.addWidget(self.btn_run)
+        self.progress = QProgressBar()
+        self.progress.setRange(0, MAX_ITER_2D)
+        row.addWidget(self.progress)
+        self.btn_cancel = QPushButton("✖")
+        self.btn_cancel.clicked.connect(lambda: self.calc_worker and self.calc_worker.cancel())
+        row.addWidget(self.btn_cancel)
+        layout.addLayout(row)
+        self.info = QLabel("Загрузите 2D-данные")
+        layout.addWidget(self.info)
+
+        self.fig = Figure(tight_layout=True)
+        self.canvas = FigureCanvas(self.fig)
+        layout.addWidget(self.canvas, 1)
+        self.set_busy(False)
+
+    def set_busy(self, busy):
+        for btn in (self.btn_load, self.btn_run):
+            btn.setEnabled(not busy)
+        self.progress.setVisible(busy)
+        self.btn_cancel.setVisible(busy)
+
+    def load(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Открыть 2D-данные", "", "Данные (*.txt *.nmr)")
+        if not path: return
+        self.load_worker = TaskWorker(load_matrix, path)
+        self.set_busy(True)
+        self.info.setText("Загрузка...")
+        self.app.start_task(self.load_worker, self.on_loaded, self.on_failed)
+
+    def on_loaded(self, data):
+        self.load_worker = None
+        self.set_busy(False)
+        self.data, self.result = data, None
+        axis1, axis2, M = data
+        self.info.setText(f"Матрица {M.shape[0]} x {M.shape[1]} ({M.nbytes / 2**20:.1f} МБ)")
+        self.draw()
+
+    def run(self):
+        if self.data is None or self.calc_worker is not None: return
+        kind1 = KIND1_NAMES[self.kind_box.currentText()]
+        self.calc_worker = TaskWorker(invert_2d, *self.data, kind1=kind1, max_iter=MAX_ITER_2D)
+        self.set_busy(True)
+        self.progress.setValue(0)
+        self.info.setText("Расчёт...")
+        self.app.start_task(self.calc_worker, self.on_done, self.on_failed,
+                            lambda stage, value: self.progress.setValue(value if stage == 'inversion' else 0),
+                            self.on_cancelled)
+
+    def on_done(self, result):
+        self.calc_worker = None
+        self.set_busy(False)
+        self.result = result
+        self.info.setText(f"Ранг сжатия {result['rank'][0]} x {result['rank'][1]}, α = {result['alpha']:.3g} (GCV), "
+                          f"итераций {result['n_iter']}, невязка (СКО) {result['rms']:.4g}")
+        self.draw()
+
+    def on_cancelled(self):
+        self.calc_worker = None
+        self.set_busy(False)
+        self.info.setText("Расчёт отменён")
+
+    def on_failed(self, message):
+        self.load_worker = self.calc_worker = None
+        self.set_busy(False)
+        self.info.setText("Ошибка")
+        QMessageBox.critical(self, "Ошибка", message)
+
+    def draw(self):
+        self.fig.clear()
+        ax = self.fig.add_subplot(111)
+        if self.result is None:
+            # До расчёта - сами данные: строки по первой оси, эхо по второй
+            axis1, axis2, M = self.data
+            step = max(1, M.shape[1] // 2000)
+            mesh = ax.pcolormesh(axis2[::step], axis1, M[:, ::step], shading='auto', cmap='RdBu_r')
+            ax.set_yscale('log')
+            ax.set_xlabel("Время (с)", fontsize=11)
+            ax.set_ylabel("Первая ось (tau или b)", fontsize=11)
+        else:
+            r = self.result
+            mesh = ax.pcolormesh(r['grid2'], r['grid1'], r['F'], shading='auto', cmap='viridis')
+            ax.contour(r['grid2'], r['grid1'], r['F'], levels=6, colors='w', linewidths=0.6)
+            ax.set_xscale('log')
+            ax.set_yscale('log')
+            if r['kind1'] != 'D':
+                lo = max(r['grid1'][0], r['grid2'][0])
+                hi = min(r['grid1'][-1], r['grid2'][-1])
+                ax.plot([lo, hi], [lo, hi], 'w--', lw=1, label="T1 = T2")
+                ax.legend(fontsize=9, labelcolor='w')
+            ax.set_xlabel(AXIS_LABELS[r['kind2']], fontsize=11)
+            ax.set_ylabel(AXIS_LABELS[r['kind1']], fontsize=11)
+        self.fig.colorbar(mesh, ax=ax)
+        self.canvas.draw_idle()
+
+
+# === Сравнение наборов рабочей области ===
+class CompareDialog(QDialog):
+    def __init__(self, app):
+        super().__init__(app)
+        self.app = app
+        self.setWindowTitle("Сравнение наборов")
+        self.resize(1100, 750)
+        self.datasets = []
+        self.worker = None
+
+        layout = QVBoxLayout(self)
+        row = QHBoxLayout()
+        self.info = QLabel("")
+        row.addWidget(self.info, 1)
+        self.fit_missing = QCheckBox("Рассчитать недостающие")
+        self.fit_missing.setChecked(True)
+        row.addWidget(self.fit_missing)
+        self.btn_run = QPushButton("🔄 Обновить")
+        self.btn_run.clicked.connect(self.run)
+        row.addWidget(self.btn_run)
+        self.progress = QProgressBar()
+        row.addWidget(self.progress)
+        self.btn_cancel = QPushButton("✖")
+        self.btn_cancel.clicked.connect(lambda: self.worker and self.worker.cancel())
+        row.addWidget(self.btn_cancel)
+        layout.addLayout(row)
+
+        self.fig = Figure(tight_layout=True)
+        self.canvas = FigureCanvas(self.fig)
+        layout.addWidget(self.canvas, 3)
+        self.table = QTableWidget(0, 0)
+        layout.addWidget(self.table, 2)
+        self.set_busy(False)
+
+    def set_busy(self, busy):
+        self.btn_run.setEnabled(not busy)
+        self.progress.setVisible(busy)
+        self.btn_cancel.setVisible(busy)
+
+    def show_datasets(self, datasets):
+        self.datasets = datasets
+        self.run()
+
+    def run(self):
+        if self.worker is not None or not self.datasets: return
+        self.app.store_dataset_state()
+        self.worker = TaskWorker(compare, self.app.workspace, self.datasets, self.app.core,
+                                 self.app.max_components(), self.fit_missing.isChecked())
+        self.set_busy(True)
+        self.progress.setRange(0, len(self.datasets))
+        self.progress.setValue(0)
+        self.info.setText(f"Наборов: {len(self.datasets)}, подготовка...")
+        self.app.start_task(self.worker, self.on_done, self.on_failed,
+                            lambda stage, value: self.progress.setValue(value), self.on_cancelled)
+
+    def on_done(self, rows):
+        self.worker = None
+        self.set_busy(False)
+        for r in rows:
+            if r['new'] and r['dataset'].params is None:
+                self.app.set_dataset_params(r['dataset'], r['params'])
+        n_new = sum(r['new'] for r in rows)
+        self.info.setText(f"Наборов: {len(rows)}" + (f", рассчитано {n_new}" if n_new else ""))
+        self.draw(rows)
+        self.fill_table(rows)
+
+    def on_cancelled(self):
+        self.worker = None
+        self.set_busy(False)
+        self.info.setText("Отменено")
+
+    def on_failed(self, message):
+        self.worker = None
+        self.set_busy(False)
+        self.info.setText("Ошибка")
+        QMessageBox.critical(self, "Ошибка", message)
+
+    def draw(self, rows):
+        # Слева - нормированные кривые и модели, справа - компоненты: T2 по оси x,
+        # площадь маркера - доля (строка на набор)
+        self.fig.clear()
+        ax1, ax2 = self.fig.subplots(1, 2, gridspec_kw={'width_ratios': [3, 2]})
+        colors = matplotlib.rcParams['axes.prop_cycle'].by_key()['color']
+        for k, r in enumerate(rows):
+            color = colors[k % len(colors)]
+            ax1.semilogy(*r['data'], '.', color=color, ms=2, alpha=0.4)
+            if r['model'] is not None:
+                ax1.semilogy(*r['model'], '-', color=color, lw=1.5, label=r['dataset'].name)
+            results, _, _ = r['dataset'].components()
+            if results:
+                ax2.scatter([c['T2'] for c in results], [k] * len(results),
+                            s=[600 * c['Share'] + 10 for c in results], color=color, alpha=0.7)
+        ax1.set_xlabel("Время (с)", fontsize=11)
+        ax1.set_ylabel("Амплитуда сигнала (норм.)", fontsize=11)
+        if 0 < len(rows) <= 12:
+            ax1.legend(fontsize=8)
+        ax2.set_xscale('log')
+        ax2.set_yticks(range(len(rows)), [r['dataset'].name for r in rows] if len(rows) <= 30 else None)
+        ax2.set_ylim(len(rows) - 0.5, -0.5)
+        ax2.set_xlabel("T2 (с)", fontsize=11)
+        self.canvas.draw_idle()
+
+    def fill_table(self, rows):
+        comps = [r['dataset'].components() for r in rows]
+        n = max((len(c[0]) for c in comps), default=0)
+        headers = ["Набор"] + [h for i in range(n) for h in (f"T2_{i + 1} (с)", f"Доля_{i + 1} (%)")] + ["Смещение"]
+        self.table.clear()
+        self.table.setColumnCount(len(headers))
+        self.table.setHorizontalHeaderLabels(headers)
+        self.table.setRowCount(len(rows))
+        for k, (r, (results, offset_norm, _)) in enumerate(zip(rows, comps)):
+            cells = [r['dataset'].name] + [f"{v:.4g}" for c in results for v in (c['T2'], c['Share'] * 100)]
+            cells += [""] * (2 * (n - len(results)))
+            cells.append(f"{offset_norm:.4f}" if r['dataset'].params is not None else "не рассчитан")
+            for j, text in enumerate(cells):
+                self.table.setItem(k, j, QTableWidgetItem(text))
+        self.table.resizeColumnsToContents()
+
+
+# === Сравнение моделей с разным числом компонент ===
+class OrdersDialog(QDialog):
+    # Строка таблицы - модель; выбранная становится результатом расчёта набора
+    def __init__(self, app):
+        super().__init__(app)
+        self.app = app
+        self.setWindowTitle("Выбор числа компонент")
+        self.resize(900, 320)
+        self.dataset = self.orders = None
+
+        layout = QVBoxLayout(self)
+        row = QHBoxLayout()
+        self.info = QLabel("")
+        row.addWidget(self.info, 1)
+        row.addWidget(QLabel("Критерий:"))
+        self.criterion = QComboBox()
+        self.criterion.addItems(list(ORDER_CRITERIA))
+        self.criterion.setToolTip("BIC и AIC - минимум по остаткам со штрафом за число параметров; "
+                                  "F-тест - компоненты добавляются, пока каждая значима (p < 0,05)")
+        self.criterion.currentIndexChanged.connect(self.select_best)
+        row.addWidget(self.criterion)
+        layout.addLayout(row)
+        self.table = QTableWidget(0, 0)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.itemSelectionChanged.connect(self.on_select)
+        layout.addWidget(self.table)
+
+    def show_orders(self, dataset, orders, elapsed):
+        self.dataset, self.orders = dataset, orders
+        rows = orders['candidates']
+        self.info.setText(f"{dataset.name if dataset is not None else ''}: моделей {len(rows)}, "
+                          f"{elapsed * 1e3:.0f} мс (NNLS один раз)")
+        headers = ["Компонент", "T2 (с)", "Доли (%)", "RMS", "ΔAIC", "ΔBIC", "F", "p"]
+        self.table.blockSignals(True)
+        self.table.clear()
+        self.table.setColumnCount(len(headers))
+        self.table.setHorizontalHeaderLabels(headers)
+        self.table.setRowCount(len(rows))
+        for k, r in enumerate(rows):
+            results = r['fit'][0]
+            cells = [str(r['n_components']), ", ".join(f"{c['T2']:.4g}" for c in results),
+                     ", ".join(f"{c['Share'] * 100:.1f}" for c in results), f"{r['rms']:.3e}",
+                     f"{r['d_aic']:.1f}", f"{r['d_bic']:.1f}",
+                     f"{r['f']:.4g}" if r['f'] is not None else "", f"{r['p_value']:.2g}" if r['p_value'] is not None else ""]
+            for j, text in enumerate(cells):
+                self.table.setItem(k, j, QTableWidgetItem(text))
+        self.table.resizeColumnsToContents()
+        self.table.blockSignals(False)
+        self.select_best()
+
+    def select_best(self):
+        if not self.orders or not self.orders['candidates']: return
+        k = best_order(self.orders['candidates'], ORDER_CRITERIA[self.criterion.currentText()])
+        self.table.selectRow(k - 1)
+
+    def on_select(self):
+        rows = self.table.selectionModel().selectedRows()
+        if not rows or self.orders is None: return
+        self.app.apply_order(self.dataset, self.orders['candidates'][rows[0].row()]['fit'])
+
 
 class NMRApp(QMainWindow):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("ЯМР Анализатор - Мультиэкспоненциальный подбор")
         self.resize(1200, 750)
-        self.core = NMRCore()
+        # NMR_PROFILE_LOG=путь - журнал профилирования расчётов (JSON lines)
+        # Готовые результаты хранятся между запусками (общее хранилище с пакетной обработкой)
+        self.core = NMRCore(profile_log=os.environ.get('NMR_PROFILE_LOG') or None, result_store=open_store())
         
-        self.last_file_path = None
+        # Рабочая область: много наборов, массивы загружаются при выборе
+        self.workspace = Workspace()
+        self.dataset = self.fit_dataset = None
         self.current_t = self.current_y = None
         
         self.auto_fit_res = None
@@ -82,11 +446,42 @@ class NMRApp(QMainWindow):
         self.auto_diff_norm = None
         self.auto_offset_norm = 0.0
         self.auto_amp_scale = 1.0
+        self.auto_dist = None
+        self.auto_fit = None
+        self.auto_ci = None
         
         self.manual_components = []
         self.manual_offset_norm = 0.0
         self.manual_amp_scale = 1.0
         
+        self.fit_worker = None
+        self.load_worker = None
+        self.stream_worker = None
+        self.map_dialog = None
+        self.compare_dialog = None
+        self.orders_dialog = None
+        self.report_worker = None
+        self._threads = []
+        
+        self._plotted_y = None
+        self.current_y_norm = None
+        self._exp_cache, self._exp_cache_t = {}, None
+        self._lod_cache = {}
+        self._layout_keys = {}
+        self._backgrounds = {}
+        self._redraw_start = None
+        self._pending_draws = set()
+        
+        self.manual_timer = QTimer(self)
+        self.manual_timer.setSingleShot(True)
+        self.manual_timer.setInterval(30)
+        self.manual_timer.timeout.connect(self.manual_update)
+        
+        self.resize_timer = QTimer(self)
+        self.resize_timer.setSingleShot(True)
+        self.resize_timer.setInterval(100)
+        self.resize_timer.timeout.connect(self.draw)
+        
         self.default_msize = 4.0
         self.reset_graph_settings()
         self.init_ui()
@@ -199,11 +594,36 @@ class NMRApp(QMainWindow):
 
         sidebar_layout.addWidget(QLabel("<h3>📊 Настройки</h3>"))
         
-        self.btn_file = QPushButton("📂 ЗАГРУЗИТЬ ФАЙЛ")
+        self.btn_file = QPushButton("📂 ДОБАВИТЬ ФАЙЛЫ")
         self.btn_file.setFixedHeight(40)
         self.btn_file.clicked.connect(self.load_file)
         sidebar_layout.addWidget(self.btn_file)
 
+        self.btn_stream = QPushButton("📡 ПОТОК (файл пишется)")
+        self.btn_stream.setToolTip("Следить за дописываемым файлом и обновлять расчёт по мере записи")
+        self.btn_stream.clicked.connect(self.toggle_stream)
+        sidebar_layout.addWidget(self.btn_stream)
+
+        self.btn_map = QPushButton("🗺 2D-ИНВЕРСИЯ (T1–T2 / D–T2)")
+        self.btn_map.clicked.connect(self.open_map_dialog)
+        sidebar_layout.addWidget(self.btn_map)
+        
+        # Наборы рабочей области (кривая на строку; для файлов с несколькими столбцами - по каждому)
+        self.data_list = QListWidget()
+        self.data_list.setMaximumHeight(130)
+        self.data_list.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.data_list.currentRowChanged.connect(self.select_dataset)
+        sidebar_layout.addWidget(self.data_list)
+        ws_row = QHBoxLayout()
+        self.btn_remove = QPushButton("✖ Убрать")
+        self.btn_remove.clicked.connect(self.remove_datasets)
+        ws_row.addWidget(self.btn_remove)
+        self.btn_compare = QPushButton("⧉ Сравнить")
+        self.btn_compare.setToolTip("Кривые и таблица T2 выделенных наборов (или всех)")
+        self.btn_compare.clicked.connect(self.open_compare_dialog)
+        ws_row.addWidget(self.btn_compare)
+        sidebar_layout.addLayout(ws_row)
+
         self.tabs = QTabWidget()
         self.tabs.setMaximumHeight(500)
         sidebar_layout.addWidget(self.tabs)
@@ -235,21 +655,64 @@ class NMRApp(QMainWindow):
         
         auto_layout.addWidget(QLabel("<b>Количество компонент:</b>"))
         self.comp_box = QComboBox()
-        self.comp_box.addItems(["1", "2", "3", "4", "5", "6"])
+        self.comp_box.addItems([str(k) for k in range(1, MAX_COMPONENTS + 1)] + [AUTO_COMPONENTS])
         self.comp_box.setCurrentIndex(3)
         auto_layout.addWidget(self.comp_box)
         
-        hint = QLabel("<i>Ограничивает максимальное число экспонент.\nРекомендуется 4 для большинства данных.</i>")
+        hint = QLabel("<i>Ограничивает максимальное число экспонент.\nРекомендуется 4 для большинства данных.\n"
+                      f"«{AUTO_COMPONENTS}» - модели 1–{MAX_COMPONENTS} за один расчёт и выбор по BIC/AIC/F-тесту.</i>")
         hint.setWordWrap(True)
         hint.setStyleSheet("color: #555; font-size: 10px;")
         auto_layout.addWidget(hint)
 
+        dist_row = QHBoxLayout()
+        dist_row.addWidget(QLabel("<b>Распределение T2:</b>"))
+        self.dist_box = QComboBox()
+        self.dist_box.addItems(list(DIST_METHODS))
+        self.dist_box.setToolTip("Регуляризация Тихонова; параметр выбирается по GCV или углу L-кривой")
+        dist_row.addWidget(self.dist_box)
+        auto_layout.addLayout(dist_row)
+
+        reduce_row = QHBoxLayout()
+        self.reduce_check = QCheckBox("Сжатие цепочки (лог. окна)")
+        self.reduce_check.setToolTip("Расчёт по средним в окнах, ширина которых растёт со временем, с весами = "
+                                     "числу эхо; кривая модели и остатки - по всем точкам")
+        reduce_row.addWidget(self.reduce_check)
+        self.reduce_spin = QDoubleSpinBox()
+        self.reduce_spin.setDecimals(3)
+        self.reduce_spin.setRange(1.001, 1.5)
+        self.reduce_spin.setSingleStep(0.005)
+        self.reduce_spin.setValue(REDUCE_RATIO)
+        self.reduce_spin.setToolTip("Во сколько раз каждое следующее окно шире предыдущего")
+        self.reduce_spin.setEnabled(False)
+        reduce_row.addWidget(self.reduce_spin)
+        self.reduce_check.toggled.connect(self.on_reduce_changed)
+        self.reduce_spin.valueChanged.connect(self.on_reduce_changed)
+        auto_layout.addLayout(reduce_row)
+
         self.btn_run = QPushButton("🚀 РАСЧЕТ")
         self.btn_run.setFixedHeight(45)
         self.btn_run.setStyleSheet(RUN_BUTTON_STYLE)
         self.btn_run.clicked.connect(self.run_auto_calc)
         auto_layout.addWidget(self.btn_run)
         
+        progress_row = QHBoxLayout()
+        self.fit_progress = QProgressBar()
+        self.fit_progress.setRange(0, 100)
+        self.fit_progress.setTextVisible(True)
+        progress_row.addWidget(self.fit_progress)
+        self.btn_cancel = QPushButton("✖ Отмена")
+        self.btn_cancel.clicked.connect(self.cancel_auto_calc)
+        progress_row.addWidget(self.btn_cancel)
+        auto_layout.addLayout(progress_row)
+        self.fit_progress.hide()
+        self.btn_cancel.hide()
+
+        self.btn_ci = QPushButton(f"± Доверительные интервалы ({N_RESAMPLES} копий)")
+        self.btn_ci.setToolTip("Повторные подгонки к кривым с перемешанными остатками, 95% интервалы T2 и долей")
+        self.btn_ci.clicked.connect(self.run_uncertainty)
+        auto_layout.addWidget(self.btn_ci)
+        
         self.auto_table = QTableWidget(0, 2)
         self.auto_table.setHorizontalHeaderLabels(["T2 (сек)", "Доля (%)"])
         self.auto_table.horizontalHeader().setStretchLastSection(True)
@@ -284,7 +747,7 @@ class NMRApp(QMainWindow):
         self.manual_table = QTableWidget(0, 2)
         self.manual_table.setHorizontalHeaderLabels(["T2 (сек)", "Доля (%)"])
         self.manual_table.horizontalHeader().setStretchLastSection(True)
-        self.manual_table.itemChanged.connect(self.manual_update)
+        self.manual_table.itemChanged.connect(self.schedule_manual_update)
         self.manual_table.setStyleSheet(nice_table_style)
         manual_layout.addWidget(self.manual_table)
         
@@ -305,7 +768,7 @@ class NMRApp(QMainWindow):
         self.manual_params_table.setMaximumHeight(100)
         self.manual_params_table.setItem(0, 0, QTableWidgetItem("Смещение"))
         self.manual_params_table.setItem(1, 0, QTableWidgetItem("Амплитуда"))
-        self.manual_params_table.itemChanged.connect(self.manual_update)
+        self.manual_params_table.itemChanged.connect(self.schedule_manual_update)
         self.manual_params_table.setItem(0, 1, QTableWidgetItem("0.0000 / 0.00"))
         self.manual_params_table.setItem(1, 1, QTableWidgetItem("1.0000"))
         manual_layout.addWidget(self.manual_params_table)
@@ -320,6 +783,11 @@ class NMRApp(QMainWindow):
         self.btn_save = QPushButton("💾 СОХРАНИТЬ ОТЧЕТ (PNG)")
         self.btn_save.clicked.connect(self.save_report_png)
         sidebar_layout.addWidget(self.btn_save)
+
+        self.btn_batch_report = QPushButton("📑 ОТЧЁТЫ ПО ФАЙЛАМ (PDF)")
+        self.btn_batch_report.setToolTip("Расчёт и отчёт для нескольких файлов: страница на кривую в одном PDF")
+        self.btn_batch_report.clicked.connect(self.save_batch_report)
+        sidebar_layout.addWidget(self.btn_batch_report)
         
         self.btn_about = QPushButton("ℹ️ О программе и инструкция")
         self.btn_about.setFixedHeight(35)
@@ -328,6 +796,10 @@ class NMRApp(QMainWindow):
         
         self.status_label = QLabel("Ожидание файла...")
         sidebar_layout.addWidget(self.status_label)
+        
+        self.redraw_label = QLabel("")
+        self.redraw_label.setStyleSheet("color: #888; font-size: 10px;")
+        sidebar_layout.addWidget(self.redraw_label)
         sidebar_layout.addStretch()
 
         main_layout.addWidget(sidebar)
@@ -355,6 +827,17 @@ class NMRApp(QMainWindow):
             else: 
                 col_right.addWidget(header_w)
 
+        self.init_artists()
+
+        # Распределение T2 - отдельная фигура: общие настройки осей и блиттинг её не касаются
+        self.dist_fig = Figure(tight_layout=True)
+        self.dist_canvas = FigureCanvas(self.dist_fig)
+        self.dist_ax = self.dist_fig.add_subplot(111)
+        header_w, header_l = self.create_plot_header(3, "Распределение T2")
+        header_l.addWidget(self.dist_canvas)
+        col_right.addWidget(header_w)
+        self.draw_distribution()
+
         graphs_layout.addLayout(col_left, 2)
         graphs_layout.addLayout(col_right, 3)
 
@@ -375,63 +858,409 @@ class NMRApp(QMainWindow):
         return container, layout
 
     def load_file(self):
-        path, _ = QFileDialog.getOpenFileName(self, "Открыть данные", "", "Данные (*.txt *.nmr)")
-        if not path: return
-        try:
-            if path != self.last_file_path:
-                self.reset_graph_settings()
-                self.last_file_path = path
+        paths, _ = QFileDialog.getOpenFileNames(self, "Открыть данные", "", "Данные (*.txt *.nmr)")
+        if not paths: return
+        # Сразу читаются только метаданные (первые строки файла), массивы - при выборе набора
+        new, errors = [], []
+        for path in paths:
+            try:
+                new += self.workspace.add(path)
+            except Exception as e:
+                errors.append(f"{os.path.basename(path)}: {e}")
+        for ds in new:
+            self.data_list.addItem(ds.name)
+            self.data_list.item(self.data_list.count() - 1).setToolTip(ds.path)
+        if errors:
+            QMessageBox.critical(self, "Ошибка", "Не удалось добавить файлы:\n" + "\n".join(errors))
+        if new:
+            self.data_list.setCurrentRow(self.workspace.datasets.index(new[0]))
+
+    def select_dataset(self, row):
+        if not 0 <= row < len(self.workspace.datasets): return
+        ds = self.workspace.datasets[row]
+        if ds is self.dataset: return
+        if self.workspace.is_loaded(ds):
+            self.show_dataset(ds, self.workspace.curve(ds))
+            return
+        # Первая загрузка (разбор текста) - в фоне; при быстром переключении применяется последняя
+        if self.load_worker is not None:
+            self.load_worker.cancel()
+        self.load_worker = worker = TaskWorker(self.workspace.curve, ds)
+        self.status_label.setText("Загрузка...")
+        self.start_task(worker, lambda result: self.on_file_loaded(worker, ds, result),
+                        lambda message: self.on_load_failed(worker, message), self.on_load_progress)
+
+    def on_load_progress(self, stage, value):
+        self.status_label.setText(f"Загрузка... {value}%")
+
+    def on_load_failed(self, worker, message):
+        if worker is not self.load_worker: return
+        self.load_worker = None
+        self.status_label.setText("Ошибка загрузки")
+        QMessageBox.critical(self, "Ошибка", f"Не удалось загрузить файл:\n{message}")
 
-            data = np.loadtxt(path)
-            self.current_t, self.current_y = data[:, 0], data[:, 1]
-            if self.current_t[0] > 10: 
-                self.current_t /= 1e6
+    def on_file_loaded(self, worker, ds, result):
+        if worker is not self.load_worker: return
+        self.load_worker = None
+        self.show_dataset(ds, result)
 
-            t_end = self.current_t[-1]
-            for i in range(3): 
-                self.graph_settings[i]['макс_x'] = t_end
+    def store_dataset_state(self):
+        # Состояние окна -> текущий набор (компактно: параметры, а не кривые модели)
+        ds = self.dataset
+        if ds is None: return
+        if self.auto_fit is not None:
+            ds.set_fit(self.auto_fit, self.auto_dist)
+            ds.ci = self.auto_ci
+        else:
+            ds.params = ds.dist = ds.ci = None
+        ds.manual = ((list(self.manual_components), self.manual_offset_norm, self.manual_amp_scale)
+                     if self.manual_components else None)
+        ds.view = [dict(s) for s in self.graph_settings]
 
-            self.auto_fit_res = self.auto_y_fit = self.auto_diff_norm = None
+    def show_dataset(self, ds, curve):
+        self.store_dataset_state()
+        self.dataset = ds
+        self.current_t, self.current_y = curve
+        had_dist = self.auto_dist is not None
+        try:
+            if ds.view is not None:
+                self.graph_settings = [dict(s) for s in ds.view]
+            else:
+                self.reset_graph_settings()
+                for i in range(3):
+                    self.graph_settings[i]['макс_x'] = self.current_t[-1]
+
+            self.auto_fit_res = self.auto_y_fit = self.auto_diff_norm = self.auto_fit = None
+            self.auto_dist, self.auto_ci = ds.dist, ds.ci
             self.auto_offset_norm = 0.0
             self.auto_amp_scale = 1.0
             self.auto_table.setRowCount(0)
             self.auto_params_table.setItem(0, 1, QTableWidgetItem("0.0000 / 0.00"))
             self.auto_params_table.setItem(1, 1, QTableWidgetItem("1.0000"))
-            
-            self.manual_components = []
-            self.manual_offset_norm = 0.0
-            self.manual_amp_scale = 1.0
-            self.manual_table.setRowCount(0)
-            self.manual_params_table.setItem(0, 1, QTableWidgetItem("0.0000 / 0.00"))
-            self.manual_params_table.setItem(1, 1, QTableWidgetItem("1.0000"))
+            if ds.params is not None:
+                self.show_auto_results(self.core.result_from(self.current_t, self.current_y, ds.params))
+                self.auto_ci = ds.ci
+                self.fill_auto_table()
+            # Пустая фигура распределения не перерисовывается - это заметная часть переключения
+            if had_dist or self.auto_dist is not None:
+                self.draw_distribution()
 
-            self.status_label.setText("Файл загружен")
+            components, offset_norm, amp_scale = ds.manual or ([], 0.0, 1.0)
+            self.manual_table.blockSignals(True)
+            self.manual_table.setRowCount(len(components))
+            for i, c in enumerate(components):
+                self.manual_table.setItem(i, 0, QTableWidgetItem(f"{c['T2']:.3f}"))
+                self.manual_table.setItem(i, 1, QTableWidgetItem(f"{c['Share']*100:.2f}"))
+            self.manual_table.blockSignals(False)
+            self.manual_components = list(components)
+            self.manual_offset_norm, self.manual_amp_scale = offset_norm, amp_scale
+            self.manual_params_table.blockSignals(True)
+            offset_abs = offset_norm * np.max(self.current_y)
+            self.manual_params_table.setItem(0, 1, QTableWidgetItem(f"{offset_norm:.4f} / {offset_abs:.2f}"))
+            self.manual_params_table.setItem(1, 1, QTableWidgetItem(f"{amp_scale:.4f}"))
+            self.manual_params_table.blockSignals(False)
+
+            self.status_label.setText(f"{ds.name}: {len(self.current_t)} точек")
+            if components:
+                self.manual_update()
             self.draw()
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", f"Не удалось загрузить файл:\n{str(e)}")
 
+    def set_dataset_params(self, ds, params):
+        # Готовый результат (например, из окна сравнения) - в набор; текущий сразу показывается
+        ds.params, ds.dist, ds.ci = params, None, None
+        if ds is not self.dataset: return
+        self.auto_dist = None
+        self.show_auto_results(self.core.result_from(self.current_t, self.current_y, params))
+        self.draw()
+        self.draw_distribution()
+
+    def remove_datasets(self):
+        rows = sorted({i.row() for i in self.data_list.selectedIndexes()}, reverse=True)
+        if not rows: return
+        self.data_list.blockSignals(True)
+        for row in rows:
+            ds = self.workspace.datasets[row]
+            if ds is self.dataset:
+                self.dataset = None
+            self.workspace.remove(ds)
+            self.data_list.takeItem(row)
+        self.data_list.blockSignals(False)
+        if self.dataset is None and self.workspace.datasets:
+            self.select_dataset(max(0, self.data_list.currentRow()))
+        elif not self.workspace.datasets:
+            self.status_label.setText("Рабочая область пуста")
+
+    def open_compare_dialog(self):
+        if not self.workspace.datasets: return
+        rows = sorted({i.row() for i in self.data_list.selectedIndexes()})
+        datasets = [self.workspace.datasets[i] for i in rows] if len(rows) > 1 else list(self.workspace.datasets)
+        if self.compare_dialog is None:
+            self.compare_dialog = CompareDialog(self)
+        self.compare_dialog.show()
+        self.compare_dialog.raise_()
+        self.compare_dialog.show_datasets(datasets)
+
+    def open_map_dialog(self):
+        if self.map_dialog is None:
+            self.map_dialog = Map2DDialog(self)
+        self.map_dialog.show()
+        self.map_dialog.raise_()
+
+    # === Поток данных во время записи ===
+    def toggle_stream(self):
+        if self.stream_worker is not None:
+            self.stream_worker.cancel()
+            self.btn_stream.setEnabled(False)
+            return
+        path, _ = QFileDialog.getOpenFileName(self, "Файл, который пишется", "", "Данные (*.txt *.nmr)")
+        if not path: return
+        self.cancel_auto_calc()
+        # Поток не входит в рабочую область: состояние текущего набора сохраняется
+        self.store_dataset_state()
+        self.dataset = None
+        self.data_list.setEnabled(False)
+        self.reset_graph_settings()
+        self.stream_worker = StreamWorker(path, self.max_components())
+        self.stream_worker.updated.connect(self.on_stream_update)
+        for btn in (self.btn_file, self.btn_run): btn.setEnabled(False)
+        self.btn_stream.setText("⏹ ОСТАНОВИТЬ ПОТОК")
+        self.status_label.setText("Поток: ожидание данных...")
+        self.start_task(self.stream_worker, self.on_stream_finished, self.on_stream_failed)
+
+    def on_stream_update(self, snap):
+        if self.stream_worker is None: return
+        t, y = snap['t'], snap['y']
+        self.current_t, self.current_y = t, y
+        for i in range(3):
+            self.graph_settings[i]['макс_x'] = t[-1]
+        if snap['x'] is not None:
+            model = multiexp(snap['x'], t)
+            self.show_auto_results((snap['results'], model * snap['y_max'], y / snap['y_max'] - model,
+                                    snap['offset_norm'], snap['amp_scale']))
+        self.status_label.setText(f"Поток: {len(t)} точек, t = {t[-1]:.3f} с")
+        self.draw()
+
+    def _stream_done(self):
+        self.stream_worker = None
+        self.data_list.setEnabled(True)
+        for btn in (self.btn_file, self.btn_run, self.btn_stream): btn.setEnabled(True)
+        self.btn_stream.setText("📡 ПОТОК (файл пишется)")
+
+    def on_stream_finished(self, _):
+        self._stream_done()
+        self.status_label.setText("Поток остановлен")
+
+    def on_stream_failed(self, message):
+        self._stream_done()
+        self.status_label.setText("Ошибка потока")
+        QMessageBox.critical(self, "Ошибка", f"Ошибка чтения потока:\n{message}")
+
+    def start_task(self, worker, on_finished, on_failed=None, on_progress=None, on_cancelled=None):
+        thread = QThread(self)
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        worker.finished.connect(on_finished)
+        if on_failed: worker.failed.connect(on_failed)
+        if on_progress: worker.progress.connect(on_progress)
+        if on_cancelled: worker.cancelled.connect(on_cancelled)
+        for sig in (worker.finished, worker.failed, worker.cancelled):
+            sig.connect(thread.quit)
+        thread.finished.connect(lambda: self._threads.remove((thread, worker)))
+        self._threads.append((thread, worker))
+        thread.start()
+
+    def max_components(self):
+        text = self.comp_box.currentText()
+        return MAX_COMPONENTS if text == AUTO_COMPONENTS else int(text)
+
     def run_auto_calc(self):
-        if self.current_t is None: return
-        try:
+        if self.current_t is None or self.fit_worker is not None: return
+        method = DIST_METHODS[self.dist_box.currentText()]
+        if self.comp_box.currentText() == AUTO_COMPONENTS:
+            self.fit_worker = TaskWorker(self.auto_orders, self.core, self.current_t, self.current_y, method)
+            on_finished = self.on_orders_finished
+        else:
             n = int(self.comp_box.currentText())
-            self.auto_fit_res, self.auto_y_fit, diff_raw, self.auto_offset_norm, self.auto_amp_scale = self.core.fit(self.current_t, self.current_y, n)
-            self.auto_diff_norm = diff_raw
+            self.fit_worker = TaskWorker(self.auto_calc, self.core, self.current_t, self.current_y, n, method)
+            on_finished = self.on_fit_finished
+        self.fit_dataset = self.dataset
+        self.btn_run.setEnabled(False)
+        self.fit_progress.setValue(0)
+        self.fit_progress.show()
+        self.btn_cancel.show()
+        self.status_label.setText("Расчёт...")
+        self.start_task(self.fit_worker, on_finished, self.on_fit_failed,
+                        self.on_fit_progress, self.on_fit_cancelled)
 
-            self.auto_table.setRowCount(len(self.auto_fit_res))
-            for i, r in enumerate(self.auto_fit_res):
-                self.auto_table.setItem(i, 0, QTableWidgetItem(f"{r['T2']:.3f}"))
-                self.auto_table.setItem(i, 1, QTableWidgetItem(f"{r['Share']*100:.2f}"))
+    def auto_calc(self, core, t, y, n, method, progress):
+        # Выполняется в рабочем потоке: дискретные компоненты и (по выбору) распределение T2.
+        # core - NMRCore на момент запуска: смена настроек в окне не меняет идущий расчёт
+        diag = {}
+        fit = core.fit(t, y, n, progress=progress, diagnostics=diag)
+        dist = core.distribution(t, y, method, progress=progress) if method else None
+        return fit, dist, diag
 
-            y_max = np.max(self.current_y)
-            offset_abs = self.auto_offset_norm * y_max
-            self.auto_params_table.setItem(0, 1, QTableWidgetItem(f"{self.auto_offset_norm:.4f} / {offset_abs:.2f}"))
-            self.auto_params_table.setItem(1, 1, QTableWidgetItem(f"{self.auto_amp_scale:.4f}"))
+    def auto_orders(self, core, t, y, method, progress):
+        # Режим "Авто": все модели 1..MAX_COMPONENTS по одному NNLS-спектру
+        start = time.perf_counter()
+        orders = core.fit_orders(t, y, MAX_COMPONENTS, progress=progress)
+        elapsed = time.perf_counter() - start
+        dist = core.distribution(t, y, method, progress=progress) if method else None
+        return orders, dist, elapsed
+
+    def run_uncertainty(self):
+        if self.auto_fit is None or not self.auto_fit_res or self.fit_worker is not None: return
+        self.fit_worker = TaskWorker(bootstrap, self.current_t, self.current_y, self.auto_fit, N_RESAMPLES,
+                                     core=self.core)
+        self.fit_dataset = self.dataset
+        self.btn_run.setEnabled(False)
+        self.btn_ci.setEnabled(False)
+        self.fit_progress.setValue(0)
+        self.fit_progress.show()
+        self.btn_cancel.show()
+        self.status_label.setText("Доверительные интервалы...")
+        self.start_task(self.fit_worker, self.on_uncertainty_finished, self.on_fit_failed,
+                        self.on_fit_progress, self.on_fit_cancelled)
+
+    def on_uncertainty_finished(self, result):
+        if self._fit_done(): return
+        if self.fit_dataset is not self.dataset:
+            # Пока считалось, выбран другой набор - интервалы сохраняются в свой
+            if self.fit_dataset is not None:
+                self.fit_dataset.ci = result
+            return
+        self.auto_ci = result
+        self.fill_auto_table()
+        self.status_label.setText(f"Интервалы {result['level']*100:.0f}%: {result['n']} подгонок"
+                                  + (f", не сошлось {result['failed']}" if result['failed'] else ""))
 
+    def cancel_auto_calc(self):
+        if self.fit_worker is not None:
+            self.fit_worker.cancel()
+
+    def closeEvent(self, event):
+        self.cancel_auto_calc()
+        if self.stream_worker is not None:
+            self.stream_worker.cancel()
+        if self.report_worker is not None:
+            self.report_worker.cancel()
+        if self.map_dialog is not None and self.map_dialog.calc_worker is not None:
+            self.map_dialog.calc_worker.cancel()
+        if self.compare_dialog is not None and self.compare_dialog.worker is not None:
+            self.compare_dialog.worker.cancel()
+        for thread, _ in list(self._threads):
+            thread.quit()
+            thread.wait()
+        super().closeEvent(event)
+
+    def _fit_done(self):
+        # Результаты отменённого (или устаревшего) расчёта не применяются
+        stale = self.fit_worker is None or self.fit_worker._cancel
+        self.fit_worker = None
+        self.btn_run.setEnabled(True)
+        self.btn_ci.setEnabled(True)
+        self.fit_progress.hide()
+        self.btn_cancel.hide()
+        return stale
+
+    def on_fit_progress(self, stage, value):
+        label, pct = FIT_STAGES.get(stage, (stage, 0))
+        if stage == 'refine':
+            pct += int(45 * value / (value + 10))
+            label = f"{label}: {value}"
+        elif stage == 'orders':
+            pct += int(45 * min(value, MAX_COMPONENTS) / MAX_COMPONENTS)
+            label = f"{label}: {value}"
+        elif stage == 'bootstrap':
+            pct = int(100 * value / N_RESAMPLES)
+            label = f"{label}: {value}/{N_RESAMPLES}"
+        self.fit_progress.setValue(pct)
+        self.fit_progress.setFormat(label)
+
+    def on_fit_cancelled(self):
+        self._fit_done()
+        self.status_label.setText("Расчёт отменён")
+
+    def on_fit_failed(self, message):
+        if self._fit_done(): return
+        self.status_label.setText("Ошибка расчёта")
+        QMessageBox.critical(self, "Ошибка расчёта", message)
+
+    def on_fit_finished(self, result):
+        if self._fit_done(): return
+        try:
+            fit, dist, diag = result
+            self.statusBar().showMessage(format_diagnostics(diag))
+            if self.fit_dataset is not self.dataset:
+                # Результат - в набор, для которого считался (переключение расчёт не прерывает)
+                if self.fit_dataset is not None:
+                    self.fit_dataset.set_fit(fit, dist)
+                    self.status_label.setText(f"{self.fit_dataset.name}: {len(fit[0])} компонент")
+                return
+            self.auto_dist = dist
+            self.show_auto_results(fit)
             self.status_label.setText(f"Авто: {len(self.auto_fit_res)} компонент")
             self.draw()
+            self.draw_distribution()
         except Exception as e:
             QMessageBox.critical(self, "Ошибка расчёта", str(e))
 
+    def on_orders_finished(self, result):
+        if self._fit_done(): return
+        orders, dist, elapsed = result
+        if orders['best'] is None:
+            self.status_label.setText("Авто: компоненты не найдены")
+            return
+        self.statusBar().showMessage(f"Модели 1–{len(orders['candidates'])}: {elapsed * 1e3:.0f} мс")
+        if self.fit_dataset is self.dataset:
+            self.auto_dist = dist
+        elif self.fit_dataset is not None:
+            self.fit_dataset.dist = dist
+        # Окно сравнения выбирает лучшую модель по критерию и применяет её (apply_order)
+        if self.orders_dialog is None:
+            self.orders_dialog = OrdersDialog(self)
+        self.orders_dialog.show()
+        self.orders_dialog.raise_()
+        self.orders_dialog.show_orders(self.fit_dataset, orders, elapsed)
+
+    def apply_order(self, dataset, fit):
+        if dataset is not self.dataset:
+            # Набор не на экране - результат сохраняется в него
+            if dataset is not None:
+                dataset.set_fit(fit, dataset.dist)
+                self.status_label.setText(f"{dataset.name}: {len(fit[0])} компонент")
+            return
+        self.show_auto_results(fit)
+        self.status_label.setText(f"Авто: {len(self.auto_fit_res)} компонент")
+        self.draw()
+        self.draw_distribution()
+
+    def show_auto_results(self, result):
+        self.auto_fit = result
+        self.auto_ci = None
+        self.auto_fit_res, self.auto_y_fit, diff_raw, self.auto_offset_norm, self.auto_amp_scale = result
+        self.auto_diff_norm = diff_raw
+        self.fill_auto_table()
+
+        y_max = np.max(self.current_y)
+        offset_abs = self.auto_offset_norm * y_max
+        self.auto_params_table.setItem(0, 1, QTableWidgetItem(f"{self.auto_offset_norm:.4f} / {offset_abs:.2f}"))
+        self.auto_params_table.setItem(1, 1, QTableWidgetItem(f"{self.auto_amp_scale:.4f}"))
+
+    def auto_cell_text(self, i):
+        # T2 и доля компоненты i; после бутстрепа - с доверительным интервалом
+        cis = self.auto_ci['components'] if self.auto_ci is not None else []
+        return component_text(self.auto_fit_res[i], cis[i] if i < len(cis) else None)
+
+    def fill_auto_table(self):
+        self.auto_table.setRowCount(len(self.auto_fit_res))
+        for i in range(len(self.auto_fit_res)):
+            for j, text in enumerate(self.auto_cell_text(i)):
+                self.auto_table.setItem(i, j, QTableWidgetItem(text))
+        self.auto_table.resizeColumnToContents(0)
+
     def copy_auto_to_manual(self):
         if not self.auto_fit_res:
             QMessageBox.information(self, "Нет данных", "Сначала выполните автоматический расчёт")
@@ -527,66 +1356,188 @@ class NMRApp(QMainWindow):
                 self.manual_status.setText("Некорректные значения")
                 self.manual_components = []
             
-            self.draw()
+            self.draw(manual_only=True)
         except:
             self.manual_status.setText("Ошибка ввода")
             self.manual_components = []
 
-    def draw(self):
+    def init_artists(self):
+        # Артисты создаются один раз, далее обновляются через set_data
+        self.lines = []
+        for i, ax in enumerate(self.axes):
+            ax.set_xlabel("Время (с)", fontsize=11, labelpad=8)
+            if i < 2:
+                data, = ax.plot([], [], 'k.', label='Данные')
+                auto, = ax.plot([], [], 'r-', lw=1.8, label='Авто')
+                manual, = ax.plot([], [], 'b-', lw=1.8, label='Ручной', animated=True)
+                ax.set_ylabel("Амплитуда сигнала (норм.)", fontsize=11, labelpad=8)
+                if i == 1:
+                    ax.set_yscale('log')
+            else:
+                data = None
+                auto, = ax.plot([], [], 'r.', label='Авто')
+                manual, = ax.plot([], [], 'b.', label='Ручной', animated=True)
+                ax.set_ylabel("Разница (норм.)", fontsize=11, labelpad=8)
+                ax.axhline(0, color='gray', lw=1, ls='--')
+            self.lines.append({'data': data, 'auto': auto, 'manual': manual})
+            self.canvases[i].mpl_connect('draw_event', lambda event, idx=i: self.on_canvas_drawn(idx))
+            self.canvases[i].mpl_connect('resize_event', lambda event: self.resize_timer.start())
+
+    def schedule_manual_update(self):
+        # Частые правки в таблицах объединяются в одну перерисовку
+        self.manual_timer.start()
+
+    def manual_model_norm(self):
+        if not self.manual_components: return None
+        total_share = sum(c['Share'] for c in self.manual_components)
+        if total_share <= 0: return None
+
+        # exp(-t/T2) каждой компоненты кэшируется: при правке пересчитывается только изменённая
+        if self._exp_cache_t is not self.current_t:
+            self._exp_cache, self._exp_cache_t = {}, self.current_t
+        wanted = {c['T2'] for c in self.manual_components}
+        for key in list(self._exp_cache):
+            if key not in wanted:
+                del self._exp_cache[key]
+
+        exp_sum = np.zeros_like(self.current_t)
+        for c in self.manual_components:
+            e = self._exp_cache.get(c['T2'])
+            if e is None:
+                e = self._exp_cache[c['T2']] = np.exp(-self.current_t / c['T2'])
+            exp_sum += (c['Share'] / total_share) * e
+        return self.manual_amp_scale * exp_sum + self.manual_offset_norm
+
+    def draw(self, manual_only=False):
         if self.current_t is None: return
-        
+        self._redraw_start = time.perf_counter()
+        if manual_only and self.blit_manual(): return
+        self._pending_draws = set(range(len(self.axes)))
+
+        t = self.current_t
+        if self._plotted_y is not self.current_y:
+            self._plotted_y = self.current_y
+            self.current_y_norm = self.current_y / np.max(self.current_y)
+        y_norm = self.current_y_norm
         y_max = np.max(self.current_y)
-        y_norm = self.current_y / y_max
 
         auto_model_norm = self.auto_y_fit / y_max if self.auto_y_fit is not None else None
         auto_diff = self.auto_diff_norm if self.auto_diff_norm is not None else None
 
-        manual_model_norm = None
-        manual_diff = None
-        if self.manual_components:
-            total_share = sum(c['Share'] for c in self.manual_components)
-            if total_share > 0:
-                exp_sum = sum((c['Share'] / total_share) * np.exp(-self.current_t / c['T2']) for c in self.manual_components)
-                manual_model_norm = self.manual_amp_scale * exp_sum + self.manual_offset_norm
-                manual_diff = y_norm - manual_model_norm
+        manual_model_norm = self.manual_model_norm()
+        manual_diff = y_norm - manual_model_norm if manual_model_norm is not None else None
 
+        curves = [(auto_model_norm, manual_model_norm)] * 2 + [(auto_diff, manual_diff)]
+        sources = [(self.auto_y_fit, None)] * 2 + [(self.auto_diff_norm, None)]
         for i, ax in enumerate(self.axes):
-            ax.clear()
             s = self.graph_settings[i]
             ms = s['толщина точек']
-            
-            ax.set_xlabel("Время (с)", fontsize=11, labelpad=8)
+            lines = self.lines[i]
 
-            if i == 0:
-                ax.plot(self.current_t, y_norm, 'k.', ms=ms, label='Данные')
-                if auto_model_norm is not None:
-                    ax.plot(self.current_t, auto_model_norm, 'r-', lw=1.8, label='Авто')
-                if manual_model_norm is not None:
-                    ax.plot(self.current_t, manual_model_norm, 'b-', lw=1.8, label='Ручной')
-                ax.set_ylabel("Амплитуда сигнала (норм.)", fontsize=11, labelpad=8)
-                if auto_model_norm is not None or manual_model_norm is not None:
-                    ax.legend(fontsize=9)
-            elif i == 1:
-                ax.semilogy(self.current_t, y_norm, 'k.', ms=ms)
-                if auto_model_norm is not None:
-                    ax.semilogy(self.current_t, auto_model_norm, 'r-', lw=1.8)
-                if manual_model_norm is not None:
-                    ax.semilogy(self.current_t, manual_model_norm, 'b-', lw=1.8)
-                ax.set_ylabel("Амплитуда сигнала (норм.)", fontsize=11, labelpad=8)
+            # На экран идут прореженные данные (по пикселям ширины осей), расчёт - по полным
+            x_range = (s['мин_x'], s['макс_x'])
+            n_px = max(100, int(ax.get_window_extent().width))
+            if lines['data'] is not None:
+                idx = self.lod_indices(i, 'data', self.current_y, y_norm, n_px, x_range)
+                lines['data'].set_data(t[idx], y_norm[idx])
+            for key, values, source in zip(('auto', 'manual'), curves[i], sources[i]):
+                lines[key].set_visible(values is not None)
+                if values is not None:
+                    idx = self.lod_indices(i, key, source, values, n_px, x_range)
+                    lines[key].set_data(t[idx], values[idx])
+            if lines['data'] is not None:
+                lines['data'].set_markersize(ms)
             else:
-                if auto_diff is not None:
-                    ax.plot(self.current_t, auto_diff, 'r.', ms=ms, label='Авто')
-                if manual_diff is not None:
-                    ax.plot(self.current_t, manual_diff, 'b.', ms=ms, label='Ручной')
-                ax.set_ylabel("Разница (норм.)", fontsize=11, labelpad=8)
-                ax.axhline(0, color='gray', lw=1, ls='--')
-                if auto_diff is not None or manual_diff is not None:
-                    ax.legend(fontsize=9)
-            
+                lines['auto'].set_markersize(ms)
+                lines['manual'].set_markersize(ms)
+
+            if i != 1:
+                shown = [lines[k] for k in ('auto', 'manual') if lines[k].get_visible()]
+                if shown:
+                    handles = ([lines['data']] if lines['data'] is not None else []) + shown
+                    ax.legend(handles=handles, fontsize=9)
+                elif ax.get_legend() is not None:
+                    ax.get_legend().remove()
+
             ax.set_xlim(s['мин_x'], s['макс_x'])
             ax.set_ylim(s['мин_y'], s['макс_y'])
+            # tight_layout - самая дорогая часть перерисовки; нужен только при смене осей или размера
+            layout_key = (x_range, s['мин_y'], s['макс_y'], n_px, int(ax.get_window_extent().height))
+            self.figs[i].set_layout_engine('tight' if self._layout_keys.get(i) != layout_key else 'none')
+            self._layout_keys[i] = layout_key
             self.canvases[i].draw_idle()
 
+    def draw_distribution(self):
+        ax = self.dist_ax
+        ax.clear()
+        ax.set_xscale('log')
+        ax.set_xlabel("T2 (с)", fontsize=11, labelpad=8)
+        ax.set_ylabel("Амплитуда (норм.)", fontsize=11, labelpad=8)
+        dist = self.auto_dist
+        if dist is not None:
+            name = {'gcv': "GCV", 'lcurve': "L-кривая"}[dist['method']]
+            ax.plot(dist['t2'], dist['dist'], 'g-', lw=1.8, label=f"Тихонов ({name}), α = {dist['alpha']:.3g}")
+            ax.fill_between(dist['t2'], dist['dist'], color='g', alpha=0.15)
+            for k, r in enumerate(self.auto_fit_res or []):
+                ax.axvline(r['T2'], color='r', ls='--', lw=1, label='T2 (авто)' if k == 0 else None)
+            ax.legend(fontsize=9)
+        self.dist_canvas.draw_idle()
+
+    def lod_indices(self, i, key, source, values, n_px, x_range):
+        # source - исходный массив, по которому получены values: пока он и пределы осей
+        # не изменились, индексы берутся из кэша (None - всегда пересчитывать)
+        cached = self._lod_cache.get((i, key))
+        if source is not None and cached is not None and cached[0] is source and cached[1] == (n_px, x_range):
+            return cached[2]
+        if i == 1 and key == 'data':
+            idx = minmax_indices(self.current_t, values, n_px, x_range, log_y=True)
+        elif key == 'data' or i == 2:
+            idx = minmax_indices(self.current_t, values, n_px, x_range)
+        else:
+            idx = lttb_indices(self.current_t, values, n_px, x_range)
+        self._lod_cache[(i, key)] = (source, (n_px, x_range), idx)
+        return idx
+
+    def blit_manual(self):
+        # Быстрый путь для ручной правки: фон (данные, оси, авто) берётся из снимка,
+        # поверх рисуется только анимированная ручная кривая
+        model = self.manual_model_norm()
+        if model is None or len(self._backgrounds) < len(self.axes): return False
+        if not all(lines['manual'].get_visible() for lines in self.lines): return False
+
+        t = self.current_t
+        for i, (ax, values) in enumerate(zip(self.axes, (model, model, self.current_y_norm - model))):
+            s = self.graph_settings[i]
+            x_range = (s['мин_x'], s['макс_x'])
+            n_px = max(100, int(ax.get_window_extent().width))
+            idx = self.lod_indices(i, 'manual', None, values, n_px, x_range)
+            line = self.lines[i]['manual']
+            line.set_data(t[idx], values[idx])
+            canvas = self.canvases[i]
+            canvas.restore_region(self._backgrounds[i])
+            ax.draw_artist(line)
+            canvas.blit(self.figs[i].bbox)
+
+        elapsed = (time.perf_counter() - self._redraw_start) * 1e3
+        self._redraw_start = None
+        self.redraw_label.setText(f"Отрисовка: {elapsed:.1f} мс")
+        return True
+
+    def on_canvas_drawn(self, idx):
+        # Снимок фона без анимированных артистов - для blit_manual
+        canvas, ax = self.canvases[idx], self.axes[idx]
+        self._backgrounds[idx] = canvas.copy_from_bbox(self.figs[idx].bbox)
+        if self.lines[idx]['manual'].get_visible():
+            ax.draw_artist(self.lines[idx]['manual'])
+            canvas.blit(self.figs[idx].bbox)
+
+        if self._redraw_start is None: return
+        self._pending_draws.discard(idx)
+        if not self._pending_draws:
+            elapsed = (time.perf_counter() - self._redraw_start) * 1e3
+            self._redraw_start = None
+            self.redraw_label.setText(f"Отрисовка: {elapsed:.1f} мс")
+
     def open_settings(self, idx):
         dialog = QDialog(self)
         dialog.setWindowTitle("Настройки осей")
@@ -611,68 +1562,79 @@ class NMRApp(QMainWindow):
         if self.auto_fit_res is None:
             QMessageBox.information(self, "Инфо", "Для отчёта выполните автоматический расчёт")
             return
-        
+        if self.report_worker is not None: return
+
         path, _ = QFileDialog.getSaveFileName(self, "Сохранить отчет", "ЯМР_Отчет.png", "PNG (*.png)")
         if not path: return
+        # Прореживание - здесь (быстро), отрисовка 300 dpi - в фоновом потоке
+        data = report_data(self.current_t, self.current_y, self.auto_fit, self.auto_ci)
+        self.report_worker = TaskWorker(save_report, path, data)
+        self.btn_save.setEnabled(False)
+        self.status_label.setText("Сохранение отчёта...")
+        self.start_task(self.report_worker, self.on_report_saved, self.on_report_failed,
+                        on_cancelled=self.on_report_cancelled)
 
-        y_max = np.max(self.current_y)
-        report_fig = plt.figure(figsize=(14, 10))
-        gs = report_fig.add_gridspec(2, 2, hspace=0.3, wspace=0.3)
+    def on_reduce_changed(self, *_):
+        self.reduce_spin.setEnabled(self.reduce_check.isChecked())
+        # Новый экземпляр вместо изменения текущего: фоновые задачи досчитывают со своим core
+        # (и пишут в хранилище под его настройками); кэш ядер и хранилище общие
+        self.core = copy.copy(self.core)
+        self.core.reduce_ratio = self.reduce_spin.value() if self.reduce_check.isChecked() else None
 
-        ax1 = report_fig.add_subplot(gs[0, 0])
-        ax1.plot(self.current_t, self.current_y/y_max, 'k.', label='Данные')
-        ax1.plot(self.current_t, self.auto_y_fit/y_max, 'r-', label='Модель (авто)')
-        ax1.set_title("Линейный масштаб (норм.)")
-        ax1.set_xlabel("Время (с)", fontsize=11)
-        ax1.set_ylabel("Амплитуда сигнала (норм.)", fontsize=11)
-        ax1.legend()
+    def save_batch_report(self):
+        if self.report_worker is not None: return
+        files, _ = QFileDialog.getOpenFileNames(self, "Файлы для отчёта", "", "Данные (*.txt *.nmr)")
+        if not files: return
+        path, _ = QFileDialog.getSaveFileName(self, "Сохранить отчёты", "ЯМР_Отчеты.pdf", "PDF (*.pdf)")
+        if not path: return
+        if not path.lower().endswith('.pdf'):
+            path += '.pdf'
+        # Расчёт по файлам - в процессах на всех ядрах, страницы PDF - в фоновом потоке
+        self.report_worker = TaskWorker(run_reports, files, path, self.max_components(),
+                                        grid=self.core.grid, reduce_ratio=self.core.reduce_ratio,
+                                        result_cache=self.core.results.path if self.core.results else None)
+        self.report_total = len(files)
+        self.btn_save.setEnabled(False)
+        self.btn_batch_report.setEnabled(False)
+        self.status_label.setText(f"Отчёты: 0/{len(files)}")
+        self.start_task(self.report_worker, self.on_report_saved, self.on_report_failed,
+                        lambda stage, done: self.status_label.setText(f"Отчёты: {done}/{self.report_total}"),
+                        self.on_report_cancelled)
 
-        ax2 = report_fig.add_subplot(gs[1, 0])
-        ax2.semilogy(self.current_t, self.current_y/y_max, 'k.')
-        ax2.semilogy(self.current_t, self.auto_y_fit/y_max, 'r-')
-        ax2.set_title("Логарифмический масштаб")
-        ax2.set_xlabel("Время (с)", fontsize=11)
-        ax2.set_ylabel("Амплитуда сигнала (норм.)", fontsize=11)
+    def _report_done(self):
+        self.report_worker = None
+        self.btn_save.setEnabled(True)
+        self.btn_batch_report.setEnabled(True)
 
-        ax3 = report_fig.add_subplot(gs[0, 1])
-        ax3.plot(self.current_t, self.auto_diff_norm, 'g.')
-        ax3.axhline(0, color='red', ls='--')
-        ax3.set_title("Разница")
-        ax3.set_xlabel("Время (с)", fontsize=11)
-        ax3.set_ylabel("Разница (норм.)", fontsize=11)
+    def on_report_saved(self, result):
+        self._report_done()
+        if isinstance(result, str):
+            self.status_label.setText("Отчёт сохранён")
+            QMessageBox.information(self, "Успех", "Отчет успешно сохранен!")
+            return
+        n_pages, errors = result
+        self.status_label.setText(f"Отчёты: {n_pages} страниц")
+        if errors:
+            QMessageBox.warning(self, "Отчёты", f"Сохранено страниц: {n_pages}. Не обработаны:\n" + "\n".join(errors))
+        else:
+            QMessageBox.information(self, "Успех", f"Сохранено страниц: {n_pages}")
 
-        ax4 = report_fig.add_subplot(gs[1, 1])
-        ax4.axis('off')
-        
-        cell_text = [[f"{r['T2']:.3f}", f"{r['Share']*100:.2f}%"] for r in self.auto_fit_res]
-        
-        offset_abs = self.auto_offset_norm * y_max
-        cell_text.append(["Смещение", f"{self.auto_offset_norm:.4f} / {offset_abs:.2f}"])
-        cell_text.append(["Амплитуда", f"{self.auto_amp_scale:.4f}"])
-        
-        full_cell_text = [["Таблица результатов", ""]] + \
-                         [["T2 (сек)", "Доля (%)"]] + \
-                         cell_text
-
-        table = ax4.table(cellText=full_cell_text, loc='center', cellLoc='center')
-        table.auto_set_font_size(False)
-        table.set_fontsize(11)
-        table.scale(1, 2.2)
-
-        for i in range(2):
-            table[(0, i)].set_facecolor('#40466e')
-            table[(0, i)].set_text_props(weight='bold', color='w')
-        for i in range(2):
-            table[(1, i)].set_facecolor('#aaaaaa')
-            table[(1, i)].set_text_props(weight='bold', color='k')
-
-        report_fig.tight_layout(pad=1.0)
-        report_fig.savefig(path, dpi=300, bbox_inches='tight')
-        plt.close(report_fig)
-        QMessageBox.information(self, "Успех", "Отчет успешно сохранен!")
+    def on_report_failed(self, message):
+        self._report_done()
+        self.status_label.setText("Ошибка сохранения отчёта")
+        QMessageBox.critical(self, "Ошибка", message)
 
-if __name__ == "__main__":
+    def on_report_cancelled(self):
+        self._report_done()
+        self.status_label.setText("Сохранение отчётов отменено")
+
+
+def main():
     app = QApplication(sys.argv)
     window = NMRApp()
     window.show()
-    sys.exit(app.exec())
\ No newline at end of file
+    return app.exec()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
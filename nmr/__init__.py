@@ -0,0 +1,4 @@
+from .core import FitCancelled, NMRCore
+from .io import load_curve, load_curves, save_curve
+
+__all__ = ['FitCancelled', 'NMRCore', 'load_curve', 'load_curves', 'save_curve']
@@ -0,0 +1,222 @@
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from . import batch
+from .core import NMRCore
+
+
+def result_cache(args):
+    # Путь к общему с GUI хранилищу результатов или None (--no-result-cache)
+    from .results import default_path
+    return None if args.no_result_cache else args.result_cache or default_path()
+
+
+def add_result_cache_args(parser):
+    parser.add_argument('--result-cache', default=None,
+                        help="хранилище готовых результатов (SQLite), по умолчанию общее с GUI")
+    parser.add_argument('--no-result-cache', action='store_true', help="считать всё заново, не сохраняя")
+
+
+def reduce_ratio(value):
+    ratio = float(value)
+    if ratio <= 1:
+        raise argparse.ArgumentTypeError(f"отношение ширины окон должно быть больше 1: {value}")
+    return ratio
+
+
+def add_reduce_arg(parser):
+    parser.add_argument('--reduce', type=reduce_ratio, default=None, metavar='RATIO',
+                        help="сжатие цепочки эхо перед расчётом: средние по окнам, ширина которых растёт "
+                             "в RATIO раз (например 1.02)")
+
+
+def cmd_fit(args):
+    files = batch.collect_files(args.inputs)
+    if not files:
+        print("Файлы не найдены", file=sys.stderr)
+        return 1
+
+    def progress(done, total, path):
+        if not args.quiet:
+            print(f"[{done}/{total}] {path}", file=sys.stderr)
+
+    start = time.perf_counter()
+    n_done, n_failed = batch.run_batch(files, args.output, args.max_components,
+                                       args.workers, args.format, progress, args.profile_log, args.grid,
+                                       result_cache(args), args.reduce)
+    elapsed = time.perf_counter() - start
+    print(f"Готово: {n_done} файлов ({n_failed} с ошибками) за {elapsed:.2f} с "
+          f"-> {args.output}", file=sys.stderr)
+    return 1 if n_failed else 0
+
+
+def cmd_report(args):
+    from .report import run_reports
+
+    files = batch.collect_files(args.inputs)
+    if not files:
+        print("Файлы не найдены", file=sys.stderr)
+        return 1
+
+    def progress(stage, done):
+        if not args.quiet and done:
+            print(f"[{done}/{len(files)}] {files[done - 1]}", file=sys.stderr)
+
+    start = time.perf_counter()
+    n_pages, errors = run_reports(files, args.output, args.max_components, args.workers, args.grid, args.dpi,
+                                  progress, result_cache(args), args.reduce)
+    elapsed = time.perf_counter() - start
+    for error in errors:
+        print(error, file=sys.stderr)
+    print(f"Готово: {n_pages} страниц за {elapsed:.2f} с ({n_pages / max(elapsed, 1e-9):.2f} отчётов/с) "
+          f"-> {args.output}", file=sys.stderr)
+    return 1 if errors else 0
+
+
+def cmd_stream(args):
+    from . import streaming
+
+    stream_fit = NMRCore().streaming(args.max_components, t2_max=args.t2_max)
+    if args.source == '-':
+        chunks = streaming.read_stream(chunk_lines=args.chunk_lines)
+    else:
+        chunks = streaming.follow_file(args.source, idle_timeout=args.idle_timeout)
+
+    def on_update(sf):
+        comps = '  '.join(f"T2={r['T2']*1000:.2f}мс ({r['Share']*100:.1f}%)" for r in sf.results)
+        print(f"{sf.n_points} точек, t={sf.t_last or 0:.4f} с: {comps or 'нет компонент'}", flush=True)
+
+    try:
+        streaming.run_stream(chunks, stream_fit, args.interval, on_update)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def cmd_series(args):
+    from .io import load_curves
+    from .series import fit_series, write_tracks
+
+    files = batch.collect_files(args.inputs)
+    if not files:
+        print("Файлы не найдены", file=sys.stderr)
+        return 1
+    t, curves, labels = None, [], []
+    for path in files:
+        t_file, Y = load_curves(path)
+        if t is None:
+            t = t_file
+        elif len(t_file) != len(t) or not np.allclose(t_file, t):
+            print(f"Ось времени {path} отличается от первой кривой серии", file=sys.stderr)
+            return 1
+        curves.extend(Y)
+        labels.extend(f"{path}:{i + 1}" if len(Y) > 1 else path for i in range(len(Y)))
+
+    def progress(stage, i):
+        if not args.quiet and i < len(labels):
+            print(f"[{i + 1}/{len(labels)}] {labels[i]}", file=sys.stderr)
+
+    start = time.perf_counter()
+    series = fit_series(t, curves, args.max_components, residual_tol=args.residual_tol, progress=progress)
+    write_tracks(args.output, series, labels)
+    n_warm = sum(item['warm'] for item in series)
+    print(f"Готово: {len(series)} кривых ({n_warm} с тёплым стартом) за {time.perf_counter() - start:.2f} с "
+          f"-> {args.output}", file=sys.stderr)
+    return 0
+
+
+def cmd_serve(args):
+    import os
+
+    from .service import serve
+
+    workers = args.workers or os.cpu_count() or 1
+    print(f"Сервис расчёта: http://{args.host}:{args.port} (POST /fit, GET /metrics), процессов {workers}, "
+          f"пакет до {args.max_batch} кривых", file=sys.stderr)
+    serve(args.host, args.port, quiet=not args.verbose, workers=workers, max_batch=args.max_batch,
+          max_wait=args.max_wait_ms / 1e3, max_queue=args.max_queue, result_cache=result_cache(args))
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m nmr', description="ЯМР Анализатор без GUI")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_fit = sub.add_parser('fit', help="пакетная аппроксимация файлов")
+    p_fit.add_argument('inputs', nargs='+', help="файлы, папки или шаблоны (glob)")
+    p_fit.add_argument('-n', '--max-components', type=int, default=4)
+    p_fit.add_argument('-w', '--workers', type=int, default=None,
+                       help="число процессов (по умолчанию - число ядер)")
+    p_fit.add_argument('-o', '--output', default='results.csv')
+    p_fit.add_argument('--format', choices=['csv', 'parquet'], default=None,
+                       help="по умолчанию определяется по расширению файла")
+    p_fit.add_argument('--profile-log', default=None,
+                       help="журнал профилирования (JSON lines): время этапов, nfev/njev, статус решателя")
+    p_fit.add_argument('--grid', choices=['fixed', 'adaptive'], default='fixed',
+                       help="сетка T2: фиксированная (150 точек) или грубая со сгущением около пиков")
+    add_reduce_arg(p_fit)
+    add_result_cache_args(p_fit)
+    p_fit.add_argument('-q', '--quiet', action='store_true')
+    p_fit.set_defaults(func=cmd_fit)
+
+    p_report = sub.add_parser('report', help="отчёты по файлам: многостраничный PDF или папка PNG")
+    p_report.add_argument('inputs', nargs='+', help="файлы, папки или шаблоны (glob)")
+    p_report.add_argument('-n', '--max-components', type=int, default=4)
+    p_report.add_argument('-w', '--workers', type=int, default=None,
+                          help="число процессов (по умолчанию - число ядер)")
+    p_report.add_argument('-o', '--output', default='reports.pdf',
+                          help="файл .pdf (страница на кривую) или папка для PNG")
+    p_report.add_argument('--dpi', type=int, default=300)
+    p_report.add_argument('--grid', choices=['fixed', 'adaptive'], default='fixed')
+    add_reduce_arg(p_report)
+    add_result_cache_args(p_report)
+    p_report.add_argument('-q', '--quiet', action='store_true')
+    p_report.set_defaults(func=cmd_report)
+
+    p_series = sub.add_parser('series', help="серия кривых одного образца (в порядке съёмки) с отслеживанием компонент")
+    p_series.add_argument('inputs', nargs='+', help="файлы по порядку съёмки (папки и шаблоны - по имени)")
+    p_series.add_argument('-n', '--max-components', type=int, default=4)
+    p_series.add_argument('-o', '--output', default='series.csv')
+    p_series.add_argument('--residual-tol', type=float, default=0.25,
+                          help="допустимый рост невязки при тёплом старте до полного поиска")
+    p_series.add_argument('-q', '--quiet', action='store_true')
+    p_series.set_defaults(func=cmd_series)
+
+    p_stream = sub.add_parser('stream', help="аппроксимация во время записи (файл дописывается или stdin)")
+    p_stream.add_argument('source', help="дописываемый файл или '-' для stdin")
+    p_stream.add_argument('-n', '--max-components', type=int, default=4)
+    p_stream.add_argument('--t2-max', type=float, default=10.0,
+                          help="верхняя граница сетки T2, с (длина записи заранее неизвестна)")
+    p_stream.add_argument('--interval', type=float, default=0.25,
+                          help="минимальный интервал между обновлениями решения, с")
+    p_stream.add_argument('--idle-timeout', type=float, default=None,
+                          help="завершить, если файл не растёт столько секунд")
+    p_stream.add_argument('--chunk-lines', type=int, default=256)
+    p_stream.set_defaults(func=cmd_stream)
+
+    p_serve = sub.add_parser('serve', help="локальный HTTP-сервис расчёта с пакетированием запросов")
+    p_serve.add_argument('--host', default='127.0.0.1')
+    p_serve.add_argument('--port', type=int, default=8765)
+    p_serve.add_argument('-w', '--workers', type=int, default=None,
+                         help="число процессов (по умолчанию - число ядер)")
+    p_serve.add_argument('--max-batch', type=int, default=32, help="кривых с общей осью времени в одном пакете")
+    p_serve.add_argument('--max-wait-ms', type=float, default=5.0,
+                         help="сколько ждать попутчиков для пакета, мс")
+    p_serve.add_argument('--max-queue', type=int, default=256,
+                         help="предел очереди; сверх него - ответ 503 (Retry-After)")
+    add_result_cache_args(p_serve)
+    p_serve.add_argument('-v', '--verbose', action='store_true', help="журнал HTTP-запросов")
+    p_serve.set_defaults(func=cmd_serve)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
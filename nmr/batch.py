@@ -0,0 +1,144 @@
+import csv
+import glob
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from .core import shared_core
+from .io import load_curves
+
+DATA_EXTENSIONS = ('.txt', '.nmr')
+COLUMNS = ['file', 'curve', 'n_components', 'component', 'T2', 'Share',
+           'offset_norm', 'offset_abs', 'amplitude', 'y_max', 'error']
+
+
+def collect_files(inputs):
+    files = []
+    for item in inputs:
+        if os.path.isdir(item):
+            found = [os.path.join(item, f) for f in os.listdir(item)
+                     if f.lower().endswith(DATA_EXTENSIONS)]
+        elif any(c in item for c in '*?['):
+            found = glob.glob(item, recursive=True)
+        else:
+            found = [item]
+        files.extend(sorted(found))
+    return files
+
+
+def fit_file(path, max_components=4, profile_log=None, grid='fixed', result_cache=None, reduce_ratio=None):
+    # NMRCore процесса-воркера для этих настроек; result_cache - путь к общему хранилищу результатов
+    core = shared_core(result_cache, profile_log=profile_log, grid=grid, reduce_ratio=reduce_ratio)
+    try:
+        t, Y = load_curves(path)
+        # Имя файла попадает в запись журнала профилирования
+        diagnostics = {'file': path} if profile_log else None
+        # Несколько кривых с общим столбцом времени - одним пакетом
+        if len(Y) > 1:
+            fits = core.fit_many(t, Y, max_components, diagnostics)
+        else:
+            fits = [core.fit(t, Y[0], max_components, diagnostics=diagnostics)]
+    except Exception as e:
+        return [dict(file=path, n_components=0, error=str(e))]
+
+    rows = []
+    for curve, (y, (results, _, _, offset_norm, amp_scale)) in enumerate(zip(Y, fits), start=1):
+        y_max = float(np.max(y))
+        common = dict(file=path, curve=curve, n_components=len(results), offset_norm=float(offset_norm),
+                      offset_abs=float(offset_norm) * y_max, amplitude=float(amp_scale), y_max=y_max)
+        if not results:
+            rows.append(common)
+            continue
+        rows.extend(dict(common, component=i + 1, T2=float(r['T2']), Share=float(r['Share']))
+                    for i, r in enumerate(results))
+    return rows
+
+
+# === Потоковая запись результатов ===
+class CsvWriter:
+    def __init__(self, path):
+        self._fh = open(path, 'w', newline='', encoding='utf-8')
+        self._writer = csv.DictWriter(self._fh, fieldnames=COLUMNS, restval='')
+        self._writer.writeheader()
+
+    def write(self, rows):
+        self._writer.writerows(rows)
+        self._fh.flush()
+
+    def close(self):
+        self._fh.close()
+
+
+class ParquetWriter:
+    def __init__(self, path, row_group_size=1000):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Для вывода в Parquet требуется пакет pyarrow")
+        self._pa = pa
+        self._schema = pa.schema([
+            ('file', pa.string()), ('curve', pa.int32()), ('n_components', pa.int32()),
+            ('component', pa.int32()), ('T2', pa.float64()), ('Share', pa.float64()), ('offset_norm', pa.float64()),
+            ('offset_abs', pa.float64()), ('amplitude', pa.float64()), ('y_max', pa.float64()),
+            ('error', pa.string())])
+        self._writer = pq.ParquetWriter(path, self._schema)
+        self._rows = []
+        self._row_group_size = row_group_size
+
+    def write(self, rows):
+        self._rows.extend(rows)
+        if len(self._rows) >= self._row_group_size:
+            self._flush()
+
+    def _flush(self):
+        if not self._rows:
+            return
+        cols = {c: [r.get(c) for r in self._rows] for c in COLUMNS}
+        self._writer.write_table(self._pa.Table.from_pydict(cols, schema=self._schema))
+        self._rows = []
+
+    def close(self):
+        self._flush()
+        self._writer.close()
+
+
+def open_writer(path, fmt=None):
+    fmt = fmt or ('parquet' if path.lower().endswith(('.parquet', '.pq')) else 'csv')
+    if fmt == 'parquet':
+        return ParquetWriter(path)
+    return CsvWriter(path)
+
+
+def iter_fits(files, max_components=4, workers=None, profile_log=None, grid='fixed', result_cache=None,
+              reduce_ratio=None):
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for path in files:
+            yield fit_file(path, max_components, profile_log, grid, result_cache, reduce_ratio)
+        return
+    # spawn, а не fork: пакет может запускаться из рабочего потока GUI
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        futures = [pool.submit(fit_file, path, max_components, profile_log, grid, result_cache, reduce_ratio)
+                   for path in files]
+        for fut in as_completed(futures):
+            yield fut.result()
+
+
+def run_batch(files, out_path, max_components=4, workers=None, fmt=None, progress=None, profile_log=None,
+              grid='fixed', result_cache=None, reduce_ratio=None):
+    writer = open_writer(out_path, fmt)
+    n_done = n_failed = 0
+    try:
+        for rows in iter_fits(files, max_components, workers, profile_log, grid, result_cache, reduce_ratio):
+            writer.write(rows)
+            n_done += 1
+            if rows[0].get('error'):
+                n_failed += 1
+            if progress:
+                progress(n_done, len(files), rows[0]['file'])
+    finally:
+        writer.close()
+    return n_done, n_failed
@@ -0,0 +1,488 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from .diagnostics import NULL_DIAGNOSTICS, FitDiagnostics, write_profile
+from .kernels import CHUNK_ROWS, KernelCache, build_kernel, compress_gram, compress_rows, extend_gram, refine_grid
+from .model import MultiExpModel, least_squares_batch, multiexp
+from .nnls import nnls_gram
+from .reduce import reduce_train
+from .regularize import tikhonov_from_gram
+from .utils import no_progress
+
+# scipy.optimize импортируется внутри методов: импорт пакета (воркеры, CLI) не платит
+# за его загрузку (~0,5 с), пока не понадобится расчёт
+GRID_SIZE = 150
+# Версия алгоритма для хранилища результатов (results.ResultStore): увеличивать при любом
+# изменении, влияющем на результат fit (сетка, поиск пиков, границы, уточнение)
+FIT_VERSION = 2
+# Адаптивная сетка: грубая сетка, затем до GRID_LEVELS сгущений вокруг пиков,
+# пока положения пиков меняются больше чем на GRID_TOL (по ln T2).
+# Пики ближе MERGE_STEPS шагов грубой сетки считаются одной компонентой
+COARSE_SIZE = 40
+GRID_LEVELS = 3
+GRID_TOL = 0.02
+MERGE_STEPS = 1.5
+# NNLS: 'gram' - активные множества по K^T K с тёплым стартом (nnls.nnls_gram), 'scipy' - scipy.optimize.nnls
+NNLS_METHODS = ('gram', 'scipy')
+# Сколько пассивных множеств (по разным сеткам T2) хранится для тёплого старта
+WARM_STARTS = 16
+# Сколько NMRCore с разными настройками держит процесс (shared_core)
+SHARED_CORES = 4
+
+_shared = OrderedDict()
+_shared_lock = threading.Lock()
+
+
+class FitCancelled(Exception):
+    pass
+
+
+def shared_core(result_cache=None, **settings):
+    # NMRCore процесса-воркера (или GUI) для данных настроек: кэш ядер и тёплый старт NNLS
+    # переживают вызовы, а вызов с другими настройками получает свой экземпляр.
+    # result_cache - путь к хранилищу результатов (results.ResultStore)
+    key = (result_cache,) + tuple(sorted(settings.items()))
+    with _shared_lock:
+        core = _shared.get(key)
+        if core is None:
+            from .results import open_store
+            core = NMRCore(result_store=open_store(result_cache) if result_cache else None, **settings)
+            _shared[key] = core
+            while len(_shared) > SHARED_CORES:
+                _shared.popitem(last=False)
+        _shared.move_to_end(key)
+        return core
+
+
+class NMRCore:
+    def __init__(self, kernel_cache=None, refine_method='full', profile_log=None, chunk_rows=CHUNK_ROWS,
+                 grid='fixed', coarse_size=COARSE_SIZE, grid_levels=GRID_LEVELS, result_store=None,
+                 nnls_method='gram', reduce_ratio=None):
+        if grid not in ('fixed', 'adaptive'):
+            raise ValueError(f"Неизвестный режим сетки T2: {grid}")
+        if nnls_method not in NNLS_METHODS:
+            raise ValueError(f"Неизвестный решатель NNLS: {nnls_method}")
+        if reduce_ratio is not None and reduce_ratio <= 1:
+            raise ValueError(f"Отношение ширины окон должно быть больше 1: {reduce_ratio}")
+        self.kernels = kernel_cache if kernel_cache is not None else KernelCache()
+        # Кривые длиннее chunk_rows решаются без плотного ядра: оно строится блоками
+        # и сжимается (kernels.compress_rows), память NNLS не растёт с числом эхо
+        self.chunk_rows = chunk_rows
+        # 'full' - все параметры с аналитическим якобианом, 'varpro' - только T2 нелинейно
+        self.refine_method = refine_method
+        # Путь к журналу профилирования (JSON lines); None - журнал не ведётся
+        self.profile_log = profile_log
+        # Сетка T2 в fit(): 'fixed' - GRID_SIZE точек, 'adaptive' - coarse_size точек
+        # и до grid_levels сгущений вокруг пиков
+        self.grid = grid
+        self.coarse_size = coarse_size
+        self.grid_levels = grid_levels
+        # Хранилище готовых результатов (results.ResultStore); None - всегда считать заново
+        self.results = result_store
+        # Решатель NNLS и пассивные множества последних решений по сеткам T2 (тёплый старт)
+        self.nnls_method = nnls_method
+        self._passive = OrderedDict()
+        self._passive_lock = threading.Lock()
+        # Сжатие цепочки перед NNLS и уточнением (reduce.reduce_train): None - все эхо,
+        # число > 1 - средние по окнам, ширина которых растёт в reduce_ratio раз
+        self.reduce_ratio = reduce_ratio
+
+    def fit(self, t, y, max_components=4, progress=None, diagnostics=None):
+        # progress(stage, value) вызывается между этапами и на каждой итерации
+        # уточнения; для отмены расчёта колбэк выбрасывает FitCancelled.
+        # diagnostics - dict, в который записываются время этапов и сведения о решателях
+        progress = progress or no_progress
+        if diagnostics is None and self.profile_log is not None:
+            diagnostics = {}
+        diag = FitDiagnostics() if diagnostics is not None else NULL_DIAGNOSTICS
+        key = None
+        if self.results is not None:
+            key = self.results.key(t, y, self.fit_settings(max_components))
+            x = self.results.get(key)
+            diag.set(result_cached=x is not None)
+        if key is not None and x is not None:
+            result = self.result_from(t, y, x)
+        else:
+            result = self._fit(t, y, max_components, progress, diag)
+            if key is not None:
+                self.results.put(key, as_params(result))
+        if diagnostics is not None:
+            diag.finish()
+            diagnostics.update(diag)
+            if self.profile_log is not None:
+                write_profile(self.profile_log, diagnostics)
+        return result
+
+    def _fit(self, t, y, max_components, progress, diag):
+        y_max = np.max(y)
+        y_norm = y / y_max
+
+        if self.reduce_ratio is not None:
+            diag.mark('reduce')
+        t_fit, y_fit, weights = self.reduce(t, y_norm)
+        progress('kernel', 0)
+        diag.mark('kernel')
+        if self.grid == 'adaptive':
+            t2_grid, amps_grid, rnorm, peaks = self.adaptive_nnls(t_fit, y_fit, max_components, progress, diag,
+                                                                  weights, t)
+        else:
+            t2_grid = self.t2_grid(t)
+            amps_grid, rnorm = self.grid_nnls(t_fit, y_fit, t2_grid, progress, diag, weights)
+            progress('peaks', 0)
+            diag.mark('peaks')
+            peaks = self.find_peaks(amps_grid, t2_grid, max_components)
+        if weights is not None:
+            # Невязка в пересчёте на все эхо: разброс внутри окон от модели не зависит
+            rnorm = np.sqrt(rnorm**2 + max(y_norm @ y_norm - weights @ y_fit**2, 0.0))
+            diag.set(reduced_points=len(t_fit))
+        diag.set(n_points=len(t), grid=self.grid, grid_size=len(t2_grid), nnls_residual=float(rnorm))
+        if diag.enabled:
+            diag.set(n_candidates=int(np.sum(self.peak_mask(amps_grid[np.newaxis, :]))), n_peaks=len(peaks))
+        if not peaks: return [], y, np.zeros_like(y), 0.0, 1.0
+        diag.mark('refine')
+        result = self.refine(t_fit, y_fit, y_max, peaks, progress, diag, weights, t)
+        # После уточнения по окнам кривая модели и остатки - по всем эхо
+        return result if weights is None else self.result_from(t, y, as_params(result))
+
+    def fit_many(self, t, Y, max_components=4, diagnostics=None):
+        # Пакет кривых с общей осью времени: ядро (и K^T K или QR) строится один раз,
+        # NNLS решается на квадратной системе 150x150 вместо K (n_points x 150)
+        Y = np.atleast_2d(np.asarray(Y, dtype=float))
+        if Y.shape[1] != len(t):
+            raise ValueError(f"Длина кривых ({Y.shape[1]}) не совпадает с осью времени ({len(t)})")
+        if self.results is None:
+            return self._fit_many(t, Y, max_components, diagnostics)
+        # Из хранилища - готовые кривые, пакетом считаются только остальные
+        settings = self.fit_settings(max_components, grid='fixed')
+        keys = [self.results.key(t, y, settings) for y in Y]
+        out = [self.results.get(key) for key in keys]
+        missing = [i for i, x in enumerate(out) if x is None]
+        out = [self.result_from(t, y, x) if x is not None else None for y, x in zip(Y, out)]
+        if diagnostics is not None:
+            diagnostics['n_result_cached'] = len(Y) - len(missing)
+        if missing:
+            for i, result in zip(missing, self._fit_many(t, Y[missing], max_components, diagnostics)):
+                self.results.put(keys[i], as_params(result))
+                out[i] = result
+        return out
+
+    def _fit_many(self, t, Y, max_components, diagnostics):
+        y_max = np.max(Y, axis=1)
+        Y_norm = Y / y_max[:, np.newaxis]
+
+        if diagnostics is None and self.profile_log is not None:
+            diagnostics = {}
+        diag = FitDiagnostics() if diagnostics is not None else NULL_DIAGNOSTICS
+        if self.reduce_ratio is not None:
+            diag.mark('reduce')
+        # Окна зависят только от t - общие для всех кривых пакета
+        t_fit, Y_fit, weights = self.reduce(t, Y_norm)
+        diag.mark('kernel')
+        t2_grid = self.t2_grid(t)
+        if self.nnls_method == 'gram':
+            G, B = self.kernels.gram(t_fit, t2_grid, Y_fit.T, self.chunk_rows, weights)
+            diag.mark('nnls')
+            # Каждая кривая стартует с пассивного множества предыдущей
+            amps, n_iter, n_fallback = [], 0, 0
+            yy = np.sum(Y_fit**2 * (weights if weights is not None else 1.0), axis=1)
+            for b, yy in zip(B.T, yy):
+                x, _, info = self.solve_nnls(G, b, yy, t2_grid)
+                amps.append(x)
+                n_iter += info['nnls_iter']
+                n_fallback += info['nnls_solver'] != 'fnnls'
+            amps = np.array(amps)
+            diag.set(nnls_iter=n_iter, nnls_fallback=n_fallback)
+        else:
+            if weights is not None:
+                sw = np.sqrt(weights)
+                Q, R = np.linalg.qr(sw[:, np.newaxis] * build_kernel(t_fit, t2_grid))
+                QtY = (Y_fit * sw) @ Q
+            elif len(t) > self.chunk_rows:
+                R, QtY, _ = compress_rows(t, Y_norm.T, t2_grid, self.chunk_rows)
+                QtY = QtY.T
+            else:
+                Q, R = self.kernels.get(t, t2_grid).qr()
+                QtY = Y_norm @ Q
+            diag.mark('nnls')
+            from scipy.optimize import nnls
+            amps = np.array([nnls(R, b)[0] for b in QtY])
+
+        diag.mark('peaks')
+        all_peaks = self.find_peaks_many(amps, t2_grid, max_components)
+        diag.mark('refine')
+        params, n_iter = self.refine_many(t_fit, Y_fit, all_peaks, weights, t)
+        diag.set(refine_iter=n_iter)
+        # Кривая модели и остатки - по всем эхо
+        out = [self.result_from(t, y, x) for y, x in zip(Y, params)]
+        if diagnostics is not None:
+            diag.finish()
+            diag.set(n_curves=len(Y), n_points=len(t), grid_size=len(t2_grid))
+            if weights is not None:
+                diag.set(reduced_points=len(t_fit))
+            diagnostics.update(diag)
+            if self.profile_log is not None:
+                write_profile(self.profile_log, diagnostics)
+        return out
+
+    def distribution(self, t, y, method='gcv', alphas=None, alpha=None, progress=None):
+        # Непрерывное распределение T2 (Тихонов, alpha по GCV или L-кривой) на сетке t2_grid;
+        # dist - амплитуды в долях от максимума сигнала
+        progress = progress or no_progress
+        y_norm = y / np.max(y)
+        progress('kernel', 0)
+        t2_grid = self.t2_grid(t)
+        # Со сжатием - по окнам с весами; с полным y^T y невязка та же, что по всем эхо
+        t_fit, y_fit, weights = self.reduce(t, y_norm)
+        G, b = self.kernels.gram(t_fit, t2_grid, y_fit, self.chunk_rows, weights)
+        progress('distribution', 0)
+        return tikhonov_from_gram(G, b, y_norm @ y_norm, len(t), t2_grid, method, alphas, alpha)
+
+    def streaming(self, max_components=4, **kwargs):
+        # Режим накопления во время записи: порции эхо добавляются через add(), решение - solve()
+        from .streaming import StreamingFit
+        return StreamingFit(max_components, refine_method=self.refine_method, nnls_method=self.nnls_method,
+                            **kwargs)
+
+    def fit_series(self, t, Y, max_components=4, **kwargs):
+        # Упорядоченная серия кривых: тёплый старт от предыдущей и таблица треков компонент
+        from .series import fit_series
+        return fit_series(t, Y, max_components, core=self, **kwargs)
+
+    def fit_orders(self, t, y, max_components=6, **kwargs):
+        # Все модели из 1..max_components компонент за один NNLS и их сравнение по AIC/BIC/F-тесту
+        from .selection import fit_orders
+        return fit_orders(t, y, max_components, core=self, **kwargs)
+
+    def settings(self):
+        # Аргументы конструктора, задающие расчёт: такой же NMRCore в другом процессе
+        return {'refine_method': self.refine_method, 'chunk_rows': self.chunk_rows, 'grid': self.grid,
+                'coarse_size': self.coarse_size, 'grid_levels': self.grid_levels, 'nnls_method': self.nnls_method,
+                'reduce_ratio': self.reduce_ratio}
+
+    def fit_settings(self, max_components, grid=None):
+        # Всё, от чего зависит результат fit при тех же t, y (ключ хранилища результатов);
+        # fit_many всегда работает на фиксированной сетке
+        grid = grid or self.grid
+        settings = {'max_components': int(max_components), 'refine_method': self.refine_method,
+                    'chunk_rows': int(self.chunk_rows), 'grid': grid, 'grid_size': GRID_SIZE,
+                    'nnls': self.nnls_method, 'reduce_ratio': self.reduce_ratio}
+        if grid == 'adaptive':
+            settings.update(coarse_size=int(self.coarse_size), grid_levels=int(self.grid_levels))
+        return settings
+
+    def result_from(self, t, y, x):
+        # Кортеж результата fit по вектору параметров [a..., T2..., B] (пустой - нет компонент)
+        if len(x) == 0:
+            return [], y, np.zeros_like(y), 0.0, 1.0
+        y_max = np.max(y)
+        y_f_n = multiexp(x, t)
+        results, offset_norm, amp_scale = components(x)
+        return results, y_f_n * y_max, (y / y_max - y_f_n), offset_norm, amp_scale
+
+    # === Этапы расчёта ===
+    def reduce(self, t, y_norm):
+        # Точки для NNLS и уточнения: все эхо или средние по окнам (reduce_ratio) с весами;
+        # y_norm - кривая или матрица кривых
+        if self.reduce_ratio is None:
+            return t, y_norm, None
+        return reduce_train(t, y_norm, self.reduce_ratio)
+
+    def t2_grid(self, t, size=GRID_SIZE):
+        dt = t[1] - t[0]
+        return np.logspace(np.log10(max(1e-7, dt)), np.log10(t[-1]), size)
+
+    def solve_nnls(self, G, b, yy, t2_grid, passive=None):
+        # NNLS по нормальным уравнениям. Без passive - тёплый старт с последнего решения на той же
+        # сетке T2: повторный расчёт с другим числом компонент, соседние кривые серии или пакета
+        key = (len(t2_grid), float(t2_grid[0]), float(t2_grid[-1]))
+        if passive is None:
+            with self._passive_lock:
+                passive = self._passive.get(key)
+        x, rnorm, P, info = nnls_gram(G, b, yy, passive)
+        with self._passive_lock:
+            self._passive[key] = P
+            self._passive.move_to_end(key)
+            while len(self._passive) > WARM_STARTS:
+                self._passive.popitem(last=False)
+        return x, rnorm, info
+
+    def grid_nnls(self, t, y_norm, t2_grid, progress, diag, weights=None):
+        # NNLS на сетке t2_grid; длинные кривые - через блочное сжатие ядра (scipy) или K^T K по блокам.
+        # weights - веса точек (сжатая цепочка): min ||W^1/2 (K x - y)||
+        if weights is not None and self.nnls_method == 'scipy':
+            from scipy.optimize import nnls
+            sw = np.sqrt(weights)
+            progress('nnls', 0)
+            diag.mark('nnls')
+            return nnls(sw[:, np.newaxis] * build_kernel(t, t2_grid), sw * y_norm)
+        if self.nnls_method == 'gram':
+            hits = self.kernels.hits
+            G, b = self.kernels.gram(t, t2_grid, y_norm, self.chunk_rows, weights)
+            diag.set(kernel_cached=self.kernels.hits > hits)
+            progress('nnls', 0)
+            diag.mark('nnls')
+            yy = y_norm @ y_norm if weights is None else weights @ y_norm**2
+            amps_grid, rnorm, info = self.solve_nnls(G, b, yy, t2_grid)
+            diag.set(**info)
+            return amps_grid, rnorm
+        from scipy.optimize import nnls
+        if len(t) > self.chunk_rows:
+            A, d, lost = compress_rows(t, y_norm, t2_grid, self.chunk_rows)
+            diag.set(compressed_rank=len(A))
+            progress('nnls', 0)
+            diag.mark('nnls')
+            amps_grid, rnorm = nnls(A, d)
+            return amps_grid, np.hypot(rnorm, lost)
+        hits = self.kernels.hits
+        K = self.kernels.get(t, t2_grid).K
+        diag.set(kernel_cached=self.kernels.hits > hits)
+        progress('nnls', 0)
+        diag.mark('nnls')
+        return nnls(K, y_norm)
+
+    def adaptive_nnls(self, t, y_norm, max_components, progress, diag, weights=None, t_full=None):
+        # Грубый NNLS, затем сетка сгущается только около найденных пиков;
+        # повтор, пока число пиков и их положения не перестанут меняться.
+        # Решение по нормальным уравнениям: при сгущении считаются только новые столбцы,
+        # а решатель 'gram' стартует с пассивного множества предыдущего уровня.
+        # t_full - исходная ось времени сжатой цепочки: границы сетки - по ней, как без сжатия
+        from scipy.optimize import nnls
+        t2_grid = self.t2_grid(t if t_full is None else t_full, self.coarse_size)
+        min_gap = MERGE_STEPS * np.log(t2_grid[1] / t2_grid[0])
+        G, b = self.kernels.gram(t, t2_grid, y_norm, self.chunk_rows, weights)
+        yy = y_norm @ y_norm if weights is None else weights @ y_norm**2
+        prev = passive = None
+        n_iter = 0
+        for level in range(self.grid_levels + 1):
+            progress('nnls', level)
+            diag.mark('nnls')
+            if self.nnls_method == 'gram':
+                amps_grid, rnorm, info = self.solve_nnls(G, b, yy, t2_grid, passive)
+                n_iter += info['nnls_iter']
+                diag.set(nnls_solver=info['nnls_solver'], nnls_iter=n_iter)
+            else:
+                A, d = compress_gram(G, b)
+                amps_grid, rnorm = nnls(A, d)
+                # Невязка вне образа сжатой системы: ||y||^2 - ||d||^2
+                rnorm = np.sqrt(max(rnorm**2 + yy - d @ d, 0.0))
+            progress('peaks', level)
+            diag.mark('peaks')
+            peaks = merge_peaks(self.find_peaks(amps_grid, t2_grid, max_components), min_gap)
+            pos = np.log([p[1] for p in peaks])
+            if not peaks or level == self.grid_levels:
+                break
+            if prev is not None and len(pos) == len(prev) and np.all(np.abs(pos - prev) <= GRID_TOL):
+                break
+            prev = pos
+            progress('kernel', level + 1)
+            diag.mark('kernel')
+            centers = np.searchsorted(t2_grid, np.exp(pos)).clip(0, len(t2_grid) - 1)
+            old_grid = t2_grid
+            t2_grid, G, b = extend_gram(t, y_norm, t2_grid, G, b, refine_grid(t2_grid, centers), self.chunk_rows,
+                                        weights)
+            passive = np.isin(t2_grid, old_grid[amps_grid > 0])
+        diag.set(grid_levels=level)
+        return t2_grid, amps_grid, rnorm, peaks
+
+    def find_peaks(self, amps_grid, t2_grid, max_components):
+        return self.find_peaks_many(amps_grid[np.newaxis, :], t2_grid, max_components)[0]
+
+    def peak_mask(self, amps):
+        # Локальные максимумы спектра выше 1% от наибольшего (по внутренним точкам сетки)
+        mid = amps[:, 1:-1]
+        return (mid > amps[:, :-2]) & (mid > amps[:, 2:]) & (mid > np.max(amps, axis=1, keepdims=True) * 0.01)
+
+    def find_peaks_many(self, amps, t2_grid, max_components):
+        # Пики по всем кривым сразу: не больше max_components наибольших на кривую
+        out = []
+        for row, m in zip(amps[:, 1:-1], self.peak_mask(amps)):
+            idx = np.flatnonzero(m)
+            idx = idx[np.argsort(-row[idx], kind='stable')][:max_components]
+            out.append([[row[i], t2_grid[i + 1]] for i in idx])
+        return out
+
+    def refine(self, t, y_norm, y_max, peaks, progress=None, diag=NULL_DIAGNOSTICS, weights=None, t_full=None):
+        x0 = [p[0] for p in peaks] + [p[1] for p in peaks] + [0.0]
+        return self.refine_from(t, y_norm, y_max, x0, progress, diag, weights, t_full)
+
+    def refine_many(self, t, Y_norm, all_peaks, weights=None, t_full=None):
+        # Уточнение пакета: кривые с одинаковым числом компонент - одним пакетным
+        # Левенбергом-Марквардтом (model.least_squares_batch), VARPRO - по кривой.
+        # Возвращает векторы [a..., T2..., B] (пустой - нет пиков) и суммарное число итераций
+        out = [np.zeros(0)] * len(Y_norm)
+        groups = {}
+        for i, peaks in enumerate(all_peaks):
+            if peaks:
+                groups.setdefault(len(peaks), []).append(i)
+        n_iter = 0
+        for n, idx in groups.items():
+            lower, upper = self.bounds(t if t_full is None else t_full, n)
+            X0 = np.array([[p[0] for p in all_peaks[i]] + [p[1] for p in all_peaks[i]] + [0.0] for i in idx])
+            if self.refine_method == 'full':
+                X, it = least_squares_batch(t, Y_norm[idx], X0, lower, upper, weights)
+                n_iter += int(np.sum(it))
+            else:
+                res = [MultiExpModel(t, Y_norm[i], weights).fit(np.clip(x0, lower, upper), lower, upper,
+                                                                self.refine_method) for i, x0 in zip(idx, X0)]
+                X = [r.x for r in res]
+                n_iter += sum(int(r.nfev) for r in res)
+            for i, x in zip(idx, X):
+                out[i] = x
+        return out, n_iter
+
+    def bounds(self, t, n):
+        dt = t[1] - t[0]
+        return np.array([0]*n + [dt/5]*n + [-0.1]), np.array([2]*n + [t[-1]*2]*n + [0.1])
+
+    def refine_from(self, t, y_norm, y_max, x0, progress=None, diag=NULL_DIAGNOSTICS, weights=None,
+                    t_full=None):
+        # Уточнение из готового начального приближения [a..., T2..., B]. t_full - исходная ось
+        # времени, если t - центры окон сжатой цепочки: границы T2 те же, что без сжатия
+        lower, upper = self.bounds(t if t_full is None else t_full, (len(x0) - 1) // 2)
+        x0 = np.clip(x0, lower, upper)
+
+        model = MultiExpModel(t, y_norm, weights)
+        if progress is not None:
+            model.on_eval = lambda k: progress('refine', k)
+        res = model.fit(x0, lower, upper, self.refine_method)
+        diag.set(refine_method=self.refine_method, n_components=len(x0) // 2, nfev=int(res.nfev),
+                 njev=int(res.njev) if res.njev is not None else None, status=int(res.status),
+                 message=str(res.message), cost=float(res.cost), model_evals=model.n_evals)
+
+        y_f_n = model.evaluate(res.x)
+        results, offset_norm, amp_scale = components(res.x)
+        return results, y_f_n * y_max, (y_norm - y_f_n), offset_norm, amp_scale
+
+
+def as_params(result):
+    # Результат fit -> вектор [a..., T2..., B] (компоненты по возрастанию T2); пустой, если их нет
+    results, _, _, offset_norm, amp_scale = result
+    if not results:
+        return np.zeros(0)
+    return np.array([r['Share'] * amp_scale for r in results] + [r['T2'] for r in results] + [offset_norm])
+
+
+def components(x):
+    # Вектор [a..., T2..., B] -> компоненты (по возрастанию T2), смещение и сумма амплитуд
+    if len(x) == 0:
+        return [], 0.0, 1.0
+    n_c = (len(x)-1)//2
+    sum_a = np.sum(x[:n_c])
+    results = [{'T2': x[n_c+i], 'Share': x[i]/sum_a if sum_a > 0 else 0} for i in range(n_c)]
+    return sorted(results, key=lambda r: r['T2']), x[-1], sum_a
+
+
+def merge_peaks(peaks, min_gap):
+    # Слияние пиков ближе min_gap по ln T2 (на мелкой сетке NNLS дробит одну компоненту):
+    # амплитуды складываются, положение - среднее ln T2 с весами амплитуд
+    merged = []
+    for a, t2 in sorted(peaks, key=lambda p: p[1]):
+        if merged and np.log(t2) - merged[-1][2] < min_gap:
+            a0, _, log0 = merged[-1]
+            log_t2 = (a0 * log0 + a * np.log(t2)) / (a0 + a)
+            merged[-1] = [a0 + a, np.exp(log_t2), log_t2]
+        else:
+            merged.append([a, t2, np.log(t2)])
+    return [[a, t2] for a, t2, _ in merged]
@@ -0,0 +1,71 @@
+import numpy as np
+
+
+# === Прореживание для отрисовки: не больше нескольких точек на пиксель ===
+def visible_range(x, x_range=None):
+    if x_range is None:
+        return 0, len(x)
+    i0 = np.searchsorted(x, x_range[0], 'left')
+    i1 = np.searchsorted(x, x_range[1], 'right')
+    # Соседние точки за границами, чтобы линия доходила до края осей
+    return max(0, i0 - 1), min(len(x), i1 + 1)
+
+
+def _is_sorted(x):
+    return len(x) < 2 or bool(np.all(x[1:] >= x[:-1]))
+
+
+def minmax_indices(x, y, n_buckets, x_range=None, log_y=False, fill=4):
+    # Минимум и максимум в каждом столбце пикселей: огибающая шума сохраняется.
+    # fill * n_buckets равномерно взятых точек добавляются, чтобы была видна плотность облака.
+    # log_y - для полулогарифмического графика: неположительные значения там не видны
+    if not _is_sorted(x):
+        return np.arange(len(x))
+    i0, i1 = visible_range(x, x_range)
+    idx = np.arange(i0, i1)
+    if log_y:
+        idx = idx[y[i0:i1] > 0]
+    if len(idx) <= (2 + fill) * n_buckets:
+        return idx
+
+    xs, ys = x[idx], y[idx]
+    lo, hi = xs[0], xs[-1]
+    if hi <= lo:
+        return idx[[0, -1]]
+    bucket = np.minimum(((xs - lo) / (hi - lo) * n_buckets).astype(np.int64), n_buckets - 1)
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    counts = np.diff(np.r_[starts, len(xs)])
+
+    picked = []
+    for reduce in (np.minimum, np.maximum):
+        extreme = np.repeat(reduce.reduceat(ys, starts), counts)
+        hits = np.flatnonzero(ys == extreme)
+        _, first = np.unique(bucket[hits], return_index=True)
+        picked.append(hits[first])
+    if fill:
+        picked.append(np.linspace(0, len(idx) - 1, fill * n_buckets).astype(np.int64))
+    return idx[np.unique(np.concatenate(picked))]
+
+
+def lttb_indices(x, y, n_out, x_range=None):
+    # Largest-Triangle-Three-Buckets: сохраняет форму линии при малом числе точек
+    if not _is_sorted(x):
+        return np.arange(len(x))
+    i0, i1 = visible_range(x, x_range)
+    n = i1 - i0
+    if n <= n_out or n_out < 3:
+        return np.arange(i0, i1)
+
+    xs, ys = x[i0:i1], y[i0:i1]
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for k in range(n_out - 2):
+        s, e = edges[k], max(edges[k + 1], edges[k] + 1)
+        ns, ne = e, (edges[k + 2] if k + 2 < len(edges) else n)
+        cx, cy = xs[ns:max(ne, ns + 1)].mean(), ys[ns:max(ne, ns + 1)].mean()
+        area = np.abs((xs[a] - cx) * (ys[s:e] - ys[a]) - (xs[a] - xs[s:e]) * (cy - ys[a]))
+        a = s + int(np.argmax(area))
+        out[k + 1] = a
+    return out + i0
@@ -0,0 +1,81 @@
+import json
+import threading
+import time
+
+
+# === Диагностика расчёта: время этапов и сведения о решателях ===
+class FitDiagnostics(dict):
+    # Обычный dict (сериализуется в JSON как есть) с секундомером по этапам
+    enabled = True
+
+    def __init__(self):
+        super().__init__(stages={})
+        self._stage = None
+        self._start = self._t = time.perf_counter()
+
+    def mark(self, stage):
+        now = time.perf_counter()
+        if self._stage is not None:
+            stages = self['stages']
+            stages[self._stage] = stages.get(self._stage, 0.0) + now - self._t
+        self._stage, self._t = stage, now
+
+    def set(self, **values):
+        self.update(values)
+
+    def finish(self):
+        self.mark(None)
+        self['total'] = time.perf_counter() - self._start
+
+
+class _NullDiagnostics:
+    # Заглушка, когда диагностика не запрошена: вызовы ничего не делают
+    enabled = False
+
+    def mark(self, stage):
+        pass
+
+    def set(self, **values):
+        pass
+
+    def finish(self):
+        pass
+
+
+NULL_DIAGNOSTICS = _NullDiagnostics()
+_log_lock = threading.Lock()
+
+
+def write_profile(path, record):
+    # Журнал профилирования: одна строка JSON на расчёт, дописывается
+    line = json.dumps(dict(record, time=time.strftime('%Y-%m-%dT%H:%M:%S')), ensure_ascii=False, default=float)
+    with _log_lock:
+        with open(path, 'a', encoding='utf-8') as fh:
+            fh.write(line + '\n')
+
+
+def format_diagnostics(diag):
+    # Краткая строка для строки состояния
+    if diag.get('result_cached'):
+        return f"результат из хранилища · всего {diag.get('total', 0) * 1e3:.0f} мс"
+    st = diag.get('stages', {})
+    parts = [f"ядро {st.get('kernel', 0) * 1e3:.0f} мс" + (" (кэш)" if diag.get('kernel_cached') else ""),
+             f"NNLS {st.get('nnls', 0) * 1e3:.0f} мс" + nnls_solver(diag) +
+             f", ‖r‖ = {diag.get('nnls_residual', 0):.3g}",
+             f"пики {diag.get('n_peaks', 0)}/{diag.get('n_candidates', 0)}"]
+    if 'reduced_points' in diag:
+        parts.insert(0, f"сжатие {diag.get('n_points', 0)} → {diag['reduced_points']} точек "
+                        f"{st.get('reduce', 0) * 1e3:.0f} мс")
+    if 'nfev' in diag:
+        parts.append(f"уточнение {st.get('refine', 0) * 1e3:.0f} мс, nfev {diag['nfev']}, "
+                     f"njev {diag.get('njev')}, статус {diag.get('status')}")
+    parts.append(f"всего {diag.get('total', 0) * 1e3:.0f} мс")
+    return " · ".join(parts)
+
+
+def nnls_solver(diag):
+    if diag.get('nnls_solver') == 'scipy':
+        return " (запасной scipy)"
+    if 'nnls_iter' in diag:
+        return f" ({diag['nnls_iter']} итер." + (", тёплый старт)" if diag.get('nnls_warm') else ")")
+    return ""
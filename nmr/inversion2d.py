@@ -0,0 +1,94 @@
+import numpy as np
+
+from .kernels import gram_svd
+from .regularize import N_ALPHAS, alpha_sweep
+from .utils import no_progress
+
+# Ядра по осям: первая ось - tau восстановления T1 или b-фактор диффузии, вторая - время эхо
+KERNELS = {
+    'T2': lambda t, x: np.exp(-t[:, np.newaxis] / x),
+    'T1_ir': lambda t, x: 1 - 2 * np.exp(-t[:, np.newaxis] / x),
+    'T1_sr': lambda t, x: 1 - np.exp(-t[:, np.newaxis] / x),
+    'D': lambda b, x: np.exp(-b[:, np.newaxis] * x),
+}
+AXIS_LABELS = {'T2': "T2 (с)", 'T1_ir': "T1 (с)", 'T1_sr': "T1 (с)", 'D': "D (м²/с)"}
+
+
+# === 2D-инверсия M = K1 F K2^T, F >= 0 (T1-T2, D-T2) ===
+# Произведение Кронекера K1 x K2 ((n1 n2) x (m1 m2)) не строится: каждое ядро сжимается своим
+# усечённым SVD, данные проецируются в U1^T M U2 (r1 x r2), а в итерациях участвуют только
+# A1 = S1 V1^T (r1 x m1) и A2 = S2 V2^T (r2 x m2). Память - O(n1 m1 + n2 m2 + n1 n2) на данные.
+def axis_grid(values, kind, size):
+    values = np.asarray(values, dtype=float)
+    positive = values[values > 0]
+    if kind == 'D':
+        lo, hi = 0.1 / positive.max(), 10.0 / positive.min()
+    else:
+        lo, hi = max(1e-7, positive.min()), positive.max()
+    return np.logspace(np.log10(lo), np.log10(hi), size)
+
+
+def compress_axis(K, rtol=1e-6):
+    # Усечённое SVD ядра одной оси по K^T K: s_i > rtol * s_max; U = K V / s не хранится
+    return gram_svd(K.T @ K, rtol**2)
+
+
+def invert_2d(axis1, axis2, M, kind1='T1_ir', kind2='T2', size=(50, 100), alpha=None, alphas=None,
+              rtol=1e-6, max_iter=5000, tol=1e-7, progress=None):
+    progress = progress or no_progress
+    M = np.asarray(M, dtype=float)
+    if M.shape != (len(axis1), len(axis2)):
+        raise ValueError(f"Размер матрицы {M.shape} не совпадает с осями ({len(axis1)}, {len(axis2)})")
+    # Нормировка - после проекции, чтобы не копировать матрицу данных
+    scale = np.max(np.abs(M))
+    mm = np.vdot(M, M) / scale**2
+
+    progress('kernel', 0)
+    grid1, grid2 = axis_grid(axis1, kind1, size[0]), axis_grid(axis2, kind2, size[1])
+    K1 = KERNELS[kind1](axis1, grid1)
+    s1, V1 = compress_axis(K1, rtol)
+    K2 = KERNELS[kind2](axis2, grid2)
+    s2, V2 = compress_axis(K2, rtol)
+    # D = U1^T M U2, U = K V / s
+    D = (V1.T @ (K1.T @ (M @ K2)) @ V2) / np.outer(s1, s2) / scale
+    del K2
+    A1, A2 = s1[:, np.newaxis] * V1.T, s2[:, np.newaxis] * V2.T
+
+    # Выбор alpha - по GCV для задачи без ограничений: сингулярные числа K1 x K2 = s1_i s2_j
+    progress('alpha', 0)
+    s = np.outer(s1, s2).ravel()
+    d = D.ravel()
+    if alphas is None:
+        alphas = s.max() * np.logspace(-6, 0, N_ALPHAS)
+    alphas = np.asarray(alphas, dtype=float)
+    rho2, eta2, gcv = alpha_sweep(s, d, mm - d @ d, M.size, alphas)
+    if alpha is None:
+        alpha = float(alphas[int(np.argmin(gcv))])
+
+    F, n_iter = solve_kron_nonneg(A1, A2, D, alpha, max_iter, tol, progress)
+    resid2 = np.sum((A1 @ F @ A2.T - D)**2) + max(mm - d @ d, 0.0)
+    return {'grid1': grid1, 'grid2': grid2, 'F': F * scale, 'alpha': alpha, 'alphas': alphas, 'gcv': gcv,
+            'rank': (len(s1), len(s2)), 'n_iter': n_iter, 'rms': float(np.sqrt(resid2 / M.size)) * scale,
+            'kind1': kind1, 'kind2': kind2}
+
+
+def solve_kron_nonneg(A1, A2, D, alpha, max_iter=5000, tol=1e-7, progress=None):
+    # FISTA с проекцией на F >= 0 для 0.5 ||A1 F A2^T - D||^2 + 0.5 alpha^2 ||F||^2
+    progress = progress or no_progress
+    lipschitz = (np.linalg.norm(A1, 2) * np.linalg.norm(A2, 2))**2 + alpha**2
+    F = Z = np.zeros((A1.shape[1], A2.shape[1]))
+    AtD = A1.T @ D @ A2
+    G1, G2 = A1.T @ A1, A2.T @ A2
+    momentum = 1.0
+    for it in range(1, max_iter + 1):
+        grad = G1 @ Z @ G2 - AtD + alpha**2 * Z
+        F_new = np.maximum(Z - grad / lipschitz, 0.0)
+        m_new = 0.5 * (1 + np.sqrt(1 + 4 * momentum**2))
+        Z = F_new + ((momentum - 1) / m_new) * (F_new - F)
+        change = np.linalg.norm(F_new - F) / max(np.linalg.norm(F_new), 1e-300)
+        F, momentum = F_new, m_new
+        if it % 100 == 0:
+            progress('inversion', it)
+        if change < tol:
+            break
+    return F, it
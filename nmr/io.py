@@ -0,0 +1,186 @@
+import io
+import json
+import os
+import re
+
+import numpy as np
+
+from .utils import no_progress
+
+CACHE_VERSION = 1
+CHUNK_BYTES = 8 * 2**20
+
+
+# === Разбор текстовых файлов ===
+def _is_number(token):
+    try:
+        float(token.replace(',', '.'))
+        return True
+    except ValueError:
+        return False
+
+
+def sniff_line(line):
+    # Формат по строке данных: разделитель, десятичная запятая, число столбцов.
+    # Для пустых строк, комментариев и заголовков - None
+    stripped = line.strip()
+    if not stripped or stripped.startswith('#'):
+        return None
+    if ';' in stripped:
+        delimiter = ';'
+    elif re.search(r'\s,|,\s', stripped):
+        # "0.001, 1.23": запятая рядом с пробелом - разделитель (десятичная запятая пробелами не окружена)
+        delimiter = ','
+    elif '\t' in stripped or ' ' in stripped:
+        delimiter = None
+    else:
+        delimiter = ','
+    tokens = stripped.split(delimiter) if delimiter else stripped.split()
+    tokens = [tok.strip() for tok in tokens if tok.strip()]
+    if not tokens or not all(_is_number(tok) for tok in tokens):
+        return None
+    return {'delimiter': delimiter, 'decimal_comma': delimiter != ',' and ',' in stripped,
+            'n_cols': len(tokens)}
+
+
+def sniff_format(path, max_lines=200):
+    # Пропуск строк заголовка и определение формата по первой строке данных
+    with open(path, 'r', encoding='utf-8', errors='replace') as fh:
+        skip, header_bytes = 0, 0
+        for line in fh:
+            if skip >= max_lines:
+                break
+            fmt = sniff_line(line)
+            if fmt is not None:
+                return dict(fmt, skip=skip, offset=header_bytes)
+            skip += 1
+            header_bytes += len(line.encode('utf-8'))
+    raise ValueError("Не найдены строки с числовыми данными")
+
+
+def parse_block(block, fmt):
+    # Блок целых строк (bytes) -> массив [n_rows, n_cols]. Любой нечисловой токен или строка
+    # с другим числом столбцов - ошибка: повреждённый файл не читается как укороченная кривая
+    if fmt['decimal_comma']:
+        block = block.replace(b',', b'.')
+    elif fmt['delimiter'] == ',':
+        block = block.replace(b',', b' ')
+    try:
+        values = np.loadtxt(io.BytesIO(block.replace(b';', b' ')), ndmin=2)
+    except ValueError as e:
+        raise ValueError(f"Повреждённые данные: {e}") from e
+    if values.shape[1] != fmt['n_cols']:
+        raise ValueError(f"Строки с разным числом столбцов: {values.shape[1]} вместо {fmt['n_cols']}")
+    return values
+
+
+def read_text(path, progress=None):
+    # Чтение блоками по CHUNK_BYTES (целыми строками): память на разбор не растёт с размером файла,
+    # прогресс - по каждому блоку
+    progress = progress or no_progress
+    fmt = sniff_format(path)
+    n_cols = fmt['n_cols']
+    if n_cols < 2:
+        raise ValueError("Нужны минимум два столбца: время и амплитуда")
+
+    total = max(1, os.path.getsize(path))
+    parts, tail = [], b''
+    with open(path, 'rb') as fh:
+        fh.seek(fmt['offset'])
+        while True:
+            block = fh.read(CHUNK_BYTES)
+            eof = not block
+            block = tail + block
+            if eof:
+                tail = b''
+            else:
+                cut = block.rfind(b'\n') + 1
+                block, tail = block[:cut], block[cut:]
+            if block.strip():
+                parts.append(parse_block(block, fmt))
+                progress('load', min(99, int(100 * fh.tell() / total)))
+            if eof:
+                break
+    progress('load', 100)
+    return np.concatenate(parts) if parts else np.empty((0, n_cols))
+
+
+# === Бинарный кэш рядом с исходным файлом ===
+def cache_paths(path):
+    return path + '.nmrcache.npy', path + '.nmrcache.json'
+
+
+def _source_key(path):
+    st = os.stat(path)
+    return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'version': CACHE_VERSION}
+
+
+def read_cache(path):
+    npy_path, meta_path = cache_paths(path)
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as fh:
+            if json.load(fh) != _source_key(path):
+                return None
+        # Столбцы хранятся строками: каждая кривая - непрерывный участок файла
+        return np.asarray(np.load(npy_path, mmap_mode='r'))
+    except (OSError, ValueError):
+        return None
+
+
+def write_cache(path, columns):
+    npy_path, meta_path = cache_paths(path)
+    try:
+        np.save(npy_path + '.tmp.npy', np.ascontiguousarray(columns))
+        os.replace(npy_path + '.tmp.npy', npy_path)
+        with open(meta_path, 'w', encoding='utf-8') as fh:
+            json.dump(_source_key(path), fh)
+    except OSError:
+        # Папка только для чтения - работаем без кэша
+        pass
+
+
+def load_curves(path, use_cache=True, progress=None):
+    # Возвращает ось времени и матрицу кривых [n_curves, n_points]
+    columns = read_cache(path) if use_cache else None
+    if columns is None:
+        columns = read_text(path, progress).T
+        if use_cache:
+            write_cache(path, columns)
+    t, Y = columns[0], columns[1:]
+    # Время в микросекундах -> секунды
+    if t[0] > 10:
+        t = t / 1e6
+    return t, Y
+
+
+def load_curve(path, column=0, use_cache=True, progress=None):
+    t, Y = load_curves(path, use_cache, progress)
+    return t, Y[column]
+
+
+def load_matrix(path, use_cache=True, progress=None):
+    # 2D-данные: первая строка - времена эхо, первый столбец - точки первой оси (tau или b),
+    # левый верхний угол не используется
+    columns = read_cache(path) if use_cache else None
+    if columns is None:
+        columns = read_text(path, progress).T
+        if use_cache:
+            write_cache(path, columns)
+    if columns.shape[0] < 3 or columns.shape[1] < 3:
+        raise ValueError("Нужна матрица минимум 2x2 с заголовками осей")
+    axis1, axis2, M = columns[0, 1:], columns[1:, 0], columns[1:, 1:].T
+    # Время эхо в микросекундах -> секунды
+    if axis2[0] > 10:
+        axis2 = axis2 / 1e6
+    return axis1, axis2, M
+
+
+def save_matrix(path, axis1, axis2, M):
+    table = np.empty((len(axis1) + 1, len(axis2) + 1))
+    table[0, 0] = 0.0
+    table[0, 1:], table[1:, 0], table[1:, 1:] = axis2, axis1, M
+    np.savetxt(path, table, fmt='%.9g', delimiter='\t')
+
+
+def save_curve(path, t, y):
+    np.savetxt(path, np.column_stack([t, y]), fmt='%.9g', delimiter='\t')
@@ -0,0 +1,235 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+def build_kernel(t, t2_grid):
+    return np.exp(-t[:, np.newaxis] / t2_grid)
+
+
+def gram_svd(G, rtol=1e-13):
+    # Сингулярные числа и правые векторы K по G = K^T K (по убыванию s); U не нужна:
+    # U^T y = (V^T K^T y) / s
+    w, V = np.linalg.eigh(G)
+    w, V = w[::-1], V[:, ::-1]
+    keep = w > w[0] * rtol
+    return np.sqrt(w[keep]), V[:, keep]
+
+
+def compress_gram(G, b, rtol=1e-13):
+    # NNLS по нормальным уравнениям: G = V diag(s^2) V^T -> min ||A x - d||,
+    # A = diag(s) V^T, d = diag(1/s) V^T b (ранг ограничен порогом rtol)
+    s, V = gram_svd(G, rtol)
+    return (s[:, np.newaxis] * V.T), (V.T @ b) / s
+
+
+CHUNK_ROWS = 16384
+
+
+def compress_rows(t, Y, t2_grid, chunk_rows=CHUNK_ROWS, rtol=1e-12):
+    # Сжатие задачи min ||K x - y|| без плотного ядра: K строится блоками строк, и по блокам
+    # накапливается треугольный множитель QR дополненной матрицы [K | Y] (m+c) x (m+c).
+    # Затем усечённое SVD R = U S V^T даёт задачу (ранг x m): A = S V^T, D = U^T Z.
+    # Память - O(chunk_rows * m), а не O(n_points * m). Y - вектор или матрица [n_points, c].
+    # Третье значение - норма части Y, потерянной при сжатии (вне образа K и усечённых направлений):
+    # полная невязка = hypot(невязка сжатой задачи, эта норма)
+    Y = np.asarray(Y, dtype=float)
+    single = Y.ndim == 1
+    Y = Y[:, np.newaxis] if single else Y
+    m, c = len(t2_grid), Y.shape[1]
+    R = np.zeros((0, m + c))
+    for start in range(0, len(t), chunk_rows):
+        stop = min(start + chunk_rows, len(t))
+        block = np.hstack([build_kernel(t[start:stop], t2_grid), Y[start:stop]])
+        R = np.linalg.qr(np.vstack([R, block]), mode='r')
+    R = np.vstack([R, np.zeros((max(0, m + c - len(R)), m + c))])[:m + c]
+    Rk, Z = R[:m, :m], R[:m, m:]
+    U, sv, Vt = np.linalg.svd(Rk)
+    r = max(1, int(np.sum(sv > sv[0] * rtol)))
+    A, D = sv[:r, np.newaxis] * Vt[:r], U[:, :r].T @ Z
+    lost = np.sqrt(np.sum(R[m:, m:]**2, axis=0) + np.sum((U[:, r:].T @ Z)**2, axis=0))
+    return A, (D[:, 0] if single else D), (lost[0] if single else lost)
+
+
+def gram_rows(t, y, t2_grid, chunk_rows=CHUNK_ROWS, weights=None):
+    # K^T K и K^T y по блокам строк (для распределения T2 на длинных цепочках);
+    # y - вектор или матрица [n_points, c]. С весами строк - K^T W K и K^T W y
+    G = np.zeros((len(t2_grid), len(t2_grid)))
+    b = np.zeros((len(t2_grid),) + np.shape(y)[1:])
+    for start in range(0, len(t), chunk_rows):
+        Kc = build_kernel(t[start:start + chunk_rows], t2_grid)
+        Kw = Kc if weights is None else Kc * weights[start:start + chunk_rows, np.newaxis]
+        G += Kw.T @ Kc
+        b += Kw.T @ y[start:start + chunk_rows]
+    return G, b
+
+
+def kernel_rhs(t, y, t2_grid, chunk_rows=CHUNK_ROWS, weights=None):
+    # Только K^T y (K^T W y) по блокам строк - правая часть при готовой K^T K
+    b = np.zeros((len(t2_grid),) + np.shape(y)[1:])
+    for start in range(0, len(t), chunk_rows):
+        Kc = build_kernel(t[start:start + chunk_rows], t2_grid)
+        Kw = Kc if weights is None else Kc * weights[start:start + chunk_rows, np.newaxis]
+        b += Kw.T @ y[start:start + chunk_rows]
+    return b
+
+
+def refine_grid(t2_grid, centers, points=4):
+    # Новые узлы около пиков: ячейки по обе стороны от каждого центра делятся
+    # на points частей (равномерно по ln T2); возвращаются только новые узлы
+    log_grid = np.log(t2_grid)
+    parts = []
+    for i in centers:
+        for j in (i - 1, i):
+            if 0 <= j < len(log_grid) - 1:
+                parts.append(np.linspace(log_grid[j], log_grid[j + 1], points + 1)[1:-1])
+    return np.exp(np.unique(np.concatenate(parts))) if parts else np.zeros(0)
+
+
+def extend_gram(t, y, t2_grid, G, b, t2_new, chunk_rows=CHUNK_ROWS, weights=None):
+    # K^T K и K^T y для сетки с добавленными узлами t2_new: считаются только строки
+    # новых столбцов, старая часть G переиспользуется. Сетка возвращается отсортированной
+    m, k = len(t2_grid), len(t2_new)
+    G2 = np.zeros((m + k, m + k))
+    b2 = np.r_[b, np.zeros(k)]
+    G2[:m, :m] = G
+    for start in range(0, len(t), chunk_rows):
+        tc = t[start:start + chunk_rows]
+        Kn = build_kernel(tc, t2_new)
+        Kw = Kn if weights is None else Kn * weights[start:start + chunk_rows, np.newaxis]
+        G2[m:] += Kw.T @ np.hstack([build_kernel(tc, t2_grid), Kn])
+        b2[m:] += Kw.T @ y[start:start + chunk_rows]
+    G2[:m, m:] = G2[m:, :m].T
+    grid = np.r_[t2_grid, t2_new]
+    order = np.argsort(grid)
+    return grid[order], G2[np.ix_(order, order)], b2[order]
+
+
+def time_fingerprint(t):
+    t = np.ascontiguousarray(t, dtype=float)
+    return hashlib.blake2b(t.tobytes(), digest_size=16).hexdigest()
+
+
+class KernelEntry:
+    def __init__(self, cache, key, K):
+        self._cache = cache
+        self.key = key
+        self.K = K
+        self.gram = K.T @ K
+        self._qr = None
+        self._svd = {}
+
+    @property
+    def nbytes(self):
+        arrays = [self.K, self.gram]
+        if self._qr is not None:
+            arrays += list(self._qr)
+        for usv in self._svd.values():
+            arrays += list(usv)
+        return sum(a.nbytes for a in arrays)
+
+    def qr(self):
+        if self._qr is None:
+            self._qr = np.linalg.qr(self.K)
+            self._cache._grew()
+        return self._qr
+
+    def svd(self, rank=None, rtol=1e-10):
+        # Усечённое SVD: ранг задаётся явно или по относительному порогу сингулярных чисел
+        key = rank if rank is not None else ('rtol', rtol)
+        if key not in self._svd:
+            U, s, Vt = np.linalg.svd(self.K, full_matrices=False)
+            r = rank if rank is not None else max(1, int(np.sum(s > s[0] * rtol)))
+            self._svd[key] = (U[:, :r].copy(), s[:r].copy(), Vt[:r].copy())
+            self._cache._grew()
+        return self._svd[key]
+
+
+class GramEntry:
+    # K^T K (K^T W K) длинной или взвешенной цепочки без плотного ядра: оно не хранится,
+    # правая часть K^T y считается по блокам строк (kernel_rhs)
+    def __init__(self, key, gram):
+        self.key = key
+        self.gram = gram
+
+    @property
+    def nbytes(self):
+        return self.gram.nbytes
+
+
+# === LRU-кэш матриц ядра exp(-t/T2) ===
+class KernelCache:
+    def __init__(self, max_bytes=256 * 2**20):
+        self.max_bytes = max_bytes
+        self.hits = self.misses = self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+
+    def key(self, t, t2_grid):
+        return (time_fingerprint(t), float(t2_grid[0]), float(t2_grid[-1]), len(t2_grid))
+
+    def get(self, t, t2_grid):
+        key = self.key(t, t2_grid)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return entry
+            self.misses += 1
+            entry = KernelEntry(self, key, build_kernel(t, t2_grid))
+            if entry.nbytes <= self.max_bytes:
+                self._entries[key] = entry
+                self._shrink()
+            return entry
+
+    def gram(self, t, t2_grid, y, chunk_rows=CHUNK_ROWS, weights=None):
+        # K^T W K и K^T W y (y - вектор или матрица [n_points, c]). Короткая цепочка без весов -
+        # через плотное ядро (get); длинная или с весами - K^T W K из кэша, ключ дополнен
+        # весами, а K^T W y - по блокам. При промахе обе части - за один проход по строкам
+        if weights is None and len(t) <= chunk_rows:
+            entry = self.get(t, t2_grid)
+            return entry.gram, entry.K.T @ y
+        key = self.key(t, t2_grid) + ('gram', None if weights is None else time_fingerprint(weights))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self.hits += 1
+                self._entries.move_to_end(key)
+            else:
+                self.misses += 1
+                G, b = gram_rows(t, y, t2_grid, chunk_rows, weights)
+                entry = GramEntry(key, G)
+                if entry.nbytes <= self.max_bytes:
+                    self._entries[key] = entry
+                    self._shrink()
+                return G, b
+        return entry.gram, kernel_rhs(t, y, t2_grid, chunk_rows, weights)
+
+    @property
+    def nbytes(self):
+        with self._lock:
+            return sum(e.nbytes for e in self._entries.values())
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'nbytes': self.nbytes, 'max_bytes': self.max_bytes,
+                    'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _grew(self):
+        with self._lock:
+            self._shrink()
+
+    def _shrink(self):
+        # Вытесняем самые давние записи, последнюю используемую оставляем всегда
+        total = self.nbytes
+        while total > self.max_bytes and len(self._entries) > 1:
+            _, old = self._entries.popitem(last=False)
+            total -= old.nbytes
+            self.evictions += 1
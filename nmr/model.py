@@ -0,0 +1,205 @@
+import numpy as np
+
+# Блок кривых в least_squares_batch: не больше BATCH_ELEMENTS элементов якобиана (кривые x параметры x точки)
+BATCH_ELEMENTS = 2**22
+
+
+def split_params(p):
+    n_c = (len(p) - 1) // 2
+    return p[:n_c], p[n_c:2*n_c], p[-1]
+
+
+def multiexp(p, t):
+    a, t2, off = split_params(p)
+    return np.exp(-t[:, np.newaxis] / t2) @ a + off
+
+
+# === Мультиэкспоненциальная модель y = Σ a_i exp(-t/T2_i) + B ===
+class MultiExpModel:
+    def __init__(self, t, y, weights=None):
+        # weights - статистические веса точек (например, число усреднённых эхо)
+        self.t = t
+        self.y = y
+        self.sw = np.sqrt(weights) if weights is not None else None
+        self._t2 = None
+        self._E = None
+        self.n_evals = 0
+        self.on_eval = None
+
+    def basis(self, t2):
+        # Матрица экспонент кэшируется: residuals и jacobian вызываются с одними T2
+        t2 = np.asarray(t2, dtype=float)
+        if self._t2 is None or not np.array_equal(t2, self._t2):
+            self._t2 = t2.copy()
+            self._E = np.exp(-self.t[:, np.newaxis] / t2)
+        return self._E
+
+    def evaluate(self, p):
+        a, t2, off = split_params(p)
+        return self.basis(t2) @ a + off
+
+    def residuals(self, p):
+        self._count()
+        return self._weigh(self.evaluate(p) - self.y)
+
+    def _weigh(self, values):
+        if self.sw is None:
+            return values
+        return values * (self.sw if values.ndim == 1 else self.sw[:, np.newaxis])
+
+    def _count(self):
+        self.n_evals += 1
+        if self.on_eval is not None:
+            self.on_eval(self.n_evals)
+
+    def jacobian(self, p):
+        a, t2, _ = split_params(p)
+        E = self.basis(t2)
+        dt2 = E * (a / t2**2) * self.t[:, np.newaxis]
+        return self._weigh(np.hstack([E, dt2, np.ones((len(self.t), 1))]))
+
+    def fit(self, x0, lower, upper, method='full', **kwargs):
+        if method == 'varpro':
+            return self._fit_varpro(x0, lower, upper, **kwargs)
+        if method != 'full':
+            raise ValueError(f"Неизвестный метод уточнения: {method}")
+        from scipy.optimize import least_squares
+        return least_squares(self.residuals, x0, jac=self.jacobian, bounds=(lower, upper), **kwargs)
+
+    # === Разделение переменных (VARPRO): амплитуды и смещение решаются линейно ===
+    def _linear(self, t2, lower, upper):
+        n = len(t2)
+        Phi = self._weigh(np.hstack([self.basis(t2), np.ones((len(self.t), 1))]))
+        y = self._weigh(self.y)
+        lo = np.r_[lower[:n], lower[-1]]
+        hi = np.r_[upper[:n], upper[-1]]
+        c = np.linalg.lstsq(Phi, y, rcond=None)[0]
+        if np.any(c < lo) or np.any(c > hi):
+            from scipy.optimize import lsq_linear
+            c = lsq_linear(Phi, y, bounds=(lo, hi)).x
+        free = (c > lo + 1e-12) & (c < hi - 1e-12)
+        return Phi, c, free
+
+    def _fit_varpro(self, x0, lower, upper, **kwargs):
+        from scipy.optimize import OptimizeResult, least_squares
+        x0, lower, upper = (np.asarray(v, dtype=float) for v in (x0, lower, upper))
+        n = (len(x0) - 1) // 2
+        state = {}
+
+        def solve(t2):
+            key = t2.tobytes()
+            if state.get('key') != key:
+                state['key'] = key
+                state['Phi'], state['c'], state['free'] = self._linear(t2, lower, upper)
+            return state['Phi'], state['c'], state['free']
+
+        def residuals(t2):
+            self._count()
+            Phi, c, _ = solve(t2)
+            return Phi @ c - self._weigh(self.y)
+
+        def jacobian(t2):
+            # Приближение Кауфмана: производная по T2 проецируется на дополнение
+            # к столбцам с неактивными линейными коэффициентами
+            Phi, c, free = solve(t2)
+            # Phi уже взвешена, поэтому и производная получается взвешенной
+            D = Phi[:, :n] * (c[:n] / t2**2) * self.t[:, np.newaxis]
+            if np.any(free):
+                Q, _ = np.linalg.qr(Phi[:, free])
+                D = D - Q @ (Q.T @ D)
+            return D
+
+        res = least_squares(residuals, x0[n:2*n], jac=jacobian,
+                            bounds=(lower[n:2*n], upper[n:2*n]), **kwargs)
+        _, c, _ = solve(res.x)
+        x = np.r_[c[:n], res.x, c[-1]]
+        return OptimizeResult(x=x, fun=res.fun, cost=res.cost, nfev=res.nfev, njev=res.njev,
+                              status=res.status, message=res.message, success=res.success)
+
+
+# === Пакетное уточнение: ограниченный Левенберг-Марквардт по многим кривым сразу ===
+def least_squares_batch(t, Y, X0, lower, upper, weights=None, max_iter=200, ftol=1e-8, xtol=1e-8, gtol=1e-8):
+    # Кривые Y [c, n] с общей осью t и одним числом компонент, X0 [c, p] - начальные [a..., T2..., B].
+    # У каждой кривой свои затухание и критерии остановки (ftol/xtol/gtol - как у least_squares),
+    # поэтому результат не зависит от соседей по пакету; модель, якобиан и нормальные уравнения
+    # считаются вызовами numpy сразу по всем ещё не сошедшимся кривым.
+    # Возвращает X [c, p] и число итераций каждой кривой
+    X = np.clip(np.array(X0, dtype=float), lower, upper)
+    Y = np.asarray(Y, dtype=float)
+    sw = np.sqrt(weights) if weights is not None else None
+    n_iter = np.zeros(len(X), dtype=int)
+    block = max(1, BATCH_ELEMENTS // (len(t) * X.shape[1]))
+    for s in range(0, len(X), block):
+        Yw = Y[s:s + block] if sw is None else Y[s:s + block] * sw
+        X[s:s + block], n_iter[s:s + block] = _lm_block(t, Yw, X[s:s + block], lower, upper, sw,
+                                                        max_iter, ftol, xtol, gtol)
+    return X, n_iter
+
+
+def _lm_block(t, Yw, X, lower, upper, sw, max_iter, ftol, xtol, gtol):
+    c, p = X.shape
+    k = (p - 1) // 2
+
+    def residuals(X, Yw):
+        E = np.exp((-1 / X[:, k:2*k])[:, :, np.newaxis] * t)
+        f = (X[:, np.newaxis, :k] @ E)[:, 0] + X[:, -1:]
+        return E, (f if sw is None else f * sw) - Yw
+
+    def normal(X, E, r):
+        # Якобиан [exp, t exp, 1] (взвешенный) -> J^T J и градиент J^T r; множитель a/T2^2
+        # столбцов по T2 применяется уже к матрицам p x p
+        J = np.empty((len(X), p, len(t)))
+        if sw is None:
+            J[:, :k] = E
+        else:
+            np.multiply(E, sw, out=J[:, :k])
+        np.multiply(J[:, :k], t, out=J[:, k:2*k])
+        J[:, -1] = 1.0 if sw is None else sw
+        s = np.ones((len(X), p))
+        s[:, k:2*k] = X[:, :k] / X[:, k:2*k]**2
+        H = (J @ J.transpose(0, 2, 1)) * s[:, :, np.newaxis] * s[:, np.newaxis, :]
+        return H, (J @ r[..., np.newaxis])[..., 0] * s
+
+    E, r = residuals(X, Yw)
+    cost = 0.5 * np.sum(r**2, axis=1)
+    H, g = normal(X, E, r)
+    lam = np.full(c, 1e-3)
+    nu = np.full(c, 2.0)
+    n_iter = np.zeros(c, dtype=int)
+    active = np.arange(c)
+    eye = np.eye(p)
+    for _ in range(max_iter):
+        if not len(active):
+            break
+        Xa, Ha, ga = X[active], H[active], g[active]
+        # Параметр на границе, который антиградиент выводит за неё, на этом шаге закреплён
+        fixed = ((Xa <= lower) & (ga > 0)) | ((Xa >= upper) & (ga < 0))
+        ga = np.where(fixed, 0.0, ga)
+        d = np.diagonal(Ha, axis1=1, axis2=2)
+        d = np.maximum(d, 1e-12 * d.max(axis=1, keepdims=True))
+        A = np.where(fixed[:, :, np.newaxis] | fixed[:, np.newaxis, :], 0.0, Ha)
+        A += (lam[active, np.newaxis] * d + fixed)[:, :, np.newaxis] * eye
+        X_new = np.clip(Xa - np.linalg.solve(A, ga[..., np.newaxis])[..., 0], lower, upper)
+        E_new, r_new = residuals(X_new, Yw[active])
+        cost_new = 0.5 * np.sum(r_new**2, axis=1)
+        n_iter[active] += 1
+
+        # Затухание по отношению фактического и предсказанного снижения (Нильсен)
+        h = X_new - Xa
+        predicted = -np.einsum('mp,mp->m', h, ga) - 0.5 * np.einsum('mp,mpq,mq->m', h, Ha, h)
+        # (после усечения шага границами предсказание может быть неположительным - тогда rho = 1)
+        rho = np.where(predicted > 0, (cost[active] - cost_new) / np.where(predicted > 0, predicted, 1.0), 1.0)
+        ok = cost_new < cost[active]
+        converged = (np.max(np.abs(ga), axis=1) < gtol) \
+            | (ok & (cost[active] - cost_new < ftol * cost[active])) \
+            | (np.linalg.norm(h, axis=1) < xtol * (xtol + np.linalg.norm(Xa, axis=1)))
+        acc, rej = active[ok], active[~ok]
+        if len(acc):
+            X[acc], cost[acc] = X_new[ok], cost_new[ok]
+            H[acc], g[acc] = normal(X_new[ok], E_new[ok], r_new[ok])
+            lam[acc] *= np.maximum(1 / 3, 1 - (2 * np.minimum(rho[ok], 1.0) - 1)**3)
+            nu[acc] = 2.0
+        lam[rej] *= nu[rej]
+        nu[rej] *= 2
+        active = active[~(converged | (lam[active] > 1e16))]
+    return X, n_iter
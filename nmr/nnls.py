@@ -0,0 +1,102 @@
+import numpy as np
+
+from .kernels import compress_gram
+
+MAX_COND = 1e12
+
+
+class IllConditioned(Exception):
+    pass
+
+
+# === NNLS по нормальным уравнениям (FNNLS) ===
+def fnnls(G, b, passive=None, max_iter=None):
+    # Активные множества Лоусона-Хэнсона в варианте Bro & de Jong: min ||K x - y||, x >= 0,
+    # только по G = K^T K и b = K^T y (m x m при любом числе точек). passive - начальное
+    # пассивное множество (тёплый старт, например решение похожей задачи): с ним итераций
+    # столько, насколько отличаются множества, а не по одной на каждую ненулевую компоненту.
+    # Столбцы масштабируются к единичной норме; плохо обусловленная подсистема - IllConditioned.
+    # Нулевые столбцы (ядро с T2 много короче начала оси уходит в 0) в решение не входят: x = 0
+    m = len(b)
+    diag = np.diag(G)
+    valid = np.isfinite(diag) & (diag > 0)
+    scale = np.zeros(m)
+    scale[valid] = 1 / np.sqrt(diag[valid])
+    Gs = np.where(valid[:, np.newaxis] & valid, G, 0.0) * scale[:, np.newaxis] * scale
+    bs = np.where(valid, b, 0.0) * scale
+    tol = 10 * np.finfo(float).eps * np.abs(Gs).sum(axis=0).max() * m
+    max_iter = max_iter or 3 * m
+
+    P = np.zeros(m, dtype=bool) if passive is None else np.asarray(passive, dtype=bool) & valid
+    x = np.zeros(m)
+    if P.any():
+        # Тёплый старт: решение на заданном множестве без отрицательных компонент
+        while P.any():
+            s = _solve_passive(Gs, bs, P)
+            if s[P].min() > 0:
+                x = s
+                break
+            P &= s > 0
+    w = bs - Gs @ x
+    n_iter = 0
+    while np.any(w[~P] > tol):
+        n_iter += 1
+        if n_iter > max_iter:
+            raise IllConditioned("NNLS не сошёлся")
+        P[np.argmax(np.where(P, -np.inf, w))] = True
+        s = _solve_passive(Gs, bs, P)
+        while s[P].min() <= 0:
+            # Шаг к s до первой обнулившейся компоненты, обнулённые - из пассивного множества
+            neg = P & (s <= 0)
+            alpha = np.min(x[neg] / (x[neg] - s[neg]))
+            x += alpha * (s - x)
+            P &= x > tol
+            s = _solve_passive(Gs, bs, P)
+        x = s
+        w = bs - Gs @ x
+    if not np.all(np.isfinite(x)):
+        raise IllConditioned("Решение не конечно")
+    return x * scale, P, n_iter
+
+
+def _solve_passive(G, b, P):
+    # Холецкий подсистемы напрямую через LAPACK: итераций десятки, а подсистемы малы,
+    # так что время уходит в основном на накладные расходы вызовов
+    from scipy.linalg.lapack import dpotrf, dpotrs
+
+    s = np.zeros(len(b))
+    idx = np.flatnonzero(P)
+    if not len(idx):
+        return s
+    L, info = dpotrf(G[idx[:, np.newaxis], idx], lower=1, clean=0)
+    if info != 0:
+        raise IllConditioned("Подсистема не положительно определена")
+    d = np.diag(L)
+    # Оценка снизу числа обусловленности подсистемы по диагонали множителя Холецкого
+    if (d.max() / d.min())**2 > MAX_COND:
+        raise IllConditioned("Подсистема плохо обусловлена")
+    s[idx], _ = dpotrs(L, b[idx], lower=1)
+    return s
+
+
+def nnls_gram(G, b, yy, passive=None):
+    # FNNLS с запасным вариантом scipy (по сжатой системе из тех же G, b).
+    # Возвращает x, ||K x - y|| (по yy = y^T y), пассивное множество для следующего тёплого старта
+    # и сведения о решателе. Неудачный тёплый старт (устаревшее пассивное множество) сначала
+    # повторяется с нуля: иначе запасной scipy срабатывал бы на каждой следующей кривой
+    info = None
+    for start in ([passive, None] if passive is not None else [None]):
+        try:
+            x, P, n_iter = fnnls(G, b, start)
+        except IllConditioned:
+            continue
+        info = {'nnls_solver': 'fnnls', 'nnls_iter': n_iter, 'nnls_warm': start is not None}
+        break
+    if info is None:
+        from scipy.optimize import nnls
+        A, d = compress_gram(G, b)
+        x = nnls(A, d)[0]
+        P = x > 0
+        info = {'nnls_solver': 'scipy', 'nnls_iter': 0, 'nnls_warm': False}
+    rnorm = np.sqrt(max(yy - 2 * b @ x + x @ G @ x, 0.0))
+    return x, rnorm, P, info
@@ -0,0 +1,25 @@
+import numpy as np
+
+REDUCE_RATIO = 1.02
+
+
+# === Сжатие цепочки эхо: средние по окнам, растущим логарифмически со временем ===
+def log_windows(t, ratio=REDUCE_RATIO):
+    # Индексы начала окон. Окно k - эхо с t в [dt * ratio^k, dt * ratio^(k+1)), как интервалы
+    # StreamingFit: в начале цепочки окна уже шага и точки остаются по одной, в хвосте в окно
+    # попадает ~t * (ratio - 1) / dt эхо. Число окон растёт как log(n_points)
+    if ratio <= 1:
+        raise ValueError(f"Отношение ширины окон должно быть больше 1: {ratio}")
+    dt = t[1] - t[0]
+    k = np.floor(np.log(np.maximum(t, dt) / dt) / np.log(ratio)).astype(np.int64)
+    return np.r_[0, np.flatnonzero(np.diff(k)) + 1]
+
+
+def reduce_train(t, Y, ratio=REDUCE_RATIO):
+    # Средние времени и сигнала по окнам и число эхо в окне. Y - кривая или матрица [c, n_points]
+    # (окна зависят только от t, поэтому общие для всех кривых). С весами = числу эхо
+    # взвешенный МНК по средним даёт ту же оценку, что по всем точкам при одинаковом шуме эхо,
+    # пока модель в пределах окна почти линейна (ошибка ~ ((ratio - 1) * t / T2)^2 / 24)
+    starts = log_windows(t, ratio)
+    counts = np.diff(np.r_[starts, len(t)]).astype(float)
+    return np.add.reduceat(t, starts) / counts, np.add.reduceat(Y, starts, axis=-1) / counts, counts
@@ -0,0 +1,57 @@
+import numpy as np
+
+from .kernels import gram_svd
+
+N_ALPHAS = 60
+
+
+# === Непрерывное распределение T2: регуляризация Тихонова ===
+# min ||K f - y||^2 + alpha^2 ||f||^2, f >= 0. Перебор alpha идёт по замкнутым формулам
+# в базисе SVD ядра (факторы фильтра s^2 / (s^2 + alpha^2)), поэтому десятки значений
+# стоят как одно решение; неотрицательная задача решается один раз - для выбранного alpha.
+def alpha_sweep(s, d, rr_perp, n_points, alphas):
+    # d = U^T y, rr_perp = ||y||^2 - ||d||^2 (часть y вне образа K)
+    f = s**2 / (s**2 + alphas[:, np.newaxis]**2)
+    rho2 = np.sum(((1 - f) * d)**2, axis=1) + max(rr_perp, 0.0)
+    eta2 = np.sum((f * d / s)**2, axis=1)
+    gcv = n_points * rho2 / (n_points - np.sum(f, axis=1))**2
+    return rho2, eta2, gcv
+
+
+def lcurve_corner(rho2, eta2):
+    # Угол L-кривой: максимум кривизны (ln rho, ln eta) по параметру ln alpha
+    x, y = 0.5 * np.log(rho2), 0.5 * np.log(eta2)
+    dx, dy = np.gradient(x), np.gradient(y)
+    ddx, ddy = np.gradient(dx), np.gradient(dy)
+    kappa = (dx * ddy - ddx * dy) / np.maximum((dx**2 + dy**2)**1.5, 1e-300)
+    return int(np.argmax(kappa[1:-1])) + 1
+
+
+def solve_nonneg(s, V, d, alpha):
+    # Сжатая задача: [diag(s) V^T; alpha I] f = [d; 0], (r + m) x m вместо n x m
+    from scipy.optimize import nnls
+    m = V.shape[0]
+    A = np.vstack([s[:, np.newaxis] * V.T, alpha * np.eye(m)])
+    return nnls(A, np.r_[d, np.zeros(m)])[0]
+
+
+def tikhonov_from_gram(G, b, yy, n_points, t2_grid, method='gcv', alphas=None, alpha=None):
+    # G = K^T K, b = K^T y, yy = y^T y: подходит и для накопленных сумм потокового режима
+    if method not in ('gcv', 'lcurve'):
+        raise ValueError(f"Неизвестный способ выбора alpha: {method}")
+    s, V = gram_svd(G)
+    d = (V.T @ b) / s
+    if alphas is None:
+        alphas = s[0] * np.logspace(-6, 0, N_ALPHAS)
+    alphas = np.asarray(alphas, dtype=float)
+    rho2, eta2, gcv = alpha_sweep(s, d, yy - d @ d, n_points, alphas)
+    if alpha is not None:
+        i = int(np.argmin(np.abs(np.log(alphas / alpha))))
+    elif method == 'gcv':
+        i = int(np.argmin(gcv))
+    else:
+        i = lcurve_corner(rho2, eta2)
+    alpha = alpha if alpha is not None else alphas[i]
+    dist = solve_nonneg(s, V, d, alpha)
+    return {'t2': t2_grid, 'dist': dist, 'alpha': float(alpha), 'method': method, 'index': i,
+            'alphas': alphas, 'rho': np.sqrt(rho2), 'eta': np.sqrt(eta2), 'gcv': gcv}
@@ -0,0 +1,210 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .core import shared_core
+from .decimate import lttb_indices, minmax_indices
+from .io import load_curves
+from .utils import no_progress
+
+REPORT_SIZE = (14, 10)
+REPORT_DPI = 300
+# Ширина одного графика при 300 dpi - около 2000 пикселей
+N_PX = 2000
+
+# Стиль графиков "как в Origin" (общий для окна и отчётов, в том числе в процессах-воркерах)
+PLOT_STYLE = {
+    # Arial, если установлен; иначе - без предупреждений на каждую надпись
+    'font.family': 'sans-serif',
+    'font.sans-serif': ['Arial', 'Liberation Sans', 'DejaVu Sans'],
+    'font.size': 10,
+    'axes.grid': True,
+    'grid.alpha': 0.3,
+    'axes.linewidth': 1.2,
+    'xtick.direction': 'in',
+    'ytick.direction': 'in',
+    'xtick.major.size': 5,
+    'xtick.minor.visible': True,
+    'ytick.minor.visible': True,
+    'legend.frameon': False,
+    'lines.markersize': 4,
+    'lines.markeredgewidth': 0.8
+}
+
+
+# === Отчёт: рисуется через объектный API Agg, без pyplot (можно в потоке и в процессе-воркере) ===
+def component_text(r, ci=None):
+    # T2 и доля компоненты; после бутстрепа - с доверительным интервалом
+    t2, share = f"{r['T2']:.3f}", f"{r['Share']*100:.2f}"
+    if ci is not None:
+        t2 += f" [{ci['T2'][0]:.3f}; {ci['T2'][1]:.3f}]"
+        share += f" [{ci['Share'][0]*100:.2f}; {ci['Share'][1]*100:.2f}]"
+    return t2, share
+
+
+def report_data(t, y, fit, ci=None, title=None, n_px=N_PX):
+    # Всё, что нужно для страницы: прореженные ряды и текст таблицы.
+    # Весит сотни КБ при любой длине кривой - дёшево передаётся между процессами
+    results, y_fit, diff_norm, offset_norm, amp_scale = fit
+    y_max = np.max(y)
+    y_norm, model_norm = y / y_max, y_fit / y_max
+    i_lin, i_log = minmax_indices(t, y_norm, n_px), minmax_indices(t, y_norm, n_px, log_y=True)
+    i_model, i_diff = lttb_indices(t, model_norm, n_px), minmax_indices(t, diff_norm, n_px)
+
+    cis = ci['components'] if ci is not None else []
+    rows = [component_text(r, cis[i] if i < len(cis) else None) for i, r in enumerate(results)]
+    ci_note = f" ({ci['level']*100:.0f}% ДИ)" if ci is not None else ""
+    cells = ([["Таблица результатов", ""], ["T2 (сек)" + ci_note, "Доля (%)" + ci_note]]
+             + [[t2, f"{share}%"] for t2, share in rows]
+             + [["Смещение", f"{offset_norm:.4f} / {offset_norm * y_max:.2f}"],
+                ["Амплитуда", f"{amp_scale:.4f}"]])
+    return {'title': title, 'lin': (t[i_lin], y_norm[i_lin]), 'log': (t[i_log], y_norm[i_log]),
+            'model': (t[i_model], model_norm[i_model]), 'diff': (t[i_diff], diff_norm[i_diff]), 'cells': cells}
+
+
+def draw_report(data):
+    import matplotlib
+    with matplotlib.rc_context(PLOT_STYLE):
+        return _draw_report(data)
+
+
+def _draw_report(data):
+    from matplotlib.figure import Figure
+
+    # Облака точек (тысячи маркеров) в PDF - растром, оси, линии модели и текст - векторные:
+    # векторные маркеры пишутся в PDF по одному и были основной частью времени страницы
+    fig = Figure(figsize=REPORT_SIZE)
+    gs = fig.add_gridspec(2, 2, hspace=0.3, wspace=0.3)
+    if data['title']:
+        fig.suptitle(data['title'], fontsize=12)
+
+    ax1 = fig.add_subplot(gs[0, 0])
+    ax1.plot(*data['lin'], 'k.', label='Данные', rasterized=True)
+    ax1.plot(*data['model'], 'r-', label='Модель (авто)')
+    ax1.set_title("Линейный масштаб (норм.)")
+    ax1.set_xlabel("Время (с)", fontsize=11)
+    ax1.set_ylabel("Амплитуда сигнала (норм.)", fontsize=11)
+    ax1.legend()
+
+    ax2 = fig.add_subplot(gs[1, 0])
+    ax2.semilogy(*data['log'], 'k.', rasterized=True)
+    ax2.semilogy(*data['model'], 'r-')
+    ax2.set_title("Логарифмический масштаб")
+    ax2.set_xlabel("Время (с)", fontsize=11)
+    ax2.set_ylabel("Амплитуда сигнала (норм.)", fontsize=11)
+
+    ax3 = fig.add_subplot(gs[0, 1])
+    ax3.plot(*data['diff'], 'g.', rasterized=True)
+    ax3.axhline(0, color='red', ls='--')
+    ax3.set_title("Разница")
+    ax3.set_xlabel("Время (с)", fontsize=11)
+    ax3.set_ylabel("Разница (норм.)", fontsize=11)
+
+    ax4 = fig.add_subplot(gs[1, 1])
+    ax4.axis('off')
+    table = ax4.table(cellText=data['cells'], loc='center', cellLoc='center')
+    table.auto_set_font_size(False)
+    table.set_fontsize(11)
+    table.scale(1, 2.2)
+    for i in range(2):
+        table[(0, i)].set_facecolor('#40466e')
+        table[(0, i)].set_text_props(weight='bold', color='w')
+        table[(1, i)].set_facecolor('#aaaaaa')
+        table[(1, i)].set_text_props(weight='bold', color='k')
+    # Поля - фиксированной разметкой, а не bbox_inches='tight': тот отрисовывает фигуру
+    # дважды, что при 300 dpi почти удваивает время записи
+    fig.subplots_adjust(left=0.06, right=0.98, bottom=0.06, top=0.93 if data['title'] else 0.96)
+    return fig
+
+
+def save_report(path, data, dpi=REPORT_DPI, progress=None):
+    # progress('report', 0/1) - до отрисовки и после записи; из рабочего потока GUI
+    # отмена срабатывает до начала отрисовки
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    progress = progress or no_progress
+    progress('report', 0)
+    fig = draw_report(data)
+    FigureCanvasAgg(fig)
+    fig.savefig(path, dpi=dpi)
+    progress('report', 1)
+    return path
+
+
+# === Отчёты по множеству файлов ===
+def prepare_file(path, max_components=4, grid='fixed', result_cache=None, reduce_ratio=None):
+    # Воркер: загрузка и расчёт (готовые результаты - из хранилища result_cache);
+    # страница на каждую кривую файла или строка ошибки
+    core = shared_core(result_cache, grid=grid, reduce_ratio=reduce_ratio)
+    try:
+        t, Y = load_curves(path)
+        fits = core.fit_many(t, Y, max_components) if len(Y) > 1 else [core.fit(t, Y[0], max_components)]
+    except Exception as e:
+        return [], f"{path}: {e}"
+    name = os.path.basename(path)
+    pages = [report_data(t, y, fit, title=name if len(Y) == 1 else f"{name}, кривая {i + 1}")
+             for i, (y, fit) in enumerate(zip(Y, fits)) if fit[0]]
+    return pages, None if pages else f"{path}: нет компонент"
+
+
+def render_file(path, out_dir, max_components=4, grid='fixed', dpi=REPORT_DPI, result_cache=None,
+                reduce_ratio=None):
+    # Воркер для PNG: расчёт и отрисовка целиком в процессе, обратно - только имена файлов
+    pages, error = prepare_file(path, max_components, grid, result_cache, reduce_ratio)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    out = [save_report(os.path.join(out_dir, f"{stem}.png" if len(pages) == 1 else f"{stem}_{i + 1}.png"), page, dpi)
+           for i, page in enumerate(pages)]
+    return out, error
+
+
+def run_reports(files, output, max_components=4, workers=None, grid='fixed', dpi=REPORT_DPI, progress=None,
+                result_cache=None, reduce_ratio=None):
+    # output с расширением .pdf - один многостраничный PDF (страницы в порядке файлов),
+    # иначе папка с PNG. Расчёт и подготовка страниц идут в процессах; PNG там же и
+    # рисуются, а PDF (векторный, ряды уже прорежены) собирается в основном процессе,
+    # пока воркеры считают следующие файлы
+    progress = progress or no_progress
+    to_pdf = output.lower().endswith('.pdf')
+    if not to_pdf:
+        os.makedirs(output, exist_ok=True)
+    workers = min(workers or os.cpu_count() or 1, max(1, len(files)))
+    if to_pdf:
+        task, extra = prepare_file, (max_components, grid, result_cache, reduce_ratio)
+    else:
+        task, extra = render_file, (output, max_components, grid, dpi, result_cache, reduce_ratio)
+
+    pdf = None
+    if to_pdf:
+        from matplotlib.backends.backend_pdf import PdfPages
+        pdf = PdfPages(output)
+    n_pages, errors = 0, []
+    progress('report', 0)
+    try:
+        if workers == 1:
+            results = (task(path, *extra) for path in files)
+            pool = None
+        else:
+            # spawn: пул запускается и из рабочего потока GUI, fork многопоточного процесса Qt
+            # может зависнуть на унаследованных блокировках
+            pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'))
+            # Результаты забираются по порядку файлов, а считаются параллельно
+            results = (fut.result() for fut in [pool.submit(task, path, *extra) for path in files])
+        try:
+            for k, (pages, error) in enumerate(results, start=1):
+                if error:
+                    errors.append(error)
+                if to_pdf:
+                    for page in pages:
+                        pdf.savefig(draw_report(page), dpi=dpi)
+                n_pages += len(pages)
+                progress('report', k)
+        finally:
+            if pool is not None:
+                # При отмене (исключение из progress) оставшиеся файлы снимаются с очереди
+                pool.shutdown(cancel_futures=True)
+    finally:
+        if pdf is not None:
+            pdf.close()
+    return n_pages, errors
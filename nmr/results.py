@@ -0,0 +1,136 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from .core import FIT_VERSION
+
+SCHEMA_VERSION = 1
+
+
+def default_path():
+    # Общий для GUI и пакетной обработки файл; NMR_RESULT_CACHE задаёт другой путь
+    path = os.environ.get('NMR_RESULT_CACHE')
+    if path:
+        return path
+    base = os.environ.get('LOCALAPPDATA') or os.environ.get('XDG_CACHE_HOME') \
+        or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'nmr', 'results.sqlite')
+
+
+# === Хранилище результатов аппроксимации (SQLite) ===
+class ResultStore:
+    # Ключ - хэш содержимого t, y и всех настроек расчёта, включая версию алгоритма;
+    # значение - вектор параметров [a..., T2..., B] (кривые модели пересчитываются по нему).
+    # Записи другой версии алгоритма удаляются при открытии, сверх max_bytes -
+    # вытесняются давно не использованные
+    def __init__(self, path=None, version=FIT_VERSION, max_bytes=64 * 2**20):
+        self.path = path or default_path()
+        self.version = version
+        self.max_bytes = max_bytes
+        self.hits = self.misses = self.evictions = 0
+        self._lock = threading.RLock()
+        if self.path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        # Соединение используется из рабочих потоков GUI - доступ под блокировкой;
+        # несколько процессов пакетной обработки пишут в один файл (WAL, ожидание блокировки)
+        self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        with self._lock:
+            if self._db.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+                self._db.execute('DROP TABLE IF EXISTS results')
+                self._db.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+            self._db.execute('PRAGMA journal_mode = WAL')
+            self._db.execute('CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, version INTEGER, '
+                             'accessed REAL, size INTEGER, params BLOB)')
+            self._db.execute('CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)')
+            # Суммарный размер записей ведётся триггерами в таблице meta (пишут несколько процессов,
+            # поэтому не в памяти); полный подсчёт - только здесь, при открытии
+            self._db.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)')
+            self._db.executescript("""
+                CREATE TRIGGER IF NOT EXISTS results_size_insert AFTER INSERT ON results BEGIN
+                    UPDATE meta SET value = value + NEW.size WHERE key = 'size'; END;
+                CREATE TRIGGER IF NOT EXISTS results_size_delete AFTER DELETE ON results BEGIN
+                    UPDATE meta SET value = value - OLD.size WHERE key = 'size'; END;
+                CREATE TRIGGER IF NOT EXISTS results_size_update AFTER UPDATE OF size ON results BEGIN
+                    UPDATE meta SET value = value + NEW.size - OLD.size WHERE key = 'size'; END;
+            """)
+            self._db.execute('DELETE FROM results WHERE version != ?', (version,))
+            self._db.execute("INSERT OR REPLACE INTO meta VALUES ('size', "
+                             "(SELECT COALESCE(SUM(size), 0) FROM results))")
+
+    def key(self, t, y, settings):
+        h = hashlib.blake2b(digest_size=20)
+        for a in (t, y):
+            a = np.ascontiguousarray(a, dtype=float)
+            h.update(str(a.shape).encode())
+            h.update(a.tobytes())
+        h.update(json.dumps(dict(settings, version=self.version), sort_keys=True).encode())
+        return h.hexdigest()
+
+    def get(self, key):
+        # Вектор параметров (пустой - компонент не найдено) или None, если записи нет
+        with self._lock:
+            row = self._db.execute('SELECT params FROM results WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._db.execute('UPDATE results SET accessed = ? WHERE key = ?', (time.time(), key))
+        return np.frombuffer(row[0], dtype=float).copy()
+
+    def put(self, key, params):
+        blob = np.asarray(params, dtype=float).tobytes()
+        with self._lock:
+            # Не INSERT OR REPLACE: удаление при замене не вызывает триггеры размера
+            self._db.execute('INSERT INTO results VALUES (?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET '
+                             'version = excluded.version, accessed = excluded.accessed, size = excluded.size, '
+                             'params = excluded.params',
+                             (key, self.version, time.time(), len(key) + len(blob) + 32, blob))
+            self._shrink()
+
+    def _shrink(self):
+        total = self.nbytes
+        if total <= self.max_bytes:
+            return
+        # Удаление с запасом (до 90% лимита), чтобы не чистить на каждой записи
+        excess = total - int(self.max_bytes * 0.9)
+        rows = self._db.execute('SELECT key, size FROM results ORDER BY accessed').fetchall()
+        old = []
+        for key, size in rows:
+            if excess <= 0:
+                break
+            old.append((key,))
+            excess -= size
+        self._db.executemany('DELETE FROM results WHERE key = ?', old)
+        self.evictions += len(old)
+
+    @property
+    def nbytes(self):
+        with self._lock:
+            return self._db.execute("SELECT value FROM meta WHERE key = 'size'").fetchone()[0]
+
+    def stats(self):
+        with self._lock:
+            n = self._db.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+            return {'entries': n, 'nbytes': self.nbytes, 'max_bytes': self.max_bytes, 'hits': self.hits,
+                    'misses': self.misses, 'evictions': self.evictions, 'path': self.path}
+
+    def clear(self):
+        with self._lock:
+            self._db.execute('DELETE FROM results')
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def open_store(path=None, version=FIT_VERSION, max_bytes=64 * 2**20):
+    # Хранилище или None, если файл не открыть (папка только для чтения) - работаем без него
+    try:
+        return ResultStore(path, version, max_bytes)
+    except (OSError, sqlite3.Error):
+        return None
@@ -0,0 +1,103 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+
+from .core import NMRCore, as_params
+from .diagnostics import NULL_DIAGNOSTICS
+from .utils import no_progress
+
+CRITERIA = ('bic', 'aic', 'f')
+F_ALPHA = 0.05
+
+
+# === Выбор числа компонент: один NNLS, уточнение всех кандидатов 1..N ===
+def fit_orders(t, y, max_components=6, core=None, criterion='bic', workers=None, progress=None):
+    # NNLS-спектр и пики считаются один раз; модель из k компонент уточняется из k наибольших
+    # пиков - то же, что fit(t, y, k) на фиксированной сетке (такие результаты кладутся и в
+    # хранилище core). Кандидаты независимы и уточняются параллельно в потоках: least_squares
+    # проводит основное время в numpy, отпуская GIL
+    if criterion not in CRITERIA:
+        raise ValueError(f"Неизвестный критерий: {criterion}")
+    core = core or NMRCore()
+    progress = progress or no_progress
+    y_max = np.max(y)
+    y_norm = y / y_max
+    t_fit, y_fit, weights = core.reduce(t, y_norm)
+
+    progress('kernel', 0)
+    if core.grid == 'adaptive':
+        _, _, _, peaks = core.adaptive_nnls(t_fit, y_fit, max_components, progress, NULL_DIAGNOSTICS, weights, t)
+    else:
+        t2_grid = core.t2_grid(t)
+        amps_grid, _ = core.grid_nnls(t_fit, y_fit, t2_grid, progress, NULL_DIAGNOSTICS, weights)
+        progress('peaks', 0)
+        peaks = core.find_peaks(amps_grid, t2_grid, max_components)
+    peaks = sorted(peaks, key=lambda p: -p[0])
+    if not peaks:
+        return {'candidates': [], 'best': None, 'criterion': criterion}
+
+    fits, done = {}, [0]
+
+    def refine(k):
+        # progress здесь - только для отмены (FitCancelled из любого потока)
+        fit = core.refine(t_fit, y_fit, y_max, peaks[:k], lambda stage, value: progress('orders', done[0]),
+                          weights=weights, t_full=t)
+        # Критерии - по остаткам на всех эхо
+        return fit if weights is None else core.result_from(t, y, as_params(fit))
+
+    progress('orders', 0)
+    pool = ThreadPoolExecutor(min(workers or os.cpu_count() or 1, len(peaks)))
+    try:
+        futures = {pool.submit(refine, k): k for k in range(1, len(peaks) + 1)}
+        for fut in as_completed(futures):
+            fits[futures[fut]] = fut.result()
+            done[0] += 1
+            progress('orders', done[0])
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+    if core.results is not None and core.grid == 'fixed':
+        for k in range(1, max_components + 1):
+            core.results.put(core.results.key(t, y, core.fit_settings(k)), as_params(fits[min(k, len(peaks))]))
+    candidates = rank_orders(fits, len(t))
+    return {'candidates': candidates, 'best': best_order(candidates, criterion), 'criterion': criterion}
+
+
+def rank_orders(fits, n_points):
+    # AIC/BIC по сумме квадратов остатков (нормальный шум): n ln(RSS/n) + штраф за p = 2k + 1
+    # параметров; F-тест - значимость снижения RSS при добавлении k-й компоненты к k-1
+    from scipy.stats import f as f_dist
+    out, prev = [], None
+    for k in sorted(fits):
+        fit = fits[k]
+        rss = float(np.sum(fit[2]**2))
+        p = 2 * k + 1
+        loglik = n_points * np.log(max(rss, np.finfo(float).tiny) / n_points)
+        row = {'n_components': k, 'fit': fit, 'rss': rss, 'rms': float(np.sqrt(rss / n_points)),
+               'aic': loglik + 2 * p, 'bic': loglik + p * np.log(n_points), 'f': None, 'p_value': None}
+        if prev is not None and n_points > p:
+            f = (prev['rss'] - rss) / 2 / (rss / (n_points - p))
+            row['f'] = float(f)
+            row['p_value'] = float(f_dist.sf(f, 2, n_points - p)) if f > 0 else 1.0
+        out.append(row)
+        prev = row
+    for name in ('aic', 'bic'):
+        low = min(r[name] for r in out)
+        for r in out:
+            r['d_' + name] = r[name] - low
+    return out
+
+
+def best_order(candidates, criterion='bic', alpha=F_ALPHA):
+    if not candidates:
+        return None
+    if criterion == 'f':
+        # Компоненты добавляются, пока каждая следующая значима
+        k = candidates[0]['n_components']
+        for r in candidates[1:]:
+            if r['p_value'] is None or r['p_value'] >= alpha:
+                break
+            k = r['n_components']
+        return k
+    return min(candidates, key=lambda r: r[criterion])['n_components']
@@ -0,0 +1,102 @@
+import csv
+
+import numpy as np
+
+from .core import NMRCore, as_params
+from .utils import no_progress
+
+
+# === Серия кривых одного образца (гидратация, отверждение): спектр T2 дрейфует медленно ===
+def _rms(diff_norm):
+    return float(np.sqrt(np.mean(diff_norm**2)))
+
+
+def needs_full_search(results, rms, rms_ref, residual_tol=0.25, min_share=0.005, min_ratio=1.15):
+    # Тёплый старт не годится, если выросла невязка (появилась компонента) или
+    # компонента исчезла: доля ~0 либо две T2 слились
+    if not results or rms > rms_ref * (1 + residual_tol):
+        return True
+    if min(r['Share'] for r in results) < min_share:
+        return True
+    t2 = [r['T2'] for r in results]
+    return any(b / a < min_ratio for a, b in zip(t2, t2[1:]))
+
+
+def fit_series(t, Y, max_components=4, core=None, residual_tol=0.25, min_share=0.005, progress=None):
+    # Кривые подаются в порядке съёмки; каждая уточняется из решения предыдущей,
+    # полный NNLS-поиск - только для первой и при срабатывании needs_full_search
+    core = core or NMRCore()
+    progress = progress or no_progress
+    out, x_prev, rms_ref = [], None, None
+    for i, y in enumerate(Y):
+        progress('series', i)
+        y_max = np.max(y)
+        y_norm = y / y_max
+        fit, warm = None, False
+        if x_prev is not None:
+            fit = core.refine_from(t, y_norm, y_max, x_prev)
+            warm = not needs_full_search(fit[0], _rms(fit[2]), rms_ref, residual_tol, min_share)
+        if not warm:
+            fit = core.fit(t, y, max_components)
+            rms_ref = _rms(fit[2])
+        results, _, diff_norm, offset_norm, amp_scale = fit
+        x_prev = as_params(fit) if results else None
+        out.append({'index': i, 'results': results, 'offset_norm': float(offset_norm),
+                    'amplitude': float(amp_scale), 'rms': _rms(diff_norm), 'warm': warm})
+    progress('series', len(Y))
+    track_components(out)
+    return out
+
+
+def track_components(series, max_log_ratio=np.log(2.0)):
+    # Номер трека для каждой компоненты: сопоставление с предыдущей кривой по |ln T2|
+    # (венгерский алгоритм); дальше max_log_ratio - новый трек
+    from scipy.optimize import linear_sum_assignment
+    last, n_tracks, prev = {}, 0, []
+    for item in series:
+        log_t2 = np.log([r['T2'] for r in item['results']])
+        ids = [None] * len(log_t2)
+        if item.get('warm') and len(prev) == len(ids):
+            # Тёплый старт продолжает те же компоненты (порядок по T2 сохраняется)
+            ids = list(prev)
+        elif last and len(log_t2):
+            prev_ids = list(last)
+            cost = np.abs(log_t2[:, np.newaxis] - np.array([last[k] for k in prev_ids]))
+            for r, c in zip(*linear_sum_assignment(cost)):
+                if cost[r, c] <= max_log_ratio:
+                    ids[r] = prev_ids[c]
+        for j in range(len(ids)):
+            if ids[j] is None:
+                ids[j] = n_tracks
+                n_tracks += 1
+        item['tracks'] = prev = ids
+        # Исчезнувшая компонента может вернуться: последний T2 трека помнится
+        last.update(zip(ids, log_t2))
+    return n_tracks
+
+
+def tracks_table(series):
+    # Широкая таблица: строка на кривую, столбцы T2_k/Share_k по трекам (пусто, если трека нет)
+    n_tracks = max((max(item['tracks']) + 1 for item in series if item['tracks']), default=0)
+    columns = ['index', 'warm', 'rms', 'offset_norm', 'amplitude']
+    for k in range(n_tracks):
+        columns += [f'T2_{k + 1}', f'Share_{k + 1}']
+    rows = []
+    for item in series:
+        row = {c: item[c] for c in columns[:5]}
+        for track, r in zip(item['tracks'], item['results']):
+            row[f'T2_{track + 1}'] = float(r['T2'])
+            row[f'Share_{track + 1}'] = float(r['Share'])
+        rows.append(row)
+    return columns, rows
+
+
+def write_tracks(path, series, labels=None):
+    columns, rows = tracks_table(series)
+    if labels is not None:
+        columns = ['label'] + columns
+        rows = [dict(row, label=label) for row, label in zip(rows, labels)]
+    with open(path, 'w', newline='', encoding='utf-8') as fh:
+        writer = csv.DictWriter(fh, fieldnames=columns, restval='')
+        writer.writeheader()
+        writer.writerows(rows)
@@ -0,0 +1,308 @@
+import json
+import multiprocessing
+import signal
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from .core import shared_core
+from .kernels import time_fingerprint
+
+MAX_BATCH = 32
+MAX_WAIT = 0.005
+MAX_QUEUE = 256
+MAX_BODY = 256 * 2**20
+REQUEST_TIMEOUT = 300.0
+METRICS_WINDOW = 10000
+
+
+class Busy(Exception):
+    pass
+
+
+# === Расчёт пакета (в процессе-воркере) ===
+def fit_batch(t, Y, max_components=4, result_cache=None):
+    # NMRCore процесса для этих настроек; пакет всегда через fit_many (ядро и QR - один раз),
+    # поэтому ответ не зависит от того, с какими запросами кривая попала в пакет
+    core = shared_core(result_cache)
+    start = time.perf_counter()
+    fits = core.fit_many(t, Y, max_components)
+    return [fit_summary(fit) for fit in fits], time.perf_counter() - start
+
+
+def warm_up(result_cache=None):
+    # Импорт scipy и создание NMRCore в воркере до первого запроса
+    t = np.linspace(1e-3, 1.0, 64)
+    fit_batch(t, np.exp(-t / 0.1)[np.newaxis], 1, result_cache)
+
+
+def fit_summary(fit):
+    results, _, diff_norm, offset_norm, amp_scale = fit
+    return {'components': [{'T2': float(r['T2']), 'Share': float(r['Share'])} for r in results],
+            'offset_norm': float(offset_norm), 'amp_scale': float(amp_scale),
+            'rms': float(np.sqrt(np.mean(diff_norm**2)))}
+
+
+class FitRequest:
+    __slots__ = ('t', 'y', 'max_components', 'key', 'done', 'result', 'error', 'submitted', 'started')
+
+    def __init__(self, t, y, max_components):
+        self.t, self.y, self.max_components = t, y, max_components
+        # Пакет - только кривые с одинаковой осью времени и числом компонент
+        self.key = (max_components, len(t), time_fingerprint(t))
+        self.done = threading.Event()
+        self.result = self.error = None
+        self.submitted = time.perf_counter()
+        self.started = None
+
+
+# === Очередь с микропакетами ===
+class FitService:
+    # Запросы копятся в очереди; диспетчер ждёт свободный воркер и забирает из очереди пакет
+    # кривых с той же осью времени (до max_batch, дожидаясь попутчиков не дольше max_wait).
+    # Под нагрузкой, пока воркеры заняты, пакеты сами растут. Очередь ограничена max_queue:
+    # при переполнении submit выбрасывает Busy (HTTP 503), а не копит задержку
+    def __init__(self, workers=1, max_batch=MAX_BATCH, max_wait=MAX_WAIT, max_queue=MAX_QUEUE,
+                 result_cache=None):
+        self.workers, self.max_batch, self.max_wait, self.max_queue = workers, max_batch, max_wait, max_queue
+        self.result_cache = result_cache
+        self.metrics = Metrics()
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._slots = threading.Semaphore(workers)
+        self._running = True
+        # spawn: сервис - многопоточный процесс (диспетчер, потоки HTTP), fork копирует
+        # блокировки, захваченные другими потоками, и воркер может зависнуть
+        self._pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'))
+        # Воркеры запускаются сразу (а не при первом запросе): первый запрос не ждёт импорта scipy
+        for f in [self._pool.submit(warm_up, result_cache) for _ in range(workers)]:
+            f.result()
+        self._dispatcher = threading.Thread(target=self._dispatch, name='nmr-dispatch', daemon=True)
+        self._dispatcher.start()
+
+    def submit(self, t, y, max_components=4):
+        request = FitRequest(t, y, max_components)
+        with self._cond:
+            if len(self._queue) >= self.max_queue:
+                self.metrics.rejected()
+                raise Busy(f"Очередь заполнена ({self.max_queue})")
+            self._queue.append(request)
+            self.metrics.submitted()
+            self._cond.notify()
+        return request
+
+    def fit(self, t, y, max_components=4, timeout=REQUEST_TIMEOUT):
+        request = self.submit(t, y, max_components)
+        if not request.done.wait(timeout):
+            raise TimeoutError("Расчёт не завершился вовремя")
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    @property
+    def queue_depth(self):
+        with self._cond:
+            return len(self._queue)
+
+    def stats(self):
+        return dict(self.metrics.snapshot(), queue=self.queue_depth, workers=self.workers,
+                    max_batch=self.max_batch, max_wait_ms=self.max_wait * 1e3, max_queue=self.max_queue)
+
+    def close(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        self._dispatcher.join()
+        self._pool.shutdown(cancel_futures=True)
+
+    def _take_batch(self):
+        # Вызывается под self._cond при непустой очереди
+        first = self._queue[0]
+        deadline = first.submitted + self.max_wait
+        while self._running:
+            n_same = sum(r.key == first.key for r in self._queue)
+            left = deadline - time.perf_counter()
+            if n_same >= self.max_batch or left <= 0:
+                break
+            self._cond.wait(left)
+        batch, rest = [], deque()
+        while self._queue:
+            r = self._queue.popleft()
+            (batch if r.key == first.key and len(batch) < self.max_batch else rest).append(r)
+        self._queue = rest
+        return batch
+
+    def _dispatch(self):
+        while True:
+            # Сначала свободный воркер, потом пакет: пока все заняты, очередь копится в пакеты
+            self._slots.acquire()
+            with self._cond:
+                while self._running and not self._queue:
+                    self._cond.wait()
+                if not self._running:
+                    break
+                batch = self._take_batch()
+            now = time.perf_counter()
+            for r in batch:
+                r.started = now
+            first = batch[0]
+            try:
+                future = self._pool.submit(fit_batch, first.t, np.array([r.y for r in batch]),
+                                           first.max_components, self.result_cache)
+            except Exception as e:
+                self._finish(batch, None, e)
+                continue
+            future.add_done_callback(lambda f, batch=batch: self._finish(batch, f))
+        for r in self._queue:
+            r.error = Busy("Сервис остановлен")
+            r.done.set()
+
+    def _finish(self, batch, future, error=None):
+        self._slots.release()
+        elapsed = 0.0
+        if error is None:
+            try:
+                results, elapsed = future.result()
+            except Exception as e:
+                error = e
+        now = time.perf_counter()
+        for i, r in enumerate(batch):
+            if error is None:
+                r.result = dict(results[i], batch_size=len(batch), queue_ms=(r.started - r.submitted) * 1e3,
+                                fit_ms=elapsed * 1e3)
+            else:
+                r.error = error
+            r.done.set()
+        self.metrics.batch_done(batch, now, elapsed, error is None)
+
+
+# === Метрики: счётчики и скользящее окно последних запросов ===
+class Metrics:
+    def __init__(self, window=METRICS_WINDOW):
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=window)
+        self.started = time.perf_counter()
+        self.n_submitted = self.n_completed = self.n_failed = self.n_rejected = 0
+        self.n_batches = self.n_batched_curves = 0
+        self.busy_time = 0.0
+
+    def submitted(self):
+        with self._lock:
+            self.n_submitted += 1
+
+    def rejected(self):
+        with self._lock:
+            self.n_rejected += 1
+
+    def batch_done(self, batch, now, elapsed, ok):
+        with self._lock:
+            self.n_batches += 1
+            self.n_batched_curves += len(batch)
+            self.busy_time += elapsed
+            if not ok:
+                self.n_failed += len(batch)
+                return
+            self.n_completed += len(batch)
+            for r in batch:
+                self._recent.append((now, now - r.submitted, r.started - r.submitted, len(batch)))
+
+    def snapshot(self):
+        with self._lock:
+            recent = np.array(self._recent) if self._recent else np.zeros((0, 4))
+            out = {'uptime_s': time.perf_counter() - self.started, 'submitted': self.n_submitted,
+                   'completed': self.n_completed, 'failed': self.n_failed, 'rejected': self.n_rejected,
+                   'batches': self.n_batches, 'busy_s': self.busy_time,
+                   'mean_batch': self.n_batched_curves / self.n_batches if self.n_batches else 0.0}
+        if len(recent):
+            # Задержки - по окну последних запросов, пропускная способность - за последние 10 с
+            latency, wait = recent[:, 1] * 1e3, recent[:, 2] * 1e3
+            out['latency_ms'] = {f'p{q}': float(np.percentile(latency, q)) for q in (50, 90, 99)}
+            out['queue_ms'] = {f'p{q}': float(np.percentile(wait, q)) for q in (50, 99)}
+            last = recent[recent[:, 0] >= recent[-1, 0] - 10.0]
+            span = max(last[-1, 0] - last[0, 0], 1e-3) if len(last) > 1 else 1.0
+            out['throughput_rps'] = len(last) / span if len(last) > 1 else 0.0
+        return out
+
+
+# === HTTP ===
+class FitHandler(BaseHTTPRequestHandler):
+    # POST /fit {"t": [...], "y": [...], "max_components": 4} -> компоненты, смещение, rms;
+    # GET /metrics - счётчики, задержки и очередь; GET /health
+    service = None
+    quiet = True
+
+    def do_GET(self):
+        if self.path == '/health':
+            self.reply(200, {'status': 'ok'})
+        elif self.path == '/metrics':
+            self.reply(200, self.service.stats())
+        else:
+            self.reply(404, {'error': "Неизвестный путь"})
+
+    def do_POST(self):
+        if self.path != '/fit':
+            self.reply(404, {'error': "Неизвестный путь"})
+            return
+        size = int(self.headers.get('Content-Length') or 0)
+        if size > MAX_BODY:
+            self.reply(413, {'error': f"Запрос больше {MAX_BODY // 2**20} МБ"})
+            return
+        try:
+            body = json.loads(self.rfile.read(size))
+            t, y = parse_curve(body)
+            max_components = int(body.get('max_components', 4))
+        except (ValueError, TypeError, KeyError, AttributeError) as e:
+            self.reply(400, {'error': str(e)})
+            return
+        try:
+            self.reply(200, self.service.fit(t, y, max_components))
+        except Busy as e:
+            self.reply(503, {'error': str(e)}, {'Retry-After': '1'})
+        except TimeoutError as e:
+            self.reply(504, {'error': str(e)})
+        except Exception as e:
+            self.reply(500, {'error': str(e)})
+
+    def reply(self, code, payload, headers=None):
+        data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+
+def parse_curve(body):
+    t = np.asarray(body['t'], dtype=float)
+    y = np.asarray(body['y'], dtype=float)
+    if t.ndim != 1 or t.shape != y.shape or len(t) < 8:
+        raise ValueError("t и y - одномерные массивы одной длины (не меньше 8 точек)")
+    if not (np.all(np.isfinite(t)) and np.all(np.isfinite(y))) or np.max(y) <= 0:
+        raise ValueError("Нечисловые значения или неположительный сигнал")
+    return t, y
+
+
+def serve(host='127.0.0.1', port=8765, quiet=True, **kwargs):
+    # Блокирует до Ctrl+C (или SIGTERM). Только локальный адрес по умолчанию: аутентификации нет
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    service = FitService(**kwargs)
+    handler = type('Handler', (FitHandler,), {'service': service, 'quiet': quiet})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
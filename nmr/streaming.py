@@ -0,0 +1,201 @@
+import sys
+import time
+
+import numpy as np
+
+from .core import GRID_SIZE, NMRCore
+from .io import parse_block, sniff_line
+from .kernels import build_kernel, compress_gram
+from .model import MultiExpModel
+
+
+# === Аппроксимация во время записи: эхо поступают порциями ===
+class StreamingFit:
+    # Ядро не хранится целиком: копятся нормальные уравнения K^T K, K^T y по фиксированной
+    # сетке T2, а для уточнения - суммы по геометрическим интервалам времени
+    # (их число растёт как log t), поэтому время обновления не растёт с длиной цепочки
+    def __init__(self, max_components=4, t2_max=10.0, grid_size=GRID_SIZE, bin_ratio=1.02,
+                 refine_method='full', nnls_method='gram'):
+        self.max_components = max_components
+        self.t2_max = t2_max
+        self.grid_size = grid_size
+        self.bin_ratio = bin_ratio
+        self.refine_method = refine_method
+        self.nnls_method = nnls_method
+        self._core = NMRCore(refine_method=refine_method, nnls_method=nnls_method)
+        self.reset()
+
+    def reset(self):
+        self.t2_grid = None
+        self.G = self.b = None
+        self.n_points = 0
+        self.dt = self.t_last = None
+        self.y_max = -np.inf
+        self.time_scale = 1.0
+        self._pending = None
+        self._bin_t = np.zeros(0)
+        self._bin_y = np.zeros(0)
+        self._bin_n = np.zeros(0)
+        self.x = None
+        self.results, self.offset_norm, self.amp_scale = [], 0.0, 1.0
+
+    def add(self, t, y):
+        t = np.asarray(t, dtype=float)
+        y = np.asarray(y, dtype=float)
+        if self._pending is not None:
+            t, y = np.r_[self._pending[0], t], np.r_[self._pending[1], y]
+            self._pending = None
+        if self.t2_grid is None:
+            # Сетке T2 нужен шаг по времени: ждём хотя бы двух точек
+            if len(t) < 2:
+                self._pending = (t, y)
+                return
+            # Время в микросекундах -> секунды (как при загрузке файла)
+            self.time_scale = 1e-6 if t[0] > 10 else 1.0
+            t0 = t * self.time_scale
+            self.dt = t0[1] - t0[0]
+            self.t2_grid = np.logspace(np.log10(max(1e-7, self.dt)), np.log10(self.t2_max), self.grid_size)
+            self.G = np.zeros((self.grid_size, self.grid_size))
+            self.b = np.zeros(self.grid_size)
+        if len(t) == 0:
+            return
+        t = t * self.time_scale
+
+        K = build_kernel(t, self.t2_grid)
+        self.G += K.T @ K
+        self.b += K.T @ y
+        self.n_points += len(t)
+        self.t_last = t[-1]
+        self.y_max = max(self.y_max, float(np.max(y)))
+
+        k = np.floor(np.log(np.maximum(t, self.dt) / self.dt) / np.log(self.bin_ratio)).astype(np.int64)
+        size = int(k.max()) + 1
+        if size > len(self._bin_n):
+            grow = size - len(self._bin_n)
+            self._bin_t, self._bin_y, self._bin_n = (np.r_[a, np.zeros(grow)]
+                                                     for a in (self._bin_t, self._bin_y, self._bin_n))
+        self._bin_t[:size] += np.bincount(k, weights=t, minlength=size)
+        self._bin_y[:size] += np.bincount(k, weights=y, minlength=size)
+        self._bin_n[:size] += np.bincount(k, minlength=size)
+
+    def binned(self):
+        # Средние по интервалам (норм.) и число эхо в каждом - веса для уточнения
+        mask = self._bin_n > 0
+        n = self._bin_n[mask]
+        return self._bin_t[mask] / n, self._bin_y[mask] / n / self.y_max, n
+
+    def solve(self):
+        if self.n_points < 3:
+            return self.results, self.offset_norm, self.amp_scale
+        b = self.b / self.y_max
+        if self.nnls_method == 'gram':
+            # Сетка не меняется, поэтому NNLS стартует с пассивного множества прошлого обновления
+            # (невязка не нужна: y^T y не копится)
+            amps_grid, _, _ = self._core.solve_nnls(self.G, b, 0.0, self.t2_grid)
+        else:
+            from scipy.optimize import nnls
+            A, d = compress_gram(self.G, b)
+            amps_grid, _ = nnls(A, d)
+        peaks = self._core.find_peaks(amps_grid, self.t2_grid, self.max_components)
+        if not peaks:
+            self.x, self.results = None, []
+            return self.results, self.offset_norm, self.amp_scale
+
+        n = len(peaks)
+        lower = np.array([0]*n + [self.dt/5]*n + [-0.1])
+        upper = np.array([2]*n + [self.t_last*2]*n + [0.1])
+        if self.x is not None and len(self.x) == 2*n + 1:
+            # Тёплый старт с предыдущего решения
+            x0 = np.clip(self.x, lower, upper)
+        else:
+            x0 = np.array([p[0] for p in peaks] + [p[1] for p in peaks] + [0.0])
+        x0 = np.clip(x0, lower + 1e-12 * (upper - lower), upper - 1e-12 * (upper - lower))
+
+        tb, yb, w = self.binned()
+        res = MultiExpModel(tb, yb, weights=w).fit(x0, lower, upper, self.refine_method)
+        self.x = res.x
+        sum_a = np.sum(res.x[:n])
+        self.results = sorted([{'T2': res.x[n+i], 'Share': res.x[i]/sum_a if sum_a > 0 else 0}
+                               for i in range(n)], key=lambda r: r['T2'])
+        self.offset_norm, self.amp_scale = res.x[-1], sum_a
+        return self.results, self.offset_norm, self.amp_scale
+
+    def evaluate(self, t):
+        # Модель (норм.) на произвольной оси времени в секундах
+        if self.x is None:
+            return None
+        return MultiExpModel(t, None).evaluate(self.x)
+
+
+# === Источники данных ===
+def _chunks_from_lines(lines_iter, fmt_holder):
+    lines = []
+    for line in lines_iter:
+        if fmt_holder.get('fmt') is None:
+            fmt_holder['fmt'] = sniff_line(line.decode('utf-8', errors='replace'))
+            if fmt_holder['fmt'] is None:
+                continue
+        lines.append(line)
+    if not lines:
+        return None
+    data = parse_block(b''.join(line if line.endswith(b'\n') else line + b'\n' for line in lines),
+                       fmt_holder['fmt'])
+    return data[:, 0], data[:, 1]
+
+
+def follow_file(path, poll_interval=0.2, idle_timeout=None, stop=None):
+    # Чтение дописываемого файла: отдаются только целые новые строки
+    fmt_holder, tail, idle_since = {}, b'', time.monotonic()
+    with open(path, 'rb') as fh:
+        while True:
+            block = fh.read()
+            if block:
+                block = tail + block
+                cut = block.rfind(b'\n') + 1
+                block, tail = block[:cut], block[cut:]
+                chunk = _chunks_from_lines(block.splitlines(keepends=True), fmt_holder)
+                if chunk is not None:
+                    idle_since = time.monotonic()
+                    yield chunk
+                continue
+            if stop is not None and stop():
+                return
+            if idle_timeout is not None and time.monotonic() - idle_since > idle_timeout:
+                return
+            # Пустая порция: файл не растёт, можно досчитать отложенное обновление
+            yield np.empty(0), np.empty(0)
+            time.sleep(poll_interval)
+
+
+def read_stream(fh=None, chunk_lines=256):
+    # Канал/сокет/stdin: порции по chunk_lines строк до конца потока
+    fh = fh if fh is not None else sys.stdin.buffer
+    fmt_holder, lines = {}, []
+    for line in fh:
+        lines.append(line if isinstance(line, bytes) else line.encode('utf-8'))
+        if len(lines) >= chunk_lines:
+            chunk = _chunks_from_lines(lines, fmt_holder)
+            lines = []
+            if chunk is not None:
+                yield chunk
+    chunk = _chunks_from_lines(lines, fmt_holder)
+    if chunk is not None:
+        yield chunk
+
+
+def run_stream(chunks, stream_fit, min_interval=0.25, on_update=None):
+    # Обновления решения не чаще, чем раз в min_interval секунд (и в конце потока)
+    last, dirty = -np.inf, False
+    for t, y in chunks:
+        if len(t):
+            stream_fit.add(t, y)
+            dirty = True
+        if dirty and time.monotonic() - last >= min_interval:
+            last, dirty = time.monotonic(), False
+            stream_fit.solve()
+            if on_update:
+                on_update(stream_fit)
+    stream_fit.solve()
+    if on_update:
+        on_update(stream_fit)
+    return stream_fit
@@ -0,0 +1,27 @@
+import numpy as np
+
+
+# === Синтетические кривые CPMG с известными параметрами ===
+def synthetic_cpmg(n_points=2000, t_end=2.0, t2=(0.01, 0.1, 0.5), shares=(0.2, 0.5, 0.3),
+                   amplitude=1000.0, offset=0.0, noise=0.005, seed=None):
+    rng = np.random.default_rng(seed)
+    t = np.linspace(t_end / n_points, t_end, n_points)
+    shares = np.asarray(shares, dtype=float)
+    shares = shares / shares.sum()
+    y = np.exp(-t[:, np.newaxis] / np.asarray(t2, dtype=float)) @ shares + offset
+    y = amplitude * (y + noise * rng.standard_normal(n_points))
+    return t, y
+
+
+def synthetic_2d(n1=64, n2=8000, t2_end=2.0, tau_range=(1e-3, 5.0), kind1='T1_ir',
+                 peaks=((0.05, 0.02, 0.4), (0.5, 0.2, 0.6)), amplitude=1000.0, noise=0.005, seed=None):
+    # 2D-данные (T1-T2 или D-T2): строки - точки первой оси (tau или b), столбцы - эхо.
+    # peaks - (X1, T2, доля), X1 - T1 или коэффициент диффузии
+    from .inversion2d import KERNELS
+    rng = np.random.default_rng(seed)
+    axis1 = np.logspace(np.log10(tau_range[0]), np.log10(tau_range[1]), n1)
+    t = np.linspace(t2_end / n2, t2_end, n2)
+    M = sum(share * np.outer(KERNELS[kind1](axis1, np.array([x1]))[:, 0], np.exp(-t / t2))
+            for x1, t2, share in peaks)
+    M = amplitude * M + rng.normal(0.0, noise * amplitude, M.shape)
+    return axis1, t, M
@@ -0,0 +1,119 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .core import NMRCore, as_params
+from .model import MultiExpModel
+from .utils import no_progress
+
+CHUNKS_PER_WORKER = 4
+MIN_CHUNKS = 20
+
+# Данные воркера: ось времени, базовая модель и остатки из общей памяти
+_shared = {}
+
+
+# === Доверительные интервалы: повторные подгонки к синтетическим копиям кривой ===
+def _attach(name, shape, settings):
+    try:
+        shm = shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13: без параметра track
+        shm = shared_memory.SharedMemory(name=name)
+    _shared['shm'] = shm
+    _shared['data'] = np.ndarray(shape, dtype=float, buffer=shm.buf)
+    _shared['core'] = NMRCore(**settings)
+
+
+def _refit_block(x0, lower, upper, mode, sigma, seed, indices):
+    # Каждая копия: модель + перемешанные с возвращением остатки (или шум с оценённой сигмой),
+    # уточнение от базового решения с настройками (метод уточнения, сжатие цепочки) вызывающего.
+    # Генератор зависит только от (seed, номер копии), поэтому результат не зависит от числа процессов
+    t, model, resid = _shared['data']
+    core = _shared['core']
+    out = []
+    for k in indices:
+        rng = np.random.default_rng([seed, k])
+        if mode == 'residuals':
+            y = model + resid[rng.integers(0, len(resid), len(resid))]
+        else:
+            y = model + rng.normal(0.0, sigma, len(model))
+        # Параметры без пересортировки по T2: i-я компонента копии - продолжение i-й базовой
+        t_fit, y_fit, weights = core.reduce(t, y)
+        try:
+            out.append(MultiExpModel(t_fit, y_fit, weights).fit(x0, lower, upper, core.refine_method).x)
+        except Exception:
+            out.append(None)
+    return out
+
+
+def bootstrap(t, y, fit, n_resamples=200, mode='residuals', workers=None, seed=0, level=0.95,
+              progress=None, core=None):
+    # fit - результат core.fit для (t, y); уточнение в копиях стартует от него,
+    # границы параметров - по core, в воркерах - NMRCore с его настройками
+    if mode not in ('residuals', 'noise'):
+        raise ValueError(f"Неизвестный способ генерации копий: {mode}")
+    progress = progress or no_progress
+    results, _, diff_norm, _, _ = fit
+    if not results:
+        raise ValueError("Нет компонент для оценки интервалов")
+    core = core or NMRCore()
+    lower, upper = core.bounds(t, len(results))
+    x0 = np.clip(as_params(fit), lower, upper)
+    resid = np.asarray(diff_norm, dtype=float)
+    model = y / np.max(y) - resid
+    sigma = float(np.sqrt(np.sum(resid**2) / max(1, len(resid) - len(x0))))
+
+    workers = min(workers or os.cpu_count() or 1, n_resamples)
+    # Мелкие блоки - для равномерной загрузки, частого прогресса и быстрой отмены
+    n_chunks = max(1, min(n_resamples, max(MIN_CHUNKS, workers * CHUNKS_PER_WORKER)))
+    blocks = np.array_split(np.arange(n_resamples), n_chunks)
+    samples, done = [], 0
+    progress('bootstrap', 0)
+    if workers == 1:
+        _shared.update(data=np.array([t, model, resid]), core=core)
+        for block in blocks:
+            samples += _refit_block(x0, lower, upper, mode, sigma, seed, block)
+            done += len(block)
+            progress('bootstrap', done)
+    else:
+        shm = shared_memory.SharedMemory(create=True, size=3 * len(t) * 8)
+        try:
+            np.ndarray((3, len(t)), dtype=float, buffer=shm.buf)[:] = (t, model, resid)
+            # spawn: расчёт запускается из рабочего потока GUI, fork многопоточного процесса Qt
+            # может зависнуть на унаследованных блокировках
+            pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'),
+                                       initializer=_attach, initargs=(shm.name, (3, len(t)), core.settings()))
+            try:
+                futures = {pool.submit(_refit_block, x0, lower, upper, mode, sigma, seed, block): len(block)
+                           for block in blocks}
+                for fut in as_completed(futures):
+                    samples += fut.result()
+                    done += futures[fut]
+                    progress('bootstrap', done)
+            finally:
+                # При отмене (исключение из progress) оставшиеся блоки снимаются с очереди
+                pool.shutdown(cancel_futures=True)
+        finally:
+            shm.close()
+            shm.unlink()
+    return summarize(samples, len(results), level)
+
+
+def summarize(samples, n, level=0.95):
+    ok = np.array([x for x in samples if x is not None and len(x) == 2 * n + 1])
+    if not len(ok):
+        raise ValueError("Ни одна повторная подгонка не сошлась")
+    a, t2, off = ok[:, :n], ok[:, n:2 * n], ok[:, -1]
+    share = a / np.maximum(np.sum(a, axis=1, keepdims=True), 1e-300)
+    q = [50 * (1 - level), 50 * (1 + level)]
+    t2_ci, share_ci = np.percentile(t2, q, axis=0).T, np.percentile(share, q, axis=0).T
+    return {'level': level, 'n': len(ok), 'failed': len(samples) - len(ok),
+            'T2': t2, 'Share': share, 'offset': off,
+            'components': [{'T2': tuple(t2_ci[i]), 'Share': tuple(share_ci[i]),
+                            'T2_std': float(np.std(t2[:, i])), 'Share_std': float(np.std(share[:, i]))}
+                           for i in range(n)],
+            'offset_ci': tuple(np.percentile(off, q))}
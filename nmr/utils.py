@@ -0,0 +1,3 @@
+def no_progress(stage, value):
+    # Колбэк progress(stage, value) по умолчанию
+    pass
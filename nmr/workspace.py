@@ -0,0 +1,143 @@
+import os
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+
+from .core import as_params, components
+from .decimate import lttb_indices, minmax_indices
+from .io import load_curves, read_cache, sniff_format
+from .kernels import time_fingerprint
+from .model import multiexp
+from .utils import no_progress
+
+MAX_BYTES = 256 * 2**20
+
+
+# === Рабочая область: много наборов данных, массивы - по требованию ===
+class Dataset:
+    # Одна кривая файла. При добавлении известны только метаданные; результат расчёта
+    # хранится вектором параметров (кривые модели восстанавливаются при выборе),
+    # поэтому открытые сотни наборов почти не занимают памяти
+    def __init__(self, path, column=0, n_curves=1, n_points=None):
+        self.path, self.column = path, column
+        self.name = os.path.basename(path) + (f" [{column + 1}]" if n_curves > 1 else "")
+        self.n_curves, self.n_points = n_curves, n_points
+        self.params = None
+        self.dist = self.ci = None
+        # Ручной подбор (компоненты, смещение, амплитуда) и настройки осей графиков
+        self.manual = None
+        self.view = None
+
+    def set_fit(self, fit, dist=None):
+        self.params, self.dist, self.ci = as_params(fit), dist, None
+
+    def components(self):
+        return components(self.params) if self.params is not None else ([], 0.0, 1.0)
+
+
+class Workspace:
+    # Массивы загружаются при выборе набора и хранятся по файлам с вытеснением давно
+    # не использованных сверх max_bytes. Одинаковые оси времени - один общий массив
+    def __init__(self, max_bytes=MAX_BYTES):
+        self.datasets = []
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._arrays = OrderedDict()
+        self._axes = weakref.WeakValueDictionary()
+        self._lock = threading.RLock()
+
+    def add(self, path):
+        # Только метаданные: размеры из бинарного кэша (если есть) или число столбцов по первой строке данных
+        columns = read_cache(path)
+        if columns is not None:
+            n_curves, n_points = columns.shape[0] - 1, columns.shape[1]
+        else:
+            n_curves, n_points = sniff_format(path)['n_cols'] - 1, None
+        if n_curves < 1:
+            raise ValueError("Нужны минимум два столбца: время и амплитуда")
+        new = [Dataset(path, i, n_curves, n_points) for i in range(n_curves)]
+        self.datasets.extend(new)
+        return new
+
+    def remove(self, dataset):
+        self.datasets.remove(dataset)
+        if not any(d.path == dataset.path for d in self.datasets):
+            with self._lock:
+                self._arrays.pop(dataset.path, None)
+
+    def is_loaded(self, dataset):
+        with self._lock:
+            return dataset.path in self._arrays
+
+    def curve(self, dataset, progress=None):
+        t, Y = self.arrays(dataset.path, progress)
+        dataset.n_points = len(t)
+        return t, Y[dataset.column]
+
+    def arrays(self, path, progress=None):
+        with self._lock:
+            if path in self._arrays:
+                self._arrays.move_to_end(path)
+                return self._arrays[path]
+        mapped = read_cache(path) is not None
+        t, Y = load_curves(path, progress=progress)
+        if not mapped and read_cache(path) is not None:
+            # Текст разобран и записан в бинарный кэш: дальше - отображение кэша в память,
+            # страницы которого подгружает и вытесняет ОС, а разобранная копия освобождается
+            t, Y = load_curves(path)
+        t = self.shared_axis(t)
+        with self._lock:
+            self._arrays[path] = (t, Y)
+            self._shrink()
+        return t, Y
+
+    def shared_axis(self, t):
+        # Наборы с одинаковой осью времени получают один массив: память не дублируется,
+        # а кэши по оси (ядра NMRCore, прореживание графиков) срабатывают при переключении
+        with self._lock:
+            return self._axes.setdefault(time_fingerprint(t), t)
+
+    @property
+    def nbytes(self):
+        # Общая ось времени нескольких файлов считается один раз
+        with self._lock:
+            axes = {id(t): t.nbytes for t, _ in self._arrays.values()}
+            return sum(axes.values()) + sum(Y.nbytes for _, Y in self._arrays.values())
+
+    def stats(self):
+        with self._lock:
+            return {'datasets': len(self.datasets), 'loaded_files': len(self._arrays), 'nbytes': self.nbytes,
+                    'max_bytes': self.max_bytes, 'shared_axes': len(self._axes), 'evictions': self.evictions}
+
+    def _shrink(self):
+        # Последний загруженный файл остаётся всегда
+        while self.nbytes > self.max_bytes and len(self._arrays) > 1:
+            self._arrays.popitem(last=False)
+            self.evictions += 1
+
+
+def compare(workspace, datasets, core, max_components=4, fit_missing=True, n_px=600, progress=None):
+    # Данные для сравнения наборов (в рабочем потоке): прореженные нормированные кривые и модели.
+    # Недостающие расчёты - через core (готовые берутся из его хранилища результатов);
+    # новые параметры возвращаются, а не записываются в наборы - их применяет поток GUI
+    progress = progress or no_progress
+    rows = []
+    for k, ds in enumerate(datasets):
+        progress('compare', k)
+        t, y = workspace.curve(ds)
+        params, new = ds.params, False
+        if params is None and fit_missing:
+            params = as_params(core.fit(t, y, max_components, progress=lambda stage, value: progress('compare', k)))
+            new = True
+        y_norm = y / np.max(y)
+        idx = minmax_indices(t, y_norm, n_px, log_y=True)
+        row = {'dataset': ds, 'params': params, 'new': new, 'data': (t[idx], y_norm[idx]), 'model': None}
+        if params is not None and len(params):
+            model = multiexp(params, t)
+            idx = lttb_indices(t, model, n_px)
+            row['model'] = (t[idx], model[idx])
+        rows.append(row)
+    progress('compare', len(datasets))
+    return rows
@@ -0,0 +1,46 @@
+import numpy as np
+
+from nmr.decimate import lttb_indices, minmax_indices
+
+
+def noisy_decay(n=200000, seed=0):
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0.001, 2.0, n)
+    return x, np.exp(-x / 0.3) + 0.01 * rng.standard_normal(n)
+
+
+def test_minmax_keeps_bucket_extremes():
+    x, y = noisy_decay()
+    n_buckets = 500
+    idx = minmax_indices(x, y, n_buckets)
+    assert len(idx) <= 6 * n_buckets and np.all(np.diff(idx) > 0)
+    # Минимум и максимум каждого столбца пикселей должны попасть в выборку
+    bucket = np.minimum(((x - x[0]) / (x[-1] - x[0]) * n_buckets).astype(np.int64), n_buckets - 1)
+    kept = np.zeros(len(x), dtype=bool)
+    kept[idx] = True
+    for b in (0, 137, n_buckets - 1):
+        part = np.flatnonzero(bucket == b)
+        assert kept[part[np.argmin(y[part])]] and kept[part[np.argmax(y[part])]]
+    assert y[idx].min() == y.min() and y[idx].max() == y.max()
+
+
+def test_minmax_range_and_log_axis():
+    x, y = noisy_decay()
+    idx = minmax_indices(x, y, 100, x_range=(0.5, 1.0), log_y=True)
+    assert np.all(y[idx] > 0)
+    assert x[idx[0]] >= x[np.searchsorted(x, 0.5) - 1] and x[idx[-1]] <= x[np.searchsorted(x, 1.0, 'right')]
+    # Короткие ряды и неупорядоченная ось не прореживаются
+    np.testing.assert_array_equal(minmax_indices(x[:100], y[:100], 100), np.arange(100))
+    np.testing.assert_array_equal(minmax_indices(x[::-1], y, 10), np.arange(len(x)))
+
+
+def test_lttb_shape():
+    x = np.linspace(0, 1, 10001)
+    y = np.where(np.abs(x - 0.5) < 1e-9, 1.0, 0.0)
+    idx = lttb_indices(x, y, 50)
+    assert len(idx) == 50 and idx[0] == 0 and idx[-1] == len(x) - 1
+    assert np.all(np.diff(idx) > 0)
+    # Одиночный выброс - вершина наибольшего треугольника
+    assert 5000 in idx
+    idx = lttb_indices(x, y, 50, x_range=(0.2, 0.4))
+    assert len(idx) == 50 and x[idx[0]] < 0.2 <= x[idx[1]] and x[idx[-1]] > 0.4
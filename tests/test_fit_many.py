@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+from scipy.optimize import least_squares
+
+from nmr import model
+from nmr.core import NMRCore
+from nmr.model import MultiExpModel, least_squares_batch
+from nmr.synthetic import synthetic_cpmg
+
+
+def curve_batch(n_curves=6, n_points=2000):
+    # Общая ось времени, разные доли и шум у каждой кривой
+    Y = []
+    for i in range(n_curves):
+        t, y = synthetic_cpmg(n_points=n_points, shares=(0.2 + 0.05 * i, 0.5, 0.3 - 0.03 * i), noise=0.003,
+                              seed=i)
+        Y.append(y)
+    return t, np.array(Y)
+
+
+def t2_shares(results):
+    return [r['T2'] for r in results], [r['Share'] for r in results]
+
+
+@pytest.mark.parametrize('refine_method', ['full', 'varpro'])
+def test_fit_many_matches_per_curve_fit(refine_method):
+    t, Y = curve_batch()
+    core = NMRCore(refine_method=refine_method)
+    batch = core.fit_many(t, Y, 3)
+    for y, fit in zip(Y, batch):
+        ref = NMRCore(refine_method=refine_method).fit(t, y, 3)
+        assert len(fit[0]) == len(ref[0])
+        t2, shares = t2_shares(fit[0])
+        t2_ref, shares_ref = t2_shares(ref[0])
+        assert t2 == pytest.approx(t2_ref, rel=1e-4)
+        assert shares == pytest.approx(shares_ref, abs=1e-4)
+        np.testing.assert_allclose(fit[2], ref[2], atol=1e-4)
+
+
+def test_fit_many_rejects_wrong_length():
+    t, Y = curve_batch(2)
+    with pytest.raises(ValueError):
+        NMRCore().fit_many(t[:-1], Y, 2)
+
+
+def test_batch_lm_matches_least_squares():
+    t, Y = curve_batch(4, 500)
+    Y = Y / Y.max(axis=1, keepdims=True)
+    core = NMRCore()
+    lower, upper = core.bounds(t, 2)
+    X0 = np.array([[0.5, 0.5, 0.02, 0.3, 0.0]] * len(Y))
+    X, n_iter = least_squares_batch(t, Y, X0, lower, upper)
+    assert np.all(n_iter > 0) and np.all(n_iter < 200)
+    for y, x in zip(Y, X):
+        m = MultiExpModel(t, y)
+        ref = least_squares(m.residuals, X0[0], jac=m.jacobian, bounds=(lower, upper),
+                            ftol=1e-10, xtol=1e-10, gtol=1e-10)
+        assert np.sum(m.residuals(x)**2) == pytest.approx(np.sum(ref.fun**2), rel=1e-6)
+        np.testing.assert_allclose(np.sort(x[2:4]), np.sort(ref.x[2:4]), rtol=1e-4)
+
+
+def test_batch_lm_does_not_depend_on_block_split(monkeypatch):
+    t, Y = curve_batch(5, 500)
+    Y = Y / Y.max(axis=1, keepdims=True)
+    lower, upper = NMRCore().bounds(t, 2)
+    X0 = np.array([[0.5, 0.5, 0.02, 0.3, 0.0]] * len(Y))
+    weights = np.linspace(1.0, 2.0, len(t))
+    whole, _ = least_squares_batch(t, Y, X0, lower, upper, weights)
+    # По одной кривой в блоке
+    monkeypatch.setattr(model, 'BATCH_ELEMENTS', len(t) * X0.shape[1])
+    split, _ = least_squares_batch(t, Y, X0, lower, upper, weights)
+    np.testing.assert_array_equal(whole, split)
+
+
+def test_batch_lm_respects_bounds():
+    # Длинная компонента упирается в верхнюю границу T2
+    t, y = synthetic_cpmg(n_points=1000, t2=(0.05, 20.0), shares=(0.5, 0.5), noise=0.0)
+    lower, upper = NMRCore().bounds(t, 2)
+    X, _ = least_squares_batch(t, (y / y.max())[np.newaxis], [[0.5, 0.5, 0.05, 1.0, 0.0]], lower, upper)
+    assert np.all(X >= lower) and np.all(X <= upper)
+    assert X[0, 3] == pytest.approx(upper[3])
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+from scipy.optimize import nnls
+
+from nmr.inversion2d import invert_2d, solve_kron_nonneg
+from nmr.synthetic import synthetic_2d
+
+PEAKS = ((0.05, 0.02, 0.4), (0.5, 0.2, 0.6))
+
+
+def peak_positions(res):
+    # Положения (X1, T2) двух наибольших локальных максимумов F
+    F = res['F']
+    pad = np.pad(F, 1)
+    is_max = np.ones_like(F, dtype=bool)
+    for di in (-1, 0, 1):
+        for dj in (-1, 0, 1):
+            if di or dj:
+                is_max &= F >= pad[1 + di:1 + di + F.shape[0], 1 + dj:1 + dj + F.shape[1]]
+    idx = np.argwhere(is_max & (F > 0))
+    top = idx[np.argsort(-F[tuple(idx.T)])[:2]]
+    return sorted((res['grid1'][i], res['grid2'][j]) for i, j in top)
+
+
+def test_t1_t2_peaks_are_recovered():
+    axis1, t, M = synthetic_2d(n1=32, n2=2000, peaks=PEAKS, noise=0.002, seed=0)
+    res = invert_2d(axis1, t, M, size=(30, 40))
+    assert np.all(res['F'] >= 0)
+    assert res['rms'] < 3 * 0.002 * 1000
+    for (x1, t2), (x1_true, t2_true, _) in zip(peak_positions(res), PEAKS):
+        assert abs(np.log(x1 / x1_true)) < np.log(1.6)
+        assert abs(np.log(t2 / t2_true)) < np.log(1.6)
+
+
+def test_fista_matches_dense_nnls():
+    rng = np.random.default_rng(0)
+    A1, A2 = rng.uniform(0, 1, (4, 3)), rng.uniform(0, 1, (5, 4))
+    D = A1 @ rng.uniform(0, 1, (3, 4)) @ A2.T + rng.normal(0, 0.05, (4, 5))
+    alpha = 0.1
+    F, n_iter = solve_kron_nonneg(A1, A2, D, alpha, max_iter=50000, tol=1e-12)
+    # Та же задача явно: [A1 x A2; alpha I] vec(F) ~ [vec(D); 0], vec - по строкам
+    A = np.vstack([np.kron(A1, A2), alpha * np.eye(12)])
+    ref = nnls(A, np.r_[D.ravel(), np.zeros(12)])[0]
+    np.testing.assert_allclose(F.ravel(), ref, atol=1e-6)
+    assert n_iter < 50000
+
+
+def test_shape_mismatch_raises():
+    with pytest.raises(ValueError):
+        invert_2d(np.ones(3), np.ones(4), np.ones((4, 3)))
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from nmr import io as nmr_io
+from nmr.io import load_curves, sniff_line
+
+
+@pytest.mark.parametrize('line, delimiter, decimal_comma, n_cols', [
+    ('0.001, 1.23', ',', False, 2),
+    ('0.001 ,1.23', ',', False, 2),
+    ('0.001,\t1.23, 4.5', ',', False, 3),
+    ('0.001,1.23', ',', False, 2),
+    ('0,001 1,23', None, True, 2),
+    ('0.001\t1.23', None, False, 2),
+    ('0,001;1,23', ';', True, 2),
+])
+def test_sniff_line_delimiter(line, delimiter, decimal_comma, n_cols):
+    assert sniff_line(line) == {'delimiter': delimiter, 'decimal_comma': decimal_comma, 'n_cols': n_cols}
+
+
+def test_load_comma_space_csv(tmp_path):
+    t = np.linspace(1e-3, 1.0, 50)
+    y = 1000 * np.exp(-t / 0.1)
+    path = tmp_path / 'curve.txt'
+    path.write_text('time, amplitude\n' + ''.join(f'{a:.6g}, {b:.6g}\n' for a, b in zip(t, y)))
+    t_read, Y = load_curves(str(path))
+    assert len(t_read) == len(t)
+    np.testing.assert_allclose(t_read, t, rtol=1e-5)
+    np.testing.assert_allclose(Y[0], y, rtol=1e-5)
+
+
+@pytest.mark.parametrize('decimal_comma', [False, True])
+def test_chunked_read_matches_data(tmp_path, monkeypatch, decimal_comma):
+    # Блоки по 1 КБ: строки разрезаются на границах блоков и склеиваются с хвостом
+    monkeypatch.setattr(nmr_io, 'CHUNK_BYTES', 1024)
+    t = np.linspace(1e-3, 1.0, 500)
+    y = 1000 * np.exp(-t / 0.1)
+    lines = [f'{a:.6g}\t{b:.6g}' for a, b in zip(t, y)]
+    if decimal_comma:
+        lines = [line.replace('.', ',').replace('\t', ';') for line in lines]
+    path = tmp_path / 'curve.txt'
+    path.write_text('# header\n' + '\n'.join(lines) + '\n')
+    stages = []
+    data = nmr_io.read_text(str(path), progress=lambda stage, value: stages.append(value))
+    np.testing.assert_allclose(data, np.column_stack([t, y]), rtol=1e-5)
+    assert len(stages) > 5 and stages[-1] == 100
+
+
+@pytest.mark.parametrize('decimal_comma', [False, True])
+@pytest.mark.parametrize('bad_line', ['0.5\t1.2e', '0.5\t1.2\t3.4', '0.5'])
+def test_damaged_file_raises(tmp_path, decimal_comma, bad_line):
+    # Раньше блок с десятичной запятой обрывался на первом нечисловом токене без ошибки
+    lines = [f'{i * 1e-3:.6g}\t{1000 - i}' for i in range(100)]
+    lines[60] = bad_line
+    if decimal_comma:
+        lines = [line.replace('.', ',').replace('\t', ';') for line in lines]
+    path = tmp_path / 'curve.txt'
+    path.write_text('\n'.join(lines) + '\n')
+    with pytest.raises(ValueError):
+        load_curves(str(path), use_cache=False)
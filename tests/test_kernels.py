@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from nmr.core import NMRCore
+from nmr.kernels import KernelCache, build_kernel, gram_rows
+from nmr.synthetic import synthetic_cpmg
+
+
+def test_hits_and_lru_eviction():
+    t = np.linspace(0.001, 1.0, 1000)
+    grids = [np.geomspace(1e-3, 10 ** k, 100) for k in range(3)]
+    # Места - на две записи (ядро и K^T K), третья вытесняет самую давнюю
+    cache = KernelCache(max_bytes=2 * KernelCache().get(t, grids[0]).nbytes)
+    first = cache.get(t, grids[0])
+    np.testing.assert_array_equal(first.K, build_kernel(t, grids[0]))
+    assert cache.get(t, grids[0]) is first
+    cache.get(t, grids[1])
+    cache.get(t, grids[0])
+    cache.get(t, grids[2])
+    assert cache.stats()['entries'] == 2 and cache.evictions == 1
+    assert cache.get(t, grids[0]) is first
+    assert (cache.hits, cache.misses) == (3, 3)
+    cache.get(t, grids[1])
+    assert cache.misses == 4
+
+
+@pytest.mark.parametrize('weighted', [False, True])
+def test_gram_of_long_curve_is_cached(weighted):
+    t, y = synthetic_cpmg(n_points=5000, seed=0)
+    t2_grid = NMRCore().t2_grid(t)
+    weights = np.linspace(1.0, 3.0, len(t)) if weighted else None
+    cache = KernelCache()
+    G_ref, b_ref = gram_rows(t, y, t2_grid, 1000, weights)
+    G, b = cache.gram(t, t2_grid, y, 1000, weights)
+    G2, b2 = cache.gram(t, t2_grid, 2 * y, 1000, weights)
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert G2 is G
+    np.testing.assert_allclose(G, G_ref, rtol=1e-12)
+    np.testing.assert_allclose(b2, 2 * b_ref, rtol=1e-12)
+    # Другие веса - другая запись
+    cache.gram(t, t2_grid, y, 1000, np.ones(len(t)))
+    assert cache.misses == 2
+
+
+def test_repeated_long_fit_hits_cache():
+    t, y = synthetic_cpmg(n_points=3000, seed=0)
+    core = NMRCore(chunk_rows=1000)
+    first, second = {}, {}
+    res2 = core.fit(t, y, 2, diagnostics=first)[0]
+    res3 = core.fit(t, y, 3, diagnostics=second)[0]
+    assert not first['kernel_cached'] and second['kernel_cached']
+    ref = NMRCore().fit(t, y, 3)[0]
+    assert [r['T2'] for r in res3] == pytest.approx([r['T2'] for r in ref], rel=1e-6)
+    assert len(res2) == 2
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from nmr.core import NMRCore
+from nmr.model import MultiExpModel, multiexp
+from nmr.synthetic import synthetic_cpmg
+
+
+@pytest.mark.parametrize('weighted', [False, True])
+def test_jacobian_matches_finite_differences(weighted):
+    t = np.linspace(1e-3, 2.0, 400)
+    weights = np.linspace(1.0, 5.0, len(t)) if weighted else None
+    m = MultiExpModel(t, np.zeros(len(t)), weights)
+    p = np.array([0.3, 0.7, 0.05, 0.4, 0.01])
+    J = m.jacobian(p)
+    h = 1e-7 * np.maximum(np.abs(p), 1e-3)
+    J_num = np.column_stack([(m.residuals(p + dp) - m.residuals(p - dp)) / (2 * dp[i])
+                             for i, dp in enumerate(np.diag(h))])
+    np.testing.assert_allclose(J, J_num, rtol=1e-5, atol=1e-8)
+
+
+def test_evaluate_matches_multiexp():
+    t = np.linspace(1e-3, 1.0, 100)
+    p = np.array([0.2, 0.8, 0.01, 0.3, 0.05])
+    np.testing.assert_allclose(MultiExpModel(t, t).evaluate(p), multiexp(p, t))
+
+
+@pytest.mark.parametrize('method', ['full', 'varpro'])
+def test_refine_recovers_noiseless_parameters(method):
+    t, y = synthetic_cpmg(n_points=1000, t2=(0.02, 0.3), shares=(0.4, 0.6), noise=0.0, offset=0.01)
+    y_max = y.max()
+    lower, upper = NMRCore().bounds(t, 2)
+    res = MultiExpModel(t, y / y_max).fit([0.3, 0.5, 0.01, 0.5, 0.0], lower, upper, method)
+    a, t2, off = res.x[:2], res.x[2:4], res.x[-1]
+    assert t2 == pytest.approx([0.02, 0.3], rel=1e-6)
+    assert a / a.sum() == pytest.approx([0.4, 0.6], rel=1e-6)
+    assert off * y_max == pytest.approx(1000 * 0.01, rel=1e-6)
+    assert np.max(np.abs(res.fun)) < 1e-8
+
+
+def test_varpro_matches_full_refinement():
+    t, y = synthetic_cpmg(n_points=2000, noise=0.005, seed=3)
+    full = NMRCore(refine_method='full').fit(t, y, 3)
+    varpro = NMRCore(refine_method='varpro').fit(t, y, 3)
+    assert [r['T2'] for r in varpro[0]] == pytest.approx([r['T2'] for r in full[0]], rel=1e-4)
+    assert [r['Share'] for r in varpro[0]] == pytest.approx([r['Share'] for r in full[0]], abs=1e-4)
+
+
+def test_unknown_refine_method():
+    t = np.linspace(1e-3, 1.0, 50)
+    with pytest.raises(ValueError):
+        MultiExpModel(t, np.exp(-t)).fit([1.0, 0.5, 0.0], [0, 0, -1], [2, 2, 1], 'newton')
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from scipy.optimize import nnls
+
+from nmr.core import NMRCore
+from nmr.kernels import build_kernel
+from nmr.nnls import nnls_gram
+from nmr.synthetic import synthetic_cpmg
+
+
+def gram_problem():
+    t, y = synthetic_cpmg(n_points=2000, seed=0)
+    y = y / np.max(y)
+    K = build_kernel(t, NMRCore().t2_grid(t))
+    return K, y, K.T @ K, K.T @ y
+
+
+def test_cold_matches_scipy():
+    K, y, G, b = gram_problem()
+    x, rnorm, P, info = nnls_gram(G, b, y @ y)
+    x_ref, rnorm_ref = nnls(K, y)
+    assert info['nnls_solver'] == 'fnnls' and not info['nnls_warm']
+    assert rnorm == pytest.approx(rnorm_ref, rel=1e-6)
+    np.testing.assert_array_equal(P, x > 0)
+
+
+def test_warm_start_reuses_passive_set():
+    K, y, G, b = gram_problem()
+    x, rnorm, P, _ = nnls_gram(G, b, y @ y)
+    x_warm, rnorm_warm, _, info = nnls_gram(G, b, y @ y, P)
+    assert info['nnls_solver'] == 'fnnls' and info['nnls_warm']
+    assert info['nnls_iter'] == 0
+    assert rnorm_warm == pytest.approx(rnorm, rel=1e-9)
+
+
+def test_ill_conditioned_warm_start_retries_cold():
+    # Все столбцы сетки в пассивном множестве: подсистема плохо обусловлена, тёплый старт
+    # не проходит, но решение с нуля - без запасного scipy
+    K, y, G, b = gram_problem()
+    x, rnorm, _, info = nnls_gram(G, b, y @ y, np.ones(len(b), dtype=bool))
+    assert info['nnls_solver'] == 'fnnls'
+    assert not info['nnls_warm']
+    assert rnorm == pytest.approx(nnls(K, y)[1], rel=1e-6)
+
+
+def test_zero_columns_get_zero_amplitude():
+    # Ось начинается много позже самых коротких T2 сетки: их столбцы ядра уходят в 0,
+    # диагональ G нулевая - без исключения таких столбцов решение было NaN
+    t = np.linspace(1.0, 3.0, 2000)
+    y = 0.5 * np.exp(-t / 0.3) + 0.5 * np.exp(-t / 1.5)
+    K = build_kernel(t, NMRCore().t2_grid(t))
+    G, b = K.T @ K, K.T @ y
+    assert np.any(np.diag(G) == 0)
+    x, rnorm, P, info = nnls_gram(G, b, y @ y)
+    assert info['nnls_solver'] == 'fnnls'
+    assert np.all(np.isfinite(x)) and np.all(x[np.diag(G) == 0] == 0)
+    assert rnorm == pytest.approx(nnls(K, y)[1], abs=1e-6)
+    results = NMRCore().fit(t, 1000 * y, 4)[0]
+    assert [r['T2'] for r in results] == pytest.approx([0.3, 1.5], rel=1e-6)
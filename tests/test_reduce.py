@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from nmr.core import NMRCore
+from nmr.reduce import reduce_train
+from nmr.synthetic import synthetic_cpmg
+
+
+def long_component_curve():
+    # T2 = 10 с при записи 2 с: длинная компонента упирается в верхнюю границу T2 (2 * t[-1])
+    return synthetic_cpmg(n_points=20000, t2=(0.01, 0.1, 10.0), shares=(0.3, 0.3, 0.4), noise=0.001, seed=0)
+
+
+@pytest.mark.parametrize('grid', ['fixed', 'adaptive'])
+@pytest.mark.parametrize('ratio', [1.02, 1.1])
+def test_reduced_fit_keeps_full_t2_bounds(grid, ratio):
+    t, y = long_component_curve()
+    full = NMRCore(grid=grid).fit(t, y, 4)[0]
+    reduced = NMRCore(grid=grid, reduce_ratio=ratio).fit(t, y, 4)[0]
+    assert full[-1]['T2'] == pytest.approx(2 * t[-1])
+    assert reduced[-1]['T2'] == pytest.approx(full[-1]['T2'])
+    assert reduced[0]['T2'] == pytest.approx(full[0]['T2'], rel=1e-3)
+
+
+def test_reduced_fit_many_keeps_full_t2_bounds():
+    t, y = long_component_curve()
+    Y = np.vstack([y, y * 1.5])
+    for fit in NMRCore(reduce_ratio=1.1).fit_many(t, Y, 4):
+        assert fit[0][-1]['T2'] == pytest.approx(2 * t[-1])
+
+
+def test_reduce_train_weights_are_echo_counts():
+    t, y = long_component_curve()
+    t_mean, y_mean, counts = reduce_train(t, y, 1.02)
+    assert counts.sum() == len(t)
+    assert counts[0] == 1
+    assert np.sum(counts * y_mean) == pytest.approx(np.sum(y))
+    assert np.all(np.diff(t_mean) > 0)
+
+
+def test_reduced_fit_orders_keeps_full_t2_bounds():
+    t, y = long_component_curve()
+    orders = NMRCore(reduce_ratio=1.1).fit_orders(t, y, 4)
+    assert orders['candidates']
+    for row in orders['candidates']:
+        assert max(r['T2'] for r in row['fit'][0]) <= 2 * t[-1] * (1 + 1e-9)
+    best = next(r for r in orders['candidates'] if r['n_components'] == orders['best'])
+    assert best['fit'][0][-1]['T2'] == pytest.approx(2 * t[-1])
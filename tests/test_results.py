@@ -0,0 +1,38 @@
+import numpy as np
+
+from nmr.results import ResultStore
+
+
+def stored_size(store):
+    return store._db.execute('SELECT COALESCE(SUM(size), 0) FROM results').fetchone()[0]
+
+
+def test_running_size_matches_table(tmp_path):
+    store = ResultStore(str(tmp_path / 'results.sqlite'), max_bytes=10**9)
+    for i in range(20):
+        store.put(f'k{i}', np.arange(i, dtype=float))
+    # Перезапись ключа другим размером и удаление
+    store.put('k3', np.zeros(100))
+    store._db.execute("DELETE FROM results WHERE key = 'k5'")
+    nbytes = store.nbytes
+    assert nbytes == stored_size(store)
+    store.close()
+    assert ResultStore(str(tmp_path / 'results.sqlite')).nbytes == nbytes
+
+
+def test_eviction_keeps_size_under_limit(tmp_path):
+    store = ResultStore(str(tmp_path / 'results.sqlite'), max_bytes=20000)
+    for i in range(200):
+        store.put(f'k{i}', np.zeros(50))
+    assert store.nbytes == stored_size(store) <= 20000
+    assert store.evictions > 0
+    # Вытесняются давно не использованные: последние записи на месте
+    assert store.get('k199') is not None and store.get('k0') is None
+
+
+def test_other_version_dropped_on_open(tmp_path):
+    path = str(tmp_path / 'results.sqlite')
+    ResultStore(path, version=1).put('old', np.ones(10))
+    store = ResultStore(path, version=2)
+    assert store.get('old') is None
+    assert store.nbytes == 0
@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from nmr.core import NMRCore
+from nmr.selection import best_order, fit_orders
+from nmr.synthetic import synthetic_cpmg
+
+
+@pytest.fixture(scope='module')
+def orders():
+    t, y = synthetic_cpmg(n_points=4000, t2=(0.02, 0.4), shares=(0.4, 0.6), noise=0.002, seed=3)
+    return t, y, fit_orders(t, y, 4, core=NMRCore(), workers=2)
+
+
+def test_true_order_is_selected(orders):
+    t, y, out = orders
+    assert out['best'] == 2 and out['criterion'] == 'bic'
+    candidates = out['candidates']
+    assert [r['n_components'] for r in candidates] == list(range(1, len(candidates) + 1))
+    assert candidates[1]['d_bic'] == 0.0
+    assert candidates[1]['rss'] < candidates[0]['rss']
+    assert best_order(candidates, 'aic') == 2
+    assert best_order(candidates, 'f') == 2
+    # Кандидат k - то же, что обычный расчёт с k компонентами
+    ref = NMRCore(grid='fixed').fit(t, y, 2)
+    assert sorted(r['T2'] for r in candidates[1]['fit'][0]) == pytest.approx(sorted(r['T2'] for r in ref[0]),
+                                                                           rel=1e-6)
+    assert sorted(r['T2'] for r in ref[0]) == pytest.approx([0.02, 0.4], rel=0.05)
+
+
+def test_unknown_criterion():
+    t, y = synthetic_cpmg(n_points=500)
+    with pytest.raises(ValueError):
+        fit_orders(t, y, criterion='mdl')
+    assert best_order([]) is None
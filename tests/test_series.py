@@ -0,0 +1,53 @@
+import csv
+
+import numpy as np
+import pytest
+
+from nmr.core import NMRCore
+from nmr.series import fit_series, track_components, write_tracks
+from nmr.synthetic import synthetic_cpmg
+
+
+def drifting_series(n=6, second_from=None):
+    # T2 медленно растут; с кривой second_from появляется вторая, длинная компонента
+    Y = []
+    for i in range(n):
+        t2, shares = (0.02 * 1.05**i, 0.25 * 1.05**i), (0.5, 0.5)
+        if second_from is not None:
+            t2, shares = ((0.05 * 1.05**i, 1.5), (0.7, 0.3)) if i >= second_from else ((0.05 * 1.05**i,), (1.0,))
+        t, y = synthetic_cpmg(n_points=2000, t2=t2, shares=shares, noise=0.002, seed=i)
+        Y.append(y)
+    return t, np.array(Y)
+
+
+def test_warm_series_matches_independent_fits():
+    t, Y = drifting_series()
+    series = fit_series(t, Y, 2)
+    assert [item['warm'] for item in series] == [False] + [True] * 5
+    assert all(item['tracks'] == [0, 1] for item in series)
+    for item, y in zip(series, Y):
+        ref = NMRCore().fit(t, y, 2)[0]
+        assert [r['T2'] for r in item['results']] == pytest.approx([r['T2'] for r in ref], rel=1e-4)
+
+
+def test_new_component_starts_full_search_and_track():
+    t, Y = drifting_series(second_from=3)
+    series = fit_series(t, Y, 2)
+    assert [item['warm'] for item in series] == [False, True, True, False, True, True]
+    assert [len(item['results']) for item in series] == [1, 1, 1, 2, 2, 2]
+    assert series[3]['tracks'] == [0, 1]
+    assert series[-1]['results'][1]['T2'] == pytest.approx(1.5, rel=0.05)
+
+
+def test_tracks_survive_a_missing_component(tmp_path):
+    series = [{'index': i, 'warm': False, 'rms': 0.0, 'offset_norm': 0.0, 'amplitude': 1.0,
+               'results': [{'T2': t2, 'Share': 1 / len(t2s)} for t2 in t2s]}
+              for i, t2s in enumerate([(0.01, 0.1), (0.011,), (0.012, 0.11), (0.012, 0.11, 5.0)])]
+    assert track_components(series) == 3
+    assert [item['tracks'] for item in series] == [[0, 1], [0], [0, 1], [0, 1, 2]]
+    path = tmp_path / 'tracks.csv'
+    write_tracks(str(path), series, labels=['a', 'b', 'c', 'd'])
+    with open(path, newline='', encoding='utf-8') as fh:
+        rows = list(csv.DictReader(fh))
+    assert rows[1]['label'] == 'b' and rows[1]['T2_2'] == ''
+    assert float(rows[3]['T2_3']) == 5.0
@@ -0,0 +1,83 @@
+import http.client
+import json
+import threading
+from http.server import ThreadingHTTPServer
+
+import numpy as np
+import pytest
+
+from nmr.core import NMRCore
+from nmr.service import MAX_BODY, FitHandler, FitService
+from nmr.synthetic import synthetic_cpmg
+
+
+def start(**kwargs):
+    service = FitService(**kwargs)
+    handler = type('Handler', (FitHandler,), {'service': service})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return service, server
+
+
+@pytest.fixture(scope='module')
+def server():
+    service, server = start(workers=1)
+    yield server
+    server.shutdown()
+    server.server_close()
+    service.close()
+
+
+def request(server, method, path, body=None, headers=None):
+    conn = http.client.HTTPConnection('127.0.0.1', server.server_address[1], timeout=60)
+    try:
+        conn.request(method, path, body=body, headers=headers or {})
+        response = conn.getresponse()
+        return response.status, json.loads(response.read()), response
+    finally:
+        conn.close()
+
+
+def test_fit_matches_core(server):
+    assert request(server, 'GET', '/health')[:2] == (200, {'status': 'ok'})
+    t, y = synthetic_cpmg(n_points=3000, seed=5)
+    status, reply, _ = request(server, 'POST', '/fit', json.dumps({'t': t.tolist(), 'y': y.tolist(),
+                                                                   'max_components': 3}))
+    assert status == 200 and reply['batch_size'] == 1
+    ref = NMRCore().fit_many(t, y[np.newaxis], 3)[0][0]
+    assert [c['T2'] for c in reply['components']] == pytest.approx([r['T2'] for r in ref], rel=1e-6)
+    assert request(server, 'GET', '/metrics')[1]['completed'] >= 1
+
+
+@pytest.mark.parametrize('body', [b'not json', b'{"t": [1, 2], "y": [1, 2]}', b'{"y": [1, 2, 3]}',
+                                  json.dumps({'t': list(range(10)), 'y': [-1.0] * 10}).encode()])
+def test_bad_request(server, body):
+    status, reply, _ = request(server, 'POST', '/fit', body)
+    assert status == 400 and reply['error']
+
+
+def test_oversized_body_is_rejected_before_reading(server):
+    conn = http.client.HTTPConnection('127.0.0.1', server.server_address[1], timeout=10)
+    try:
+        conn.putrequest('POST', '/fit')
+        conn.putheader('Content-Length', str(MAX_BODY + 1))
+        conn.endheaders()
+        response = conn.getresponse()
+        assert response.status == 413
+    finally:
+        conn.close()
+
+
+def test_full_queue_returns_503():
+    service, server = start(workers=1, max_queue=0)
+    try:
+        t = np.linspace(1e-3, 1.0, 64)
+        status, reply, response = request(server, 'POST', '/fit', json.dumps({'t': t.tolist(),
+                                                                              'y': np.exp(-t).tolist()}))
+        assert status == 503 and response.getheader('Retry-After') == '1'
+        assert service.stats()['rejected'] == 1
+    finally:
+        server.shutdown()
+        server.server_close()
+        service.close()
@@ -0,0 +1,52 @@
+import io
+
+import numpy as np
+import pytest
+
+from nmr.core import NMRCore
+from nmr.streaming import StreamingFit, read_stream, run_stream
+from nmr.synthetic import synthetic_cpmg
+
+
+def stream_curve():
+    return synthetic_cpmg(n_points=4000, t2=(0.02, 0.3), shares=(0.4, 0.6), noise=0.002, seed=0)
+
+
+def test_chunking_does_not_change_solution():
+    t, y = stream_curve()
+    whole, parts = StreamingFit(2), StreamingFit(2)
+    whole.add(t, y)
+    # Первая порция из одной точки откладывается до второй
+    for idx in np.array_split(np.arange(len(t)), [1, 10, 500, 1700]):
+        parts.add(t[idx], y[idx])
+    np.testing.assert_allclose(parts.G, whole.G, rtol=1e-12)
+    np.testing.assert_allclose(parts.b, whole.b, rtol=1e-12)
+    assert parts.n_points == whole.n_points == len(t)
+    r_whole, r_parts = whole.solve()[0], parts.solve()[0]
+    assert [r['T2'] for r in r_parts] == pytest.approx([r['T2'] for r in r_whole], rel=1e-9)
+
+
+def test_final_solution_matches_batch_fit():
+    t, y = stream_curve()
+    sf = StreamingFit(2)
+    for idx in np.array_split(np.arange(len(t)), 20):
+        sf.add(t[idx], y[idx])
+        sf.solve()
+    ref = NMRCore().fit(t, y, 2)[0]
+    # Уточнение идёт по средним в интервалах (bin_ratio 1.02), а не по всем эхо
+    assert [r['T2'] for r in sf.results] == pytest.approx([r['T2'] for r in ref], rel=2e-3)
+    assert [r['Share'] for r in sf.results] == pytest.approx([r['Share'] for r in ref], abs=2e-3)
+    model = sf.evaluate(t) * sf.y_max
+    assert np.sqrt(np.mean((model - y)**2)) < 3 * 0.002 * 1000
+
+
+def test_read_stream_scales_microseconds():
+    t, y = stream_curve()
+    text = 'time_us amplitude\n' + ''.join(f'{a * 1e6:.3f}\t{b:.6g}\n' for a, b in zip(t, y))
+    chunks = list(read_stream(io.BytesIO(text.encode()), chunk_lines=1000))
+    assert len(chunks) == 5
+    updates = []
+    sf = run_stream(iter(chunks), StreamingFit(2), min_interval=0.0, on_update=lambda s: updates.append(s.n_points))
+    assert sf.time_scale == 1e-6
+    assert updates[-1] == len(t)
+    assert [r['T2'] for r in sf.results] == pytest.approx([0.02, 0.3], rel=2e-2)
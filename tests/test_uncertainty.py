@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from nmr.core import NMRCore
+from nmr.synthetic import synthetic_cpmg
+from nmr.uncertainty import bootstrap, summarize
+
+T2 = (0.02, 0.3)
+
+
+def noisy_curve(noise=0.01, seed=0):
+    return synthetic_cpmg(n_points=2000, t2=T2, shares=(0.4, 0.6), noise=noise, seed=seed)
+
+
+def test_intervals_cover_truth_and_shrink_with_noise():
+    widths = []
+    for noise in (0.02, 0.005):
+        t, y = noisy_curve(noise)
+        ci = bootstrap(t, y, NMRCore().fit(t, y, 2), 60, workers=1)
+        assert ci['n'] == 60 and ci['failed'] == 0
+        for comp, t2 in zip(ci['components'], T2):
+            lo, hi = comp['T2']
+            assert lo < hi
+            # Истинное значение - в пределах интервала, расширенного на его ширину
+            assert lo - (hi - lo) < t2 < hi + (hi - lo)
+        widths.append(ci['components'][0]['T2'][1] - ci['components'][0]['T2'][0])
+    assert widths[1] < widths[0] / 2
+
+
+def test_result_does_not_depend_on_workers():
+    t, y = noisy_curve()
+    fit = NMRCore().fit(t, y, 2)
+    one = bootstrap(t, y, fit, 24, workers=1, seed=5)
+    two = bootstrap(t, y, fit, 24, workers=2, seed=5)
+    np.testing.assert_array_equal(np.sort(one['T2'], axis=0), np.sort(two['T2'], axis=0))
+
+
+def test_core_settings_are_used():
+    t, y = noisy_curve()
+    core = NMRCore(refine_method='varpro', reduce_ratio=1.02)
+    ci = bootstrap(t, y, core.fit(t, y, 2), 30, workers=1, mode='noise', core=core)
+    ref = bootstrap(t, y, NMRCore().fit(t, y, 2), 30, workers=1, mode='noise')
+    for comp, comp_ref in zip(ci['components'], ref['components']):
+        assert comp['T2'] == pytest.approx(comp_ref['T2'], rel=0.05)
+
+
+def test_summarize_percentiles_and_failures():
+    rng = np.random.default_rng(0)
+    samples = [np.array([1.0, 3.0, 0.1, t2, 0.0]) for t2 in rng.uniform(1.0, 2.0, 1000)]
+    ci = summarize(samples + [None, np.zeros(3)], 2, level=0.9)
+    assert ci['n'] == 1000 and ci['failed'] == 2
+    assert ci['components'][0]['Share'] == pytest.approx((0.25, 0.25))
+    assert ci['components'][1]['T2'] == pytest.approx((1.05, 1.95), abs=0.02)
+
+
+def test_rejects_bad_input():
+    t, y = noisy_curve()
+    with pytest.raises(ValueError):
+        bootstrap(t, y, NMRCore().fit(t, y, 2), 10, mode='jackknife')
+    with pytest.raises(ValueError):
+        bootstrap(t, y, ([], y, np.zeros_like(y), 0.0, 1.0), 10)
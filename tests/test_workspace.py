@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from nmr.core import NMRCore
+from nmr.io import save_curve
+from nmr.model import multiexp
+from nmr.synthetic import synthetic_cpmg
+from nmr.workspace import Workspace, compare
+
+
+def write_files(tmp_path, n_files=3, n_points=2000):
+    paths = []
+    for i in range(n_files):
+        t, y = synthetic_cpmg(n_points=n_points, seed=i)
+        path = tmp_path / f'curve{i}.txt'
+        save_curve(str(path), t, y)
+        paths.append(str(path))
+    return paths
+
+
+def test_add_is_lazy_and_axes_are_shared(tmp_path):
+    paths = write_files(tmp_path, 2)
+    t, y = synthetic_cpmg(n_points=2000, seed=0)
+    multi = tmp_path / 'multi.txt'
+    np.savetxt(multi, np.column_stack([t, y, 2 * y]), fmt='%.9g', delimiter='\t')
+    ws = Workspace()
+    datasets = [ds for path in paths + [str(multi)] for ds in ws.add(path)]
+    assert len(datasets) == 4 and datasets[3].name == 'multi.txt [2]'
+    assert not any(ws.is_loaded(ds) for ds in datasets)
+    t0, _ = ws.curve(datasets[0])
+    t1, _ = ws.curve(datasets[1])
+    _, y3 = ws.curve(datasets[3])
+    # Одна ось времени у всех файлов - один массив
+    assert t0 is t1
+    np.testing.assert_allclose(y3, 2 * y, rtol=1e-8, atol=1e-8)
+    assert ws.stats()['shared_axes'] == 1
+    assert ws.nbytes == t0.nbytes + 2 * 8 * 2000 + 2 * 8 * 2000
+
+
+def test_least_recently_used_file_is_evicted(tmp_path):
+    paths = write_files(tmp_path, 3)
+    ws = Workspace(max_bytes=3 * 8 * 2000)
+    datasets = [ws.add(path)[0] for path in paths]
+    for ds in datasets:
+        ws.curve(ds)
+    assert ws.evictions == 1
+    assert [ws.is_loaded(ds) for ds in datasets] == [False, True, True]
+    ws.remove(datasets[1])
+    assert not ws.is_loaded(datasets[1]) and len(ws.datasets) == 2
+
+
+def test_compare_fits_missing_and_keeps_existing(tmp_path):
+    paths = write_files(tmp_path, 2, n_points=5000)
+    ws = Workspace()
+    a, b = (ws.add(path)[0] for path in paths)
+    core = NMRCore()
+    t, y = ws.curve(a)
+    a.set_fit(core.fit(t, y, 3))
+    rows = compare(ws, [a, b], core, 3, n_px=300)
+    assert [row['new'] for row in rows] == [False, True]
+    assert rows[0]['params'] is a.params
+    # Новые параметры не записываются в набор: их применяет поток GUI
+    assert b.params is None
+    t_b, y_b = ws.curve(b)
+    ref = NMRCore().fit(t_b, y_b, 3)
+    assert sorted(rows[1]['params'][3:6]) == pytest.approx([r['T2'] for r in ref[0]], rel=1e-6)
+    t_m, model = rows[1]['model']
+    assert len(t_m) <= 300
+    np.testing.assert_allclose(model, multiexp(rows[1]['params'], t_m))
+    assert len(rows[1]['data'][0]) < len(t_b)